@@ -0,0 +1,65 @@
+"""
+poetry run python scripts/bench_pdf.py input/manual.pdf --workers 1,4 --edit-pages 3
+
+PDF text extraction (lr.io.pdf) on one file, per backend (--backends; pymupdf
+only if installed) and page worker count:
+
+  cold     empty page cache: every page is extracted
+  warm     same file again: answered from the cache without opening it
+  edited   as if --edit-pages pages had changed: their cache rows are dropped,
+           so only those are extracted again (the digests of the others still match)
+
+`pypdf-loop` is the old extraction (pypdf, one page after the other, no cache) for
+reference. The cache lives in a temporary directory, not DATA_DIR.
+"""
+
+#!/usr/bin/env python
+import argparse, importlib.util, os, sys, tempfile, time
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdf")
+    parser.add_argument("--backends", default="pypdf,pymupdf")
+    parser.add_argument("--workers", default="1,4")
+    parser.add_argument("--min-pages", type=int, default=128, help="PDF_PARALLEL_MIN_PAGES")
+    parser.add_argument("--edit-pages", type=int, default=3)
+    args = parser.parse_args()
+
+    from pathlib import Path
+    from pypdf import PdfReader
+    from lr.config import settings
+    from lr.io import pdf
+
+    path = Path(args.pdf)
+    t0 = time.perf_counter()
+    reader = PdfReader(str(path))
+    pages = len([p.extract_text() or "" for p in reader.pages])
+    print(f"{path.name}: {pages} pages")
+    print(f"{'pypdf-loop':<18} cold={(time.perf_counter() - t0) * 1000:8.0f}ms")
+
+    settings.pdf_parallel_min_pages = args.min_pages
+    for backend in args.backends.split(","):
+        if backend == "pymupdf" and not importlib.util.find_spec("pymupdf"):
+            print(f"{backend:<18} not installed (poetry install -E pdf)")
+            continue
+        settings.pdf_backend = backend
+        for workers in (int(w) for w in args.workers.split(",")):
+            with tempfile.TemporaryDirectory() as tmp:
+                cache = pdf.PageCache(os.path.join(tmp, "pages.sqlite"))
+                row = []
+                for label in ("cold", "warm", "edited"):
+                    if label == "edited":
+                        digests = cache.file_digests(backend, pdf.file_sha256(path))
+                        gone = digests[:: max(1, len(digests) // max(1, args.edit_pages))][:args.edit_pages]
+                        with cache._lock:
+                            cache._conn.executemany("DELETE FROM pages WHERE digest=?",
+                                                    [(d,) for d in gone])
+                            cache._conn.execute("DELETE FROM files")
+                            cache._conn.commit()
+                    t0 = time.perf_counter()
+                    pdf.extract_pages(path, cache=cache, workers=workers)
+                    row.append(f"{label}={(time.perf_counter() - t0) * 1000:8.0f}ms")
+                print(f"{backend + ' x' + str(workers):<18} " + "  ".join(row))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+poetry run python scripts/bench_profiles.py --points 50000 --dim 768 --queries 200
+
+Recall@k vs latency vs RAM for each collection profile (COLLECTION_PROFILE) on a
+synthetic clustered dataset. Ground truth is exact cosine search in NumPy.
+
+Runs against Qdrant's in-process :memory: mode unless --server is given (then
+QDRANT_HOST/QDRANT_PORT from .env are used). Local mode stores the profile's
+settings but always searches exactly, without HNSW or quantization. There all
+profiles show recall 1.0 and similar latency, and `rss_mb` is this process's
+growth. Later profiles reuse memory freed by earlier ones, so run a single
+--profiles entry to compare RSS. The trade-offs only show up with --server.
+`est_ram_mb` is what the profile keeps in RAM on a server (vectors + quantized
+copy + graph links); it does not depend on the mode.
+"""
+
+#!/usr/bin/env python
+import argparse, logging, os, statistics, sys, time, uuid
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _est_ram_mb(p: dict, n: int, dim: int) -> float:
+    vectors = 0 if p["on_disk"] else n * dim * 4
+    quantized = {"scalar": n * dim, "binary": n * dim / 8}.get(p["quantization"], 0)
+    links = n * (p["m"] or 16) * 2 * 4  # layer-0 links dominate the graph
+    return (vectors + quantized + links) / 2**20
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--profiles", default="default,compact,binary,accurate")
+    parser.add_argument("--server", action="store_true", help="use the configured Qdrant server")
+    args = parser.parse_args()
+
+    if not args.server:
+        os.environ["QDRANT_LOCATION"] = ":memory:"
+    logging.disable(logging.WARNING)  # local mode warns that payload indexes are no-ops
+
+    import numpy as np
+    from lr.vector import qdrant_store as qs
+
+    rng = np.random.default_rng(0)
+    # clustered, like real embeddings: neighbours are close, clusters are not
+    centers = rng.normal(size=(max(8, args.points // 500), args.dim))
+    vecs = centers[rng.integers(len(centers), size=args.points)]
+    vecs = (vecs + 0.35 * rng.normal(size=vecs.shape)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+    queries = vecs[rng.choice(args.points, size=args.queries, replace=False)]
+    queries = queries + 0.1 * rng.normal(size=queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ vecs.T), axis=1)[:, :args.k]
+    ids = [str(uuid.uuid4()) for _ in range(args.points)]
+    payloads = [{"row": i} for i in range(args.points)]
+
+    mode = "server" if args.server else ":memory:"
+    print(f"points={args.points} dim={args.dim} k={args.k} mode={mode}")
+    for name in args.profiles.split(","):
+        p = qs.profile(name)
+        qs.PROFILE, qs.COLLECTION_NAME = p, f"bench_profile_{name}"
+        qs.drop_collection()
+        rss0 = _rss_mb()
+        t0 = time.perf_counter()
+        qs.ensure_collection(args.dim)
+        qs.upsert(vecs, payloads=payloads, ids=ids)
+        load_s = time.perf_counter() - t0
+        rss = _rss_mb() - rss0
+
+        lat, recall = [], []
+        for q, want in zip(queries, truth):
+            t0 = time.perf_counter()
+            hits = qs.search(q, top_k=args.k)
+            lat.append((time.perf_counter() - t0) * 1000)
+            got = {pl["row"] for _, _, pl in hits}
+            recall.append(len(got & set(want.tolist())) / args.k)
+        lat.sort()
+        print(f"{name:<9} recall@{args.k}={statistics.mean(recall):.3f}"
+              f"  p50={statistics.median(lat):7.2f}ms  p95={lat[int(len(lat) * 0.95) - 1]:7.2f}ms"
+              f"  load={load_s:6.1f}s  rss_mb={rss:7.1f}  est_ram_mb={_est_ram_mb(p, args.points, args.dim):7.1f}")
+        qs.drop_collection()
+
+if __name__ == "__main__":
+    sys.exit(main())
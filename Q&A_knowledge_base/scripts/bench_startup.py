@@ -0,0 +1,104 @@
+"""
+poetry run python scripts/bench_startup.py --runs 5 --serve --query "What is in the handbook?"
+
+Cold-start cost of the API. Always: the import time of lr.api.main in fresh
+interpreters (median of --runs) and the modules that dominate it (-X importtime).
+
+With --serve, also starts uvicorn on a free port (it needs the .env services:
+Qdrant, Ollama/OpenRouter) and reports the time until /health answers (live) and
+/ready answers 200 (warm-up done, see lr.warmup). With --query it then asks the
+question twice (worded apart, so no cache helps) and reports both latencies. With
+warm-up the first /ask should cost about as much as the second; run once with
+WARMUP=0 to see the difference.
+"""
+
+#!/usr/bin/env python
+import argparse, os, socket, statistics, subprocess, sys, time
+
+def _import_s() -> float:
+    code = "import time; t = time.perf_counter(); import lr.api.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def _top_imports(n: int) -> list[tuple[float, str]]:
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import lr.api.main"],
+                         capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            # cumulative time of what lr.api.main imports directly (no double counting)
+            name = parts[2].rstrip()
+            if (len(name) - len(name.lstrip())) // 2 == 1:
+                rows.append((int(parts[1]) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _wait(client, url: str, want: int, timeout: float) -> float | None:
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < timeout:
+        try:
+            if client.get(url).status_code == want:
+                return time.perf_counter() - t0
+        except Exception:
+            pass
+        time.sleep(0.05)
+    return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--serve", action="store_true", help="start the API and time /health, /ready")
+    parser.add_argument("--query", help="with --serve: ask this twice, time both")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    times = sorted(_import_s() for _ in range(args.runs))
+    print(f"import lr.api.main  median={statistics.median(times) * 1000:7.0f}ms"
+          f"  min={times[0] * 1000:7.0f}ms  max={times[-1] * 1000:7.0f}ms")
+    for s, name in _top_imports(args.top):
+        print(f"  {s * 1000:7.0f}ms  {name}")
+
+    if not args.serve:
+        return
+    import httpx
+
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "lr.api.main:app", "--port", str(port),
+         "--log-level", "warning"],
+        env={**os.environ},
+    )
+    try:
+        with httpx.Client(base_url=base, timeout=args.timeout) as client:
+            live = _wait(client, "/health", 200, args.timeout)
+            if live is None:
+                print("API did not come up")
+                return 1
+            print(f"live  (/health)     {(time.perf_counter() - t0) * 1000:7.0f}ms after start")
+            ready = _wait(client, "/ready", 200, args.timeout)
+            if ready is None:
+                print(f"not ready after {args.timeout:.0f}s: {client.get('/ready').json()}")
+                return 1
+            print(f"ready (/ready)      {(time.perf_counter() - t0) * 1000:7.0f}ms after start")
+            for step, st in client.get("/ready").json()["warmup"].items():
+                print(f"  {step:<8} {st.get('ms', 0):7.0f}ms")
+            if args.query:
+                for label in ("first /ask", "second /ask"):
+                    t1 = time.perf_counter()
+                    # different text each time: the answer cache and coalescing must not help
+                    r = client.post("/ask", json={"query": f"{args.query} ({label})"})
+                    print(f"{label:<19} {(time.perf_counter() - t1) * 1000:7.0f}ms  status={r.status_code}")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+poetry run python scripts/bench_two_stage.py --points 50000 --dim 768 --mini-dims 64,128,256
+
+Recall@k vs latency vs RAM of two-stage search (MINI_DIM, see lr.vector.mini)
+next to single-stage search on the full vectors. Ground truth is exact cosine
+search in NumPy. Each mini size is measured with both projections: "prefix"
+(the first dims, only meaningful for Matryoshka-trained models) and "pca"
+(fitted on the first --fit-rows vectors, like an ingest does), and each for
+every --oversampling (MINI_OVERSAMPLING: shortlist size per hit).
+
+The data is synthetic (clustered, most variance in a few directions) unless
+--npy points at a saved (n, dim) float matrix of real embeddings. The last
+--queries rows are held out and, with a little noise, used as queries.
+
+Runs against Qdrant's in-process :memory: mode unless --server is given (then
+QDRANT_HOST/QDRANT_PORT from .env are used). Local mode searches the mini vectors
+exactly, so recall there is what the projection loses; on a server the HNSW graph
+adds its own loss and latency shows the gain. `est_ram_mb` is what a server keeps
+in RAM (vectors the graph walks over + graph links); two-stage versions keep the
+full vectors on disk.
+"""
+
+#!/usr/bin/env python
+import argparse, logging, os, statistics, sys, time
+
+def _synthetic(n: int, dim: int, rng):
+    # clusters in a 32-dim subspace plus a little full-rank noise
+    basis = rng.normal(size=(32, dim))
+    centers = rng.normal(size=(max(8, n // 500), 32))
+    latent = centers[rng.integers(len(centers), size=n)] + 0.5 * rng.normal(size=(n, 32))
+    return latent @ basis + 0.5 * rng.normal(size=(n, dim))
+
+def _est_ram_mb(n: int, dim: int, m: int) -> float:
+    return (n * dim * 4 + n * m * 2 * 4) / 2**20  # vectors + layer-0 links
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--npy", help="(n, dim) embeddings to use instead of synthetic data")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--mini-dims", default="32,64,128")
+    parser.add_argument("--methods", default="prefix,pca")
+    parser.add_argument("--oversampling", default="2,4,8")
+    parser.add_argument("--fit-rows", type=int, default=4096)
+    parser.add_argument("--server", action="store_true", help="use the configured Qdrant server")
+    args = parser.parse_args()
+
+    if not args.server:
+        os.environ["QDRANT_LOCATION"] = ":memory:"
+    logging.disable(logging.WARNING)  # local mode warns that payload indexes are no-ops
+
+    import numpy as np
+    from lr.config import settings
+    from lr.vector import mini, qdrant_store as qs
+
+    rng = np.random.default_rng(0)
+    if args.npy:
+        data = np.load(args.npy).astype(np.float32)
+    else:
+        data = _synthetic(args.points + args.queries, args.dim, rng).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    base, held = data[:-args.queries], data[-args.queries:]
+    n, dim = base.shape
+    queries = held + 0.05 * rng.normal(size=held.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ base.T), axis=1)[:, :args.k]
+    ids = list(range(n))
+    payloads = [{"row": i} for i in ids]
+    m = qs.PROFILE["m"] or 16
+
+    runs = [("full", None)] + [(method, int(d)) for d in args.mini_dims.split(",")
+                               for method in args.methods.split(",")]
+    mode = "server" if args.server else ":memory:"
+    print(f"points={n} dim={dim} k={args.k} mode={mode}")
+    qs.COLLECTION_NAME = "bench_two_stage"
+    for method, d in runs:
+        proj = None
+        if d is not None:
+            proj = mini.Projection(d) if method == "prefix" else mini.fit_pca(base[:args.fit_rows], d)
+        qs.drop_collection()
+        t0 = time.perf_counter()
+        name = qs.ensure_collection(dim, mini_dim=d)
+        writer = qs.BulkWriter(name, bulk=True)
+        writer.upsert(base, payloads, ids, mini=None if proj is None else proj.apply(base))
+        writer.finish(wait_for_index=args.server)
+        load_s = time.perf_counter() - t0
+        reduced = None if proj is None else proj.apply(queries)
+
+        for over in ([None] if proj is None else [int(x) for x in args.oversampling.split(",")]):
+            if over is not None:
+                settings.mini_oversampling = over
+            lat, recall = [], []
+            for i, (q, want) in enumerate(zip(queries, truth)):
+                t0 = time.perf_counter()
+                hits = qs.search(q, top_k=args.k, mini_vector=None if reduced is None else reduced[i])
+                lat.append((time.perf_counter() - t0) * 1000)
+                recall.append(len({pid for pid, _, _ in hits} & set(want.tolist())) / args.k)
+            lat.sort()
+            label = "full" if proj is None else f"{method}-{d} x{over}"
+            print(f"{label:<16} recall@{args.k}={statistics.mean(recall):.3f}"
+                  f"  p50={statistics.median(lat):7.2f}ms  p95={lat[int(len(lat) * 0.95) - 1]:7.2f}ms"
+                  f"  load={load_s:6.1f}s  est_ram_mb={_est_ram_mb(n, d or dim, m):7.1f}")
+    qs.drop_collection()
+
+if __name__ == "__main__":
+    sys.exit(main())
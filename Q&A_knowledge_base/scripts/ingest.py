@@ -1,16 +1,18 @@
 #!/usr/bin/env python
 import argparse
 from lr.logging_setup import setup_logging
-from lr.io.readers import gather_input
-from lr.rag.retrieve import index_texts
+from lr.io.readers import iter_input
+from lr.rag.retrieve import index_texts, open_manifest
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--folder", default="./input")
+    parser.add_argument("--full", action="store_true", help="re-index every file, ignoring the manifest")
     args = parser.parse_args()
     setup_logging()
-    pairs = gather_input(args.folder)
-    res = index_texts(pairs)
+    manifest = open_manifest(args.folder, full=args.full)
+    pairs = iter_input(args.folder, manifest=manifest)
+    res = index_texts(pairs, manifest=manifest)
     print(res)
 
 if __name__ == "__main__":
@@ -1,8 +1,13 @@
 from lr.config import settings
-from lr.vector.qdrant_store import client
+from lr.vector.qdrant_store import client, drop_collection, versions
 
-if settings.qdrant_collection in [c.name for c in client.get_collections().collections]:
-    client.delete_collection(settings.qdrant_collection)
-    print("Deleted collection:", settings.qdrant_collection)
+names = [c.name for c in client.get_collections().collections]
+if settings.qdrant_collection in names or versions():
+    dropped = versions()
+    if settings.qdrant_collection in names:  # pre-versioning collection
+        client.delete_collection(settings.qdrant_collection)
+        dropped.append(settings.qdrant_collection)
+    drop_collection()
+    print("Deleted collection(s):", ", ".join(dropped))
 else:
     print("Collection not found:", settings.qdrant_collection)
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Hashable
+from .config import settings
+from .metrics import REJECTED, stage
+
+class Overloaded(Exception):
+    """No LLM slot within the queue limits; the API answers 503."""
+
+class Gate:
+    """
+    At most `limit` holders at once; up to `max_waiting` more wait in FIFO order, each
+    for at most `timeout_s`. Anything beyond that is turned away at once (Overloaded):
+    a burst degrades into quick 503s instead of every request getting slower.
+
+    Plain futures instead of asyncio.Semaphore, so the gate is not tied to one loop.
+    """
+
+    def __init__(self, limit: int, max_waiting: int, timeout_s: float):
+        self.limit, self.max_waiting, self.timeout_s = max(1, limit), max_waiting, timeout_s
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def check(self) -> None:
+        """Raises Overloaded if a request arriving now would be turned away."""
+        if self.active >= self.limit and len(self._waiters) >= self.max_waiting:
+            REJECTED.inc(reason="queue_full")
+            raise Overloaded(f"LLM busy: {self.active} generations running, "
+                             f"{len(self._waiters)} waiting")
+
+    async def acquire(self, shed: bool = True) -> None:
+        # shed=False: wait as long as it takes, whatever the queue length (batch work)
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if shed:
+            self.check()
+        fut = asyncio.get_running_loop().create_future()
+        self._waiters.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.timeout_s if shed else None)
+        except BaseException as e:
+            if fut.done() and not fut.cancelled():
+                self.release()  # the slot was handed over just as we gave up
+            else:
+                fut.cancel()
+                self._waiters.remove(fut)
+            if isinstance(e, asyncio.TimeoutError):
+                REJECTED.inc(reason="timeout")
+                raise Overloaded(f"no LLM slot within {self.timeout_s:.0f}s") from None
+            raise
+
+    def release(self) -> None:
+        # hand the slot straight to the next waiter; `active` only drops when nobody waits
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, timings: dict | None = None, shed: bool = True):
+        """Holds a slot for the block; the wait goes to timings["queue_ms"]."""
+        with stage({} if timings is None else timings, "queue"):
+            await self.acquire(shed=shed)
+        try:
+            yield
+        finally:
+            self.release()
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution and its result."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, asyncio.Task] = {}
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable]) -> tuple[object, bool]:
+        """-> (result, shared); shared is True for callers that joined a running call."""
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            # a task of its own: a caller that goes away does not cancel the others' work
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), shared
+
+    def _done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here even if every caller has gone away
+
+_gate: Gate | None = None
+_gate_lock = threading.Lock()
+
+def get_llm_gate() -> Gate:
+    # one per process: LLM_CONCURRENCY is what the model server can take at once
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            _gate = Gate(settings.llm_concurrency, settings.llm_queue_max,
+                         settings.llm_queue_timeout_s)
+        return _gate
@@ -1,34 +1,165 @@
+import asyncio
+import json
 import logging
-from fastapi import FastAPI
-from .schemas import IngestRequest, AskRequest, AskResponse
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from .schemas import IngestRequest, AskRequest, AskBatchRequest, AskResponse
 from ..logging_setup import setup_logging
-from ..io.readers import gather_input
-from ..rag.retrieve import index_texts
-from ..rag.answer import answer
-from pydantic import BaseModel
-
-class AskRequest(BaseModel):
-    query: str
-    ext: str | None = None  # ".pdf", ".csv", ".md", ".txt"
-    
+from ..io.readers import iter_input
+from ..rag.retrieve import index_texts, open_manifest
+from ..rag.answer import aanswer, aanswer_stream, aanswer_batch
+from ..llm import ollama_client, openrouter_client
+from ..vector import store as vector_store
+from ..vector.registry import version_info
+from ..config import settings
+from ..jobs import get_runner, REINDEX
+from ..admission import Overloaded, get_llm_gate
+from .. import metrics, warmup
+
 setup_logging()
 log = logging.getLogger("lr.api")
 
-app = FastAPI(title="Local RAG API", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # pick up ingest jobs that were queued/running when the process last stopped
+    get_runner().resume()
+    # in the background: the process takes traffic (and answers /health) right away
+    warming = asyncio.create_task(warmup.run()) if settings.warmup else None
+    yield
+    if warming is not None:
+        warming.cancel()
+    # waits for running jobs to stop at their next batch: off the event loop
+    await asyncio.to_thread(get_runner().shutdown)
+    # shared async connection pools live for the whole process
+    await ollama_client.aclose()
+    await openrouter_client.aclose()
+    await vector_store.aclose()
+
+app = FastAPI(title="Local RAG API", version="0.1.0", lifespan=lifespan)
+
+@app.exception_handler(Overloaded)
+async def overloaded(request: Request, exc: Overloaded):
+    # admission control turned the request away: the LLM is busy, try again shortly
+    log.warning(f"{request.url.path} rejected: {exc}")
+    return JSONResponse(status_code=503, content={"detail": str(exc)},
+                        headers={"Retry-After": "1"})
 
 @app.get("/health")
 def health():
     log.info("health-check")
     return {"ok": True}
 
+@app.get("/ready")
+def ready():
+    # readiness: 503 until the warm-up is done (see lr.warmup), with each step's state
+    ok, state = warmup.readiness()
+    return JSONResponse(state, status_code=200 if ok else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text format: lr_stage_duration_seconds{endpoint,stage}, lr_request_duration_seconds
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/ingest")
 def ingest(req: IngestRequest):
-    pairs = gather_input(req.folder)
-    res = index_texts(pairs)
-    log.info(f"ingested folder={req.folder} chunks={res['chunks_indexed']}")
+    # sync on purpose: parsing is CPU-bound and the pipeline manages its own threads
+    t0, timings = time.perf_counter(), {}
+    manifest = open_manifest(req.folder, full=req.full)
+    pairs = iter_input(req.folder, manifest=manifest)
+    res = index_texts(pairs, manifest=manifest, timings=timings)
+    timings["total_ms"] = metrics.ms_since(t0)
+    metrics.observe("ingest", timings)
+    log.info(f"ingested folder={req.folder} chunks={res['chunks_indexed']} timings={timings}")
+    if req.timings:
+        res["timings"] = timings
     return {"folder": req.folder, **res}
 
+@app.post("/jobs/ingest")
+def submit_ingest(req: IngestRequest):
+    job_id = get_runner().submit(req.folder, full=req.full)
+    return get_runner().store.get(job_id)
+
+@app.post("/jobs/reindex")
+def submit_reindex(req: IngestRequest):
+    # builds a new collection version from the folder; queries use the old one until the swap
+    job_id = get_runner().submit(req.folder, full=True, kind=REINDEX)
+    return get_runner().store.get(job_id)
+
+@app.get("/collection")
+def collection():
+    live = vector_store.live_collection(refresh=True)
+    return {"alias": settings.qdrant_collection, "live": live,
+            "versions": vector_store.versions(), "embedding": version_info(live)}
+
+@app.get("/jobs")
+def list_jobs(limit: int = 50):
+    return get_runner().store.recent(limit)
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_runner().store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = get_runner().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    return job
+
 @app.post("/ask")
-def ask(req: AskRequest):
-    res = answer(req.query, only_ext=req.ext)
+async def ask(req: AskRequest):
+    t0, timings = time.perf_counter(), {}
+    res = await aanswer(req.query, only_ext=req.ext, timings=timings)
+    timings["total_ms"] = metrics.ms_since(t0)
+    metrics.observe("ask", timings)
+    if req.timings:
+        res["timings"] = timings
+    return res
+
+@app.post("/ask/batch")
+async def ask_batch(req: AskBatchRequest):
+    # offline evaluation / bulk FAQ runs: one embedding call and one vector search for all
+    if len(req.queries) > settings.ask_batch_max:
+        raise HTTPException(
+            status_code=413, detail=f"at most {settings.ask_batch_max} queries per batch")
+    t0, timings = time.perf_counter(), {}
+    results = await aanswer_batch(req.queries, only_ext=req.ext, timings=timings)
+    timings["total_ms"] = metrics.ms_since(t0)
+    metrics.observe("ask_batch", timings)
+    res = {"results": results}
+    if req.timings:
+        res["timings"] = timings
     return res
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/ask/stream")
+async def ask_stream(req: AskRequest):
+    # Server-Sent Events: "sources" first, then one "token" event per piece, then "done"
+    # a real 503 while we still can; once streaming, a rejection is an "error" event
+    get_llm_gate().check()
+
+    async def events():
+        t0, timings = time.perf_counter(), {}
+        try:
+            async for event, data in aanswer_stream(req.query, only_ext=req.ext, timings=timings):
+                if event == "done" and req.timings:
+                    data = {**data, "timings": timings}
+                yield _sse(event, data)
+            timings["total_ms"] = metrics.ms_since(t0)
+            metrics.observe("ask_stream", timings)
+        except Exception as e:
+            log.exception("ask/stream failed")
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
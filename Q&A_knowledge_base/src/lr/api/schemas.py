@@ -2,9 +2,18 @@ from pydantic import BaseModel
 
 class IngestRequest(BaseModel):
     folder: str = "./input"
+    full: bool = False  # ignore the manifest and re-index every file
+    timings: bool = False  # add per-stage timings (ms) to the response
 
 class AskRequest(BaseModel):
     query: str
+    ext: str | None = None  # ".pdf", ".csv", ".md", ".txt"
+    timings: bool = False  # add per-stage timings (ms) to the response
+
+class AskBatchRequest(BaseModel):
+    queries: list[str]
+    ext: str | None = None
+    timings: bool = False
 
 class AskResponse(BaseModel):
     answer: str
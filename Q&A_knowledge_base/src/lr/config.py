@@ -11,6 +11,10 @@ class Settings(BaseModel):
     ollama_base: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     ollama_chat_model: str = os.getenv("OLLAMA_CHAT_MODEL", "llama3.1")
     ollama_embed_model: str = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+    ollama_embed_batch_size: int = int(os.getenv("OLLAMA_EMBED_BATCH_SIZE", "64"))
+    ollama_embed_concurrency: int = int(os.getenv("OLLAMA_EMBED_CONCURRENCY", "4"))
+    ollama_embed_retries: int = int(os.getenv("OLLAMA_EMBED_RETRIES", "3"))
+    ollama_embed_backoff: float = float(os.getenv("OLLAMA_EMBED_BACKOFF", "0.5"))
 
     # openrouter
     openrouter_api_key: str | None = os.getenv("OPENROUTER_API_KEY")
@@ -18,10 +22,100 @@ class Settings(BaseModel):
     openrouter_chat_model: str = os.getenv("OPENROUTER_CHAT_MODEL", "meta-llama/llama-3.1-70b-instruct")
     openrouter_embed_model: str = os.getenv("OPENROUTER_EMBED_MODEL", "nomic-ai/nomic-embed-text-v1")
 
+    # vector index: "qdrant" (server or QDRANT_LOCATION) or "numpy" (in-process, under DATA_DIR)
+    vector_backend: str = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+    # numpy backend: exact search below this many vectors, IVF above; buckets probed per query
+    ivf_min_rows: int = int(os.getenv("IVF_MIN_ROWS", "50000"))
+    ivf_nprobe: int = int(os.getenv("IVF_NPROBE", "8"))
+
     # qdrant
     qdrant_host: str = os.getenv("QDRANT_HOST", "localhost")
     qdrant_port: int = int(os.getenv("QDRANT_PORT", "6333"))
     qdrant_collection: str = os.getenv("QDRANT_COLLECTION", "local_rag_chunks")
+    # embedded local mode instead of a server: ":memory:" or a directory path
+    qdrant_location: str | None = os.getenv("QDRANT_LOCATION") or None
+    # gRPC instead of REST (binary protobuf, cheaper for large upserts)
+    qdrant_grpc: bool = os.getenv("QDRANT_GRPC", "0") == "1"
+    qdrant_grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    # upsert requests in flight at once (sent with wait=False, then one final barrier)
+    upsert_parallel: int = int(os.getenv("UPSERT_PARALLEL", "4"))
+    # new collection versions are filled with HNSW indexing off and indexed once at the end;
+    # a rebuild waits up to this long for that index before it is promoted
+    bulk_load: bool = os.getenv("BULK_LOAD", "1") == "1"
+    bulk_index_wait_s: float = float(os.getenv("BULK_INDEX_WAIT_S", "600"))
+    # two-stage search: new versions also store a MINI_DIM-dim copy of each embedding that
+    # carries the HNSW graph, and the full vectors (kept on disk) rescore its shortlist of
+    # MINI_OVERSAMPLING x the hits asked for. 0 = off; changing it rebuilds on the next ingest.
+    # MINI_METHOD: "prefix" (Matryoshka models, e.g. nomic-embed-text v1.5) or "pca"
+    # (fitted on the first MINI_PCA_ROWS embeddings of the build)
+    mini_dim: int = int(os.getenv("MINI_DIM", "0"))
+    mini_method: str = os.getenv("MINI_METHOD", "prefix").lower()
+    mini_oversampling: int = int(os.getenv("MINI_OVERSAMPLING", "4"))
+    mini_pca_rows: int = int(os.getenv("MINI_PCA_ROWS", "4096"))
+    # candidates fetched per requested hit, for reranking
+    retrieve_overfetch: int = int(os.getenv("RETRIEVE_OVERFETCH", "2"))
+    # hybrid retrieval: local BM25 index fused with dense hits (reciprocal rank fusion)
+    hybrid: bool = os.getenv("HYBRID", "1") == "1"
+    rrf_k: int = int(os.getenv("RRF_K", "60"))
+    # reranker: "fuzzy" (rapidfuzz, default), "cross-encoder" (needs sentence-transformers), "none"
+    reranker: str = os.getenv("RERANKER", "fuzzy").lower()
+    rerank_model: str = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+    # prompt context: merged neighbour chunks are added best-first up to this many tokens
+    context_token_budget: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+    # semantic answer cache: a question at least this cosine-similar to an earlier one (same
+    # collection version, filter, chat model and numbers) gets that answer without retrieval
+    # or the LLM. Opt-in: questions differing only in a name can be that similar and would
+    # get each other's answers (see rag.answer_cache)
+    answer_cache: bool = os.getenv("ANSWER_CACHE", "0") == "1"
+    answer_cache_threshold: float = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.97"))
+    answer_cache_max_entries: int = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))
+    # /ask/batch: questions per request, and answers generated at once against the LLM
+    ask_batch_max: int = int(os.getenv("ASK_BATCH_MAX", "100"))
+    ask_batch_concurrency: int = int(os.getenv("ASK_BATCH_CONCURRENCY", "4"))
+    # LLM admission control (async API): generations at once, requests allowed to wait for
+    # one and for how long; beyond that the API answers 503 instead of queueing more
+    llm_concurrency: int = int(os.getenv("LLM_CONCURRENCY", "4"))
+    llm_queue_max: int = int(os.getenv("LLM_QUEUE_MAX", "32"))
+    llm_queue_timeout_s: float = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "30"))
+    # /ask: a question identical to one still being answered waits for that answer
+    ask_coalesce: bool = os.getenv("ASK_COALESCE", "1") == "1"
+    # collection profile (see vector.qdrant_store.PROFILES): default, compact, binary, accurate
+    collection_profile: str = os.getenv("COLLECTION_PROFILE", "default").lower()
+    # per-knob overrides of the profile's HNSW settings (0 -> keep the profile's value)
+    hnsw_m: int = int(os.getenv("HNSW_M", "0"))
+    hnsw_ef_construct: int = int(os.getenv("HNSW_EF_CONSTRUCT", "0"))
+    hnsw_ef: int = int(os.getenv("HNSW_EF", "0"))
+
+    # local state (caches, manifests) lives here
+    data_dir: str = os.getenv("DATA_DIR", "./data")
+    embed_cache: bool = os.getenv("EMBED_CACHE", "1") == "1"
+    embed_cache_max_entries: int = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+    # chunk text lives in a local document store; Qdrant payloads keep doc_id + offsets
+    docstore: bool = os.getenv("DOCSTORE", "1") == "1"
+
+    # parsing: worker processes (0 -> one per core) and per-file timeout
+    parse_workers: int = int(os.getenv("PARSE_WORKERS", "0"))
+    parse_timeout_s: float = float(os.getenv("PARSE_TIMEOUT_S", "300"))
+    # CSV/TSV are streamed in row groups and indexed as blocks of this many rows
+    table_rows_per_chunk: int = int(os.getenv("TABLE_ROWS_PER_CHUNK", "50"))
+    # PDFs: "auto" (PyMuPDF if installed, pypdf otherwise), "pymupdf" or "pypdf"
+    pdf_backend: str = os.getenv("PDF_BACKEND", "auto").lower()
+    # page text cached under DATA_DIR by page content: a re-ingest extracts changed pages only
+    pdf_page_cache: bool = os.getenv("PDF_PAGE_CACHE", "1") == "1"
+    pdf_page_cache_max_entries: int = int(os.getenv("PDF_PAGE_CACHE_MAX_ENTRIES", "500000"))
+    # a PDF with this many pages to extract is split over PDF_PAGE_WORKERS processes
+    # (0 -> one per core); only outside parse workers, which already run one file per core
+    pdf_page_workers: int = int(os.getenv("PDF_PAGE_WORKERS", "0"))
+    pdf_parallel_min_pages: int = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "128"))
+
+    # ingest pipeline: chunks per embed/upsert batch, embedded batches queued for upsert
+    ingest_batch_size: int = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+    ingest_max_pending: int = int(os.getenv("INGEST_MAX_PENDING", "2"))
+    # background ingest jobs running at once
+    ingest_job_workers: int = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+
+    # API startup: prime connections, models and indexes in the background; /ready waits for it
+    warmup: bool = os.getenv("WARMUP", "1") == "1"
 
     # app
     app_env: str = os.getenv("APP_ENV", "dev")
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+def file_sha256(path: Path, bufsize: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(bufsize):
+            h.update(block)
+    return h.hexdigest()
+
+def source_of(path: Path) -> str:
+    # the `source` of a file's points: its absolute path, so files of the same name (in
+    # other subfolders or other ingested folders) never share, or delete, each other's points
+    return Path(path).resolve().as_posix()
+
+class Manifest:
+    """
+    Per-folder record of what was last indexed: relative path -> size, mtime, sha256.
+
+    `diff()` returns only new/changed files and fills `stale_sources` with the
+    `source` values whose points must be dropped (changed or deleted files).
+    Nothing is written until `commit()`, so a failed ingest is simply retried.
+    `scope` pins the collection/embedding model; if it changes, everything is stale.
+    """
+
+    def __init__(self, path: str | Path, scope: dict):
+        self.path = Path(path)
+        self.scope = scope
+        self.files: dict[str, dict] = {}
+        # entries indexed under another scope (or forgotten by reset): all stale
+        self._orphans: dict[str, dict] = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("scope") == scope:
+                self.files = data.get("files", {})
+            else:
+                self._orphans = data.get("files", {})
+        self.changed: list[str] = []
+        self.removed: list[str] = []
+        self.stale_sources: list[str] = []
+        self._pending: dict[str, dict] | None = None
+        self._base: Path | None = None
+
+    @classmethod
+    def for_folder(cls, data_dir: str | Path, folder: str | Path, scope: dict) -> "Manifest":
+        key = hashlib.sha1(str(Path(folder).resolve()).encode("utf-8")).hexdigest()[:16]
+        return cls(Path(data_dir) / "manifests" / f"{key}.json", scope)
+
+    def reset(self) -> None:
+        # forget everything -> next diff() treats all files as new
+        self._orphans = {**self._orphans, **self.files}
+        self.files = {}
+
+    def diff(self, base: Path, files: list[Path]) -> list[Path]:
+        self._base = base
+        prev = {**self._orphans, **self.files}
+        pending: dict[str, dict] = {}
+        todo: list[Path] = []
+        self.changed, self.removed, stale = [], [], []
+
+        for p in files:
+            rel = p.relative_to(base).as_posix()
+            st = p.stat()
+            old = self.files.get(rel)
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "source": source_of(p)}
+            if old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns:
+                # not re-indexed: its points keep the source they were indexed under
+                pending[rel] = {**entry, "sha256": old["sha256"], "source": old["source"]}
+                continue
+            entry["sha256"] = file_sha256(p)
+            if old and old["sha256"] == entry["sha256"]:
+                pending[rel] = {**entry, "source": old["source"]}
+                continue  # touched, same bytes
+            pending[rel] = entry
+            todo.append(p)
+            self.changed.append(rel)
+            if rel in prev:
+                stale.append(prev[rel]["source"])
+
+        for rel, old in prev.items():
+            if rel not in pending:
+                self.removed.append(rel)
+                stale.append(old["source"])
+
+        self.stale_sources = list(dict.fromkeys(stale))
+        self._pending = pending
+        return todo
+
+    def discard(self, path: Path) -> None:
+        # file could not be indexed this run: leave it out so the next diff() retries it
+        if self._pending is not None and self._base is not None:
+            self._pending.pop(path.relative_to(self._base).as_posix(), None)
+
+    def commit(self) -> None:
+        if self._pending is None:
+            return
+        self.files = self._pending
+        self._pending = None
+        self._orphans = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"scope": self.scope, "files": self.files}, indent=1), encoding="utf-8"
+        )
+        os.replace(tmp, self.path)
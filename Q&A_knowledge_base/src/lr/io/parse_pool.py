@@ -0,0 +1,128 @@
+import logging
+import multiprocessing as mp
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+log = logging.getLogger("lr.io.parse_pool")
+
+# CPU-bound formats go to worker processes; plain text is cheaper to read in-process
+# (and tables are streamed lazily, which only works in-process)
+LIGHT_SUFFIXES = {".md", ".txt", ".csv", ".tsv"}
+
+def _serve(conn, parse: Callable[[Path], Iterable]) -> None:
+    # worker loop: one path in, (ok, result or error) out, until the pipe closes
+    while True:
+        try:
+            p = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, parse(p)))
+        except Exception as e:
+            try:
+                conn.send((False, e))
+            except Exception:  # the error itself does not pickle
+                conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+class _Worker:
+    """One spawn process with its own pipe; `task` is (slot, deadline) while it parses."""
+
+    def __init__(self, ctx, parse):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_serve, args=(child, parse), daemon=True)
+        self.proc.start()
+        child.close()
+        self.task: tuple[int, float] | None = None
+
+    def kill(self) -> None:
+        self.proc.kill()
+        self.proc.join()
+        self.conn.close()
+
+def parse_files(
+    paths: list[Path],
+    parse: Callable[[Path], Iterable],
+    workers: int = 0,
+    timeout: float = 300.0,
+    on_timeout: Callable[[Path], None] | None = None,
+) -> Iterator[tuple[Path, Iterable]]:
+    """
+    Yields (path, chunks) in the order of `paths`, parsing heavy files (PDF, docx,
+    html, ...) on worker processes. At most 2*workers files are in flight.
+
+    A file still parsing `timeout` seconds after its worker picked it up is skipped
+    (and reported to `on_timeout`) and that worker is killed and replaced at once, so
+    pathological PDFs cannot stall the ingest or the files queued behind them. A worker
+    that dies (e.g. a parser crash) skips its file the same way.
+    `parse` must be a top-level (picklable) function.
+    """
+    workers = workers or os.cpu_count() or 1
+    heavy = sum(1 for p in paths if p.suffix.lower() not in LIGHT_SUFFIXES)
+    if workers <= 1 or heavy <= 1:
+        for p in paths:
+            yield p, parse(p)
+        return
+
+    # spawn: forking a process that already runs threads (uvicorn, httpx) is unsafe
+    ctx = mp.get_context("spawn")
+    pool = [_Worker(ctx, parse) for _ in range(min(workers, heavy))]
+    # slot -> (ok, result); light files and skipped ones are settled when their turn comes
+    done: dict[int, tuple[bool, object]] = {}
+    skipped: set[int] = set()
+    queued: deque[int] = deque()  # heavy slots waiting for a free worker
+    nxt = 0  # next slot to hand out (window is [first unyielded, nxt))
+
+    def skip(w: _Worker, why: str) -> None:
+        slot = w.task[0]
+        log.warning(f"parse {why}, skipping: {paths[slot]}")
+        skipped.add(slot)
+        if on_timeout is not None:
+            on_timeout(paths[slot])
+        w.kill()
+        pool[pool.index(w)] = _Worker(ctx, parse)
+
+    def dispatch() -> None:
+        for w in pool:
+            if w.task is None and queued:
+                slot = queued.popleft()
+                w.conn.send(paths[slot])
+                w.task = (slot, time.monotonic() + timeout)
+
+    try:
+        for i, p in enumerate(paths):
+            while nxt < len(paths) and nxt < i + 2 * workers:
+                if paths[nxt].suffix.lower() not in LIGHT_SUFFIXES:
+                    queued.append(nxt)
+                nxt += 1
+            dispatch()
+            if p.suffix.lower() in LIGHT_SUFFIXES:
+                yield p, parse(p)
+                continue
+            while i not in done and i not in skipped:
+                busy = [w for w in pool if w.task is not None]
+                left = min(w.task[1] for w in busy) - time.monotonic()
+                ready = wait([w.conn for w in busy], timeout=max(0.0, left))
+                for w in busy:
+                    if w.conn in ready:
+                        try:
+                            done[w.task[0]] = w.conn.recv()
+                        except EOFError:
+                            skip(w, "worker died")
+                            continue
+                        w.task = None
+                    elif time.monotonic() >= w.task[1]:
+                        skip(w, f"timed out after {timeout:.0f}s")
+                dispatch()
+            if i in skipped:
+                continue
+            ok, res = done.pop(i)
+            if not ok:
+                raise res
+            yield p, res
+    finally:
+        for w in pool:
+            w.kill()
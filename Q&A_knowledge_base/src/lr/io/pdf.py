@@ -0,0 +1,314 @@
+import hashlib
+import importlib.util
+import logging
+import multiprocessing as mp
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from .manifest import file_sha256
+from ..config import settings
+
+log = logging.getLogger("lr.io.pdf")
+
+# keep well under SQLite's bound-variable limit
+_SQL_CHUNK = 500
+# page ranges handed out per worker: small enough to even out slow pages
+_RANGES_PER_WORKER = 4
+
+class _PyPdf:
+    name = "pypdf"
+
+    def __init__(self, path: Path):
+        from pypdf import PdfReader
+        self._reader = PdfReader(str(path))
+        self._seen: dict = {}  # object number -> digest, shared by all pages
+
+    def __len__(self) -> int:
+        return len(self._reader.pages)
+
+    def digest(self, i: int) -> str:
+        page = self._reader.pages[i]  # inherited /Resources are already copied onto it
+        contents = page.get_contents()
+        resources = page.get("/Resources")
+        return _digest(b"" if contents is None else contents.get_data(),
+                       b"" if resources is None else self._fingerprint(resources))
+
+    def _fingerprint(self, obj) -> bytes:
+        from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, StreamObject
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key not in self._seen:
+                self._seen[key] = b"cycle"
+                self._seen[key] = self._fingerprint(obj.get_object())
+            return self._seen[key]
+        h = hashlib.sha256(type(obj).__name__.encode())
+        if isinstance(obj, DictionaryObject):
+            for k in sorted(obj):
+                if k not in _SKIP_KEYS:
+                    h.update(k.encode("utf-8") + self._fingerprint(obj.raw_get(k)))
+            if isinstance(obj, StreamObject) and obj.get("/Subtype") != "/Image":
+                h.update(obj.get_data())
+        elif isinstance(obj, ArrayObject):
+            for item in obj:
+                h.update(self._fingerprint(item))
+        else:
+            h.update(repr(obj).encode("utf-8"))
+        return h.digest()
+
+    def text(self, i: int) -> str:
+        return self._reader.pages[i].extract_text() or ""
+
+    def close(self) -> None:
+        self._reader.close()
+
+class _PyMuPdf:
+    name = "pymupdf"
+
+    def __init__(self, path: Path):
+        import pymupdf
+        self._doc = pymupdf.open(str(path))
+        self._seen: dict[int, bytes] = {}
+
+    def __len__(self) -> int:
+        return self._doc.page_count
+
+    def digest(self, i: int) -> str:
+        page = self._doc[i]
+        # /Resources may be inherited from a /Pages node
+        xref, (kind, value) = page.xref, self._doc.xref_get_key(page.xref, "Resources")
+        while kind == "null" and xref:
+            kind, parent = self._doc.xref_get_key(xref, "Parent")
+            xref = int(parent.split()[0]) if kind == "xref" else 0
+            kind, value = self._doc.xref_get_key(xref, "Resources") if xref else ("null", "")
+        return _digest(page.read_contents(), self._expand(value) if kind != "null" else b"")
+
+    def _expand(self, source: str) -> bytes:
+        # object source with every "n 0 R" replaced by the digest of what it points to
+        source = _PARENT.sub("", source)
+        return _REF.sub(lambda m: self._fingerprint(int(m.group(1))).hex(), source).encode("utf-8")
+
+    def _fingerprint(self, xref: int) -> bytes:
+        if xref not in self._seen:
+            self._seen[xref] = b"cycle"
+            source = self._doc.xref_object(xref, compressed=True)
+            h = hashlib.sha256(self._expand(source))
+            if self._doc.xref_is_stream(xref) and "/Subtype/Image" not in source.replace(" ", ""):
+                h.update(self._doc.xref_stream_raw(xref))
+            self._seen[xref] = h.digest()
+        return self._seen[xref]
+
+    def text(self, i: int) -> str:
+        return self._doc[i].get_text()
+
+    def close(self) -> None:
+        self._doc.close()
+
+BACKENDS = {"pypdf": _PyPdf, "pymupdf": _PyMuPdf}
+
+# not part of what a page draws (and /Parent leads back up the whole page tree)
+_SKIP_KEYS = {"/Parent"}
+_PARENT = re.compile(r"/Parent\s+\d+\s+\d+\s+R")
+_REF = re.compile(r"\b(\d+)\s+\d+\s+R\b")
+
+def _digest(contents: bytes, resources: bytes) -> str:
+    # a page's text is a function of its content stream and everything its resources
+    # resolve to: fonts with their ToUnicode maps and font files, and form XObjects (text
+    # drawn with "/Fm0 Do") with their own streams and resources. Object numbers are file
+    # layout, not content, so references are hashed by what they point to. Image data
+    # carries no text and is left out.
+    h = hashlib.sha256(contents)
+    h.update(resources)
+    return h.hexdigest()
+
+def backend_name() -> str:
+    if settings.pdf_backend == "auto":
+        return "pymupdf" if importlib.util.find_spec("pymupdf") else "pypdf"
+    if settings.pdf_backend not in BACKENDS:
+        raise ValueError(f"unknown PDF_BACKEND {settings.pdf_backend!r} "
+                         f"(use auto, {', '.join(BACKENDS)})")
+    return settings.pdf_backend
+
+class PageCache:
+    """
+    On-disk (SQLite) page text per (extractor, page digest), plus the digests of every
+    PDF seen per (extractor, file sha256). An unchanged file is answered without being
+    opened; an edited one only re-extracts the pages whose content changed.
+    Least-recently-used pages are evicted once `max_entries` is exceeded.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 500_000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # parse worker processes share the file
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " extractor TEXT NOT NULL, digest TEXT NOT NULL, text TEXT NOT NULL,"
+            " used INTEGER NOT NULL, PRIMARY KEY (extractor, digest))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_used ON pages(used)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " extractor TEXT NOT NULL, sha TEXT NOT NULL, digests TEXT NOT NULL,"
+            " PRIMARY KEY (extractor, sha))"
+        )
+        self._conn.commit()
+
+    def file_digests(self, extractor: str, sha: str) -> list[str] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digests FROM files WHERE extractor=? AND sha=?", (extractor, sha)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0].split(",") if row[0] else []
+
+    def put_file(self, extractor: str, sha: str, digests: list[str]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (extractor, sha, digests) VALUES (?, ?, ?)",
+                (extractor, sha, ",".join(digests)),
+            )
+            self._conn.commit()
+
+    def get_many(self, extractor: str, digests: list[str]) -> dict[str, str]:
+        out: dict[str, str] = {}
+        # wall clock, not a counter: several processes write here
+        now = time.time_ns()
+        with self._lock:
+            for i in range(0, len(digests), _SQL_CHUNK):
+                part = digests[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT digest, text FROM pages WHERE extractor=? AND digest IN ({marks})",
+                    (extractor, *part),
+                ).fetchall()
+                out.update(rows)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE pages SET used=? WHERE extractor=? AND digest IN ({marks})",
+                        (now, extractor, *part),
+                    )
+            self._conn.commit()
+        return out
+
+    def put_many(self, extractor: str, items: list[tuple[str, str]]) -> None:
+        if not items:
+            return
+        now = time.time_ns()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (extractor, digest, text, used) VALUES (?, ?, ?, ?)",
+                [(extractor, d, text, now) for d, text in items],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()
+        over = count - self.max_entries
+        if over <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM pages WHERE rowid IN (SELECT rowid FROM pages ORDER BY used ASC LIMIT ?)",
+            (over,),
+        )
+        log.info(f"evicted {over} cached PDF pages (cap={self.max_entries})")
+
+_cache: PageCache | None = None
+_cache_lock = threading.Lock()
+
+def get_page_cache() -> PageCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PageCache(Path(settings.data_dir) / "pdf_pages.sqlite",
+                               max_entries=settings.pdf_page_cache_max_entries)
+        return _cache
+
+def _extract(path: str, extractor: str, pages: list[int]) -> list[str]:
+    # top-level so spawn workers can import it; each worker opens the file itself
+    doc = BACKENDS[extractor](Path(path))
+    try:
+        return [doc.text(i) for i in pages]
+    finally:
+        doc.close()
+
+def _ranges(pages: list[int], n: int) -> list[list[int]]:
+    # contiguous runs: a parser walks neighbouring pages' shared resources once
+    size = max(1, -(-len(pages) // n))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+def _extract_parallel(path: Path, extractor: str, pages: list[int], workers: int) -> list[str]:
+    from concurrent.futures import ProcessPoolExecutor
+    parts = _ranges(pages, workers * _RANGES_PER_WORKER)
+    # spawn: forking a process that already runs threads (uvicorn, httpx) is unsafe
+    with ProcessPoolExecutor(max_workers=min(workers, len(parts)),
+                             mp_context=mp.get_context("spawn")) as pool:
+        futs = [pool.submit(_extract, str(path), extractor, part) for part in parts]
+        return [text for f in futs for text in f.result()]
+
+def extract_pages(path: Path, cache: PageCache | None = None, workers: int | None = None) -> list[str]:
+    """
+    Text of each page. PyMuPDF when installed (several times faster than pypdf), pypdf
+    otherwise; see PDF_BACKEND. Pages come from the page cache (PDF_PAGE_CACHE) where
+    possible; the rest are extracted, split into page ranges over `workers` processes
+    (PDF_PAGE_WORKERS) once there are at least PDF_PARALLEL_MIN_PAGES of them.
+
+    Inside a parse pool worker (a daemon process, which may not start children) pages
+    are extracted serially: there the pool already spreads files over the cores.
+    """
+    path = Path(path)
+    extractor = backend_name()
+    if cache is None and settings.pdf_page_cache:
+        cache = get_page_cache()
+    sha = file_sha256(path) if cache is not None else None
+    if cache is not None:
+        digests = cache.file_digests(extractor, sha)
+        if digests is not None:
+            found = cache.get_many(extractor, list(dict.fromkeys(digests)))
+            if all(d in found for d in digests):
+                return [found[d] for d in digests]
+
+    t0 = time.perf_counter()
+    doc = BACKENDS[extractor](path)
+    try:
+        n = len(doc)
+        if cache is None:
+            digests, found = [], {}
+        else:
+            digests = [doc.digest(i) for i in range(n)]
+            found = cache.get_many(extractor, list(dict.fromkeys(digests)))
+        # one extraction per distinct missing page (repeated pages, e.g. blank ones)
+        todo, seen = [], set()
+        for i in range(n):
+            d = digests[i] if digests else None
+            if d not in found and d not in seen:
+                todo.append(i)
+                if d is not None:
+                    seen.add(d)
+
+        workers = workers if workers is not None else settings.pdf_page_workers
+        workers = workers or os.cpu_count() or 1
+        parallel = (workers > 1 and len(todo) >= settings.pdf_parallel_min_pages
+                    and not mp.current_process().daemon)
+        texts = None if parallel else [doc.text(i) for i in todo]
+    finally:
+        doc.close()
+    if texts is None:
+        texts = _extract_parallel(path, extractor, todo, workers)
+
+    if cache is None:
+        return texts
+    fresh = [(digests[i], text) for i, text in zip(todo, texts)]
+    cache.put_many(extractor, fresh)
+    cache.put_file(extractor, sha, digests)
+    found.update(fresh)
+    log.info(f"{path.name}: {n} pages, {n - len(todo)} cached, {len(todo)} extracted "
+             f"with {extractor} in {(time.perf_counter() - t0) * 1000:.0f}ms")
+    return [found[d] for d in digests]
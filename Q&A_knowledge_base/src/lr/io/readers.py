@@ -1,37 +1,100 @@
+import csv
+import io
 from pathlib import Path
-from pypdf import PdfReader
-import pandas as pd
-from unstructured.partition.auto import partition
-from .splitter import split_text
+from typing import Iterable, Iterator
+from .splitter import split_spans
+from .manifest import Manifest, source_of
+from .parse_pool import parse_files
+from .pdf import extract_pages
+from ..config import settings
 
-def read_any(path: Path) -> list[str]:
+# the parsers (pandas, pypdf/pymupdf, unstructured) are imported where they are used: the API
+# imports this module, but only an ingest ever parses anything
+
+# tabular suffix -> separator
+TABLE_SEPARATORS = {".csv": ",", ".tsv": "\t"}
+# row blocks per pandas read: keeps parser overhead low, memory still bounded
+_BLOCKS_PER_READ = 100
+
+def iter_table_blocks(path: Path, rows: int | None = None) -> Iterator[str]:
+    """
+    CSV/TSV as blocks of `rows` rows, each with the header line, read in row groups
+    so a multi-GB export never sits in memory. Values are kept as written (no dtype
+    inference, empty stays empty).
+    """
+    import pandas as pd
+    rows = max(1, rows or settings.table_rows_per_chunk)
+    sep = TABLE_SEPARATORS[path.suffix.lower()]
+    try:
+        reader = pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False,
+                             encoding_errors="ignore", chunksize=rows * _BLOCKS_PER_READ)
+    except pd.errors.EmptyDataError:
+        return
+    with reader:
+        for group in reader:
+            header, values = list(group.columns), group.values.tolist()
+            for i in range(0, len(values), rows):
+                # csv.writer: ~3x faster than DataFrame.to_csv on small blocks
+                buf = io.StringIO()
+                w = csv.writer(buf, delimiter=sep, lineterminator="\n")
+                w.writerow(header)
+                w.writerows(values[i:i + rows])
+                yield buf.getvalue()
+
+def read_documents(path: Path) -> Iterable[str]:
+    # full text of each document in the file, before chunking; a table is a lazy
+    # stream of row blocks (one document each)
     suf = path.suffix.lower()
+    if suf in TABLE_SEPARATORS:
+        return iter_table_blocks(path)
+
     if suf == ".pdf":
-        reader = PdfReader(str(path))
-        txt = "\n".join([p.extract_text() or "" for p in reader.pages])
-        return split_text(txt)
+        return ["\n".join(extract_pages(path))]
 
     if suf in {".md", ".txt"}:
-        return split_text(path.read_text(encoding="utf-8", errors="ignore"))
-
-    if suf == ".csv":
-        # Keep CSV intact per file (useful for “structured” questions)
-        df = pd.read_csv(path)
-        # Convert small CSV to markdown-like preview; large CSV gets head()
-        if len(df) > 2000:
-            df = df.head(2000)
-        return [df.to_csv(index=False)]
+        return [path.read_text(encoding="utf-8", errors="ignore")]
 
     # Fallback to unstructured for html/docx/others
+    from unstructured.partition.auto import partition
     els = partition(filename=str(path))
-    text = "\n".join(getattr(e, "text", "") for e in els if getattr(e, "text", None))
-    return split_text(text)
+    return ["\n".join(getattr(e, "text", "") for e in els if getattr(e, "text", None))]
+
+def read_spans(path: Path) -> Iterable[tuple[str, list[tuple[int, int]]]]:
+    # [(document, chunk offsets)]; a row block is one chunk. Tables stay lazy: they are
+    # light files, so parse_files reads them in this process as the consumer iterates.
+    if path.suffix.lower() in TABLE_SEPARATORS:
+        return ((block, [(0, len(block))]) for block in read_documents(path))
+    return [(doc, split_spans(doc)) for doc in read_documents(path)]
 
-def gather_input(folder: str) -> list[tuple[str, str]]:
+def read_any(path: Path) -> list[str]:
+    return [doc[s:e] for doc, spans in read_spans(path) for s, e in spans]
+
+def iter_input(folder: str, manifest: Manifest | None = None) -> Iterator[tuple[str, str, dict]]:
+    """
+    Lazy (key, chunk, ref): files are parsed at most a small window ahead of the consumer.
+    key = "<source>::<chunk no>", source being the file's absolute path (see source_of).
+    ref = {"doc_no", "doc", "start", "end"} locates the chunk in its document, so the
+    pipeline can store the document once instead of every (overlapping) chunk.
+    """
     base = Path(folder)
-    files = [p for p in base.rglob("*") if p.is_file()]
-    out: list[tuple[str, str]] = []
-    for p in files:
-        for idx, chunk in enumerate(read_any(p)):
-            out.append((f"{p.name}::{idx}", chunk))
-    return out
+    files = sorted(p for p in base.rglob("*") if p.is_file())
+    if manifest is not None:
+        # only new/changed files are read; the manifest remembers what to delete
+        files = manifest.diff(base, files)
+    parsed = parse_files(
+        files,
+        read_spans,
+        workers=settings.parse_workers,
+        timeout=settings.parse_timeout_s,
+        on_timeout=manifest.discard if manifest is not None else None,
+    )
+    for p, docs in parsed:
+        source, idx = source_of(p), 0
+        for doc_no, (doc, spans) in enumerate(docs):
+            for start, end in spans:
+                ref = {"doc_no": doc_no, "doc": doc, "start": start, "end": end}
+                yield (f"{source}::{idx}", doc[start:end], ref)
+                idx += 1
+
+def gather_input(folder: str, manifest: Manifest | None = None) -> list[tuple[str, str]]:
+    return [(key, chunk) for key, chunk, _ in iter_input(folder, manifest=manifest)]
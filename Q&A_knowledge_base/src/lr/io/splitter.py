@@ -1,7 +1,15 @@
-def split_text(text: str, max_len: int = 900, overlap: int = 120):
-    chunks, i, n = [], 0, len(text)
+def split_spans(text: str, max_len: int = 900, overlap: int = 120) -> list[tuple[int, int]]:
+    # (start, end) offsets of each stripped chunk, so chunks can be cut back out of `text`
+    spans, i, n = [], 0, len(text)
     step = max_len - overlap
     while i < n:
-        chunks.append(text[i:i+max_len])
+        c = text[i:i+max_len]
+        lead = len(c) - len(c.lstrip())
+        trail = len(c) - len(c.rstrip())
+        if lead < len(c):
+            spans.append((i + lead, i + len(c) - trail))
         i += step
-    return [c.strip() for c in chunks if c.strip()]
+    return spans
+
+def split_text(text: str, max_len: int = 900, overlap: int = 120):
+    return [text[s:e] for s, e in split_spans(text, max_len, overlap)]
@@ -0,0 +1,200 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+from .config import settings
+from .io.readers import iter_input
+from .rag.pipeline import index_stream
+from .rag.retrieve import open_manifest
+
+log = logging.getLogger("lr.jobs")
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+UNFINISHED = (QUEUED, RUNNING)
+INGEST, REINDEX = "ingest", "reindex"
+
+_reindex_lock = threading.Lock()
+
+class IngestCancelled(Exception):
+    pass
+
+class JobStore:
+    """Ingest job state in SQLite, so a restart knows which jobs were in flight."""
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, folder TEXT NOT NULL, full INTEGER NOT NULL,"
+            " status TEXT NOT NULL, files_done INTEGER NOT NULL DEFAULT 0,"
+            " chunks_done INTEGER NOT NULL DEFAULT 0, cancel INTEGER NOT NULL DEFAULT 0,"
+            " created REAL NOT NULL, started REAL, finished REAL, error TEXT, result TEXT,"
+            " kind TEXT NOT NULL DEFAULT 'ingest')"
+        )
+        cols = {r["name"] for r in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "kind" not in cols:  # job stores created before reindex jobs existed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT 'ingest'")
+        self._conn.commit()
+
+    def create(self, folder: str, full: bool = False, kind: str = INGEST) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, folder, full, status, created, kind) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, folder, int(full), QUEUED, time.time(), kind),
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id: str, **fields) -> None:
+        cols = ", ".join(f"{k}=?" for k in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {cols} WHERE id=?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return _as_status(row) if row else None
+
+    def recent(self, limit: int = 50) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [_as_status(r) for r in rows]
+
+    def unfinished(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN (?, ?) AND cancel=0 ORDER BY created",
+                UNFINISHED,
+            ).fetchall()
+        return [r["id"] for r in rows]
+
+def _as_status(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["full"] = bool(job["full"])
+    job["cancel"] = bool(job["cancel"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    job["chunks_per_s"] = None
+    if job["started"]:
+        elapsed = (job["finished"] or time.time()) - job["started"]
+        if elapsed > 0:
+            job["chunks_per_s"] = round(job["chunks_done"] / elapsed, 2)
+    return job
+
+def ingest_folder(folder: str, full: bool, on_progress: Callable[[int, int], None]) -> dict:
+    manifest = open_manifest(folder, full=full)
+    return index_stream(iter_input(folder, manifest=manifest), manifest=manifest,
+                        on_progress=on_progress)
+
+def reindex_folder(folder: str, full: bool, on_progress: Callable[[int, int], None]) -> dict:
+    """
+    Rebuild the collection from `folder` into a new version and swap it in at the end.
+    The new version holds only this folder; other folders' manifests no longer match
+    the live version, so their next ingest re-adds them.
+    """
+    # one rebuild at a time: promoting drops every other version, including one in progress
+    with _reindex_lock:
+        manifest = open_manifest(folder, full=True)
+        return index_stream(iter_input(folder, manifest=manifest), manifest=manifest,
+                            on_progress=on_progress, rebuild=True)
+
+class JobRunner:
+    """
+    Runs ingest jobs on a bounded thread pool. Cancellation is cooperative: the
+    pipeline checks it after every batch. On shutdown, running jobs go back to
+    `queued` and `resume()` picks them up on the next start (ingest is idempotent).
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, ingest: Callable = ingest_folder,
+                 reindex: Callable = reindex_folder):
+        self.store = store
+        self.tasks = {INGEST: ingest, REINDEX: reindex}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="lr-job")
+        self._cancel: dict[str, threading.Event] = {}
+        self._stopping = False
+
+    def submit(self, folder: str, full: bool = False, kind: str = INGEST) -> str:
+        job_id = self.store.create(folder, full, kind)
+        self._enqueue(job_id)
+        return job_id
+
+    def resume(self) -> list[str]:
+        ids = self.store.unfinished()
+        for job_id in ids:
+            self.store.update(job_id, status=QUEUED)
+            self._enqueue(job_id)
+        if ids:
+            log.info(f"resumed {len(ids)} unfinished ingest job(s)")
+        return ids
+
+    def cancel(self, job_id: str) -> dict | None:
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in UNFINISHED:
+            return job
+        self.store.update(job_id, cancel=1)
+        if job_id in self._cancel:
+            self._cancel[job_id].set()
+        return self.store.get(job_id)
+
+    def shutdown(self) -> None:
+        self._stopping = True
+        for ev in self._cancel.values():
+            ev.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _enqueue(self, job_id: str) -> None:
+        self._cancel[job_id] = threading.Event()
+        self._pool.submit(self._run, job_id)
+
+    def _run(self, job_id: str) -> None:
+        stop = self._cancel[job_id]
+        job = self.store.get(job_id)
+        try:
+            if job["cancel"] or stop.is_set():
+                raise IngestCancelled()
+            self.store.update(job_id, status=RUNNING, started=time.time(), error=None)
+
+            def progress(files: int, chunks: int) -> None:
+                self.store.update(job_id, files_done=files, chunks_done=chunks)
+                if stop.is_set():
+                    raise IngestCancelled()
+
+            res = self.tasks[job["kind"]](job["folder"], job["full"], progress)
+            fields = {"status": DONE, "finished": time.time(), "result": json.dumps(res)}
+            # final counts where the task reports them; otherwise the last progress stands
+            counts = {"files_done": res.get("files_indexed"), "chunks_done": res.get("chunks_indexed")}
+            fields.update({k: v for k, v in counts.items() if v is not None})
+            self.store.update(job_id, **fields)
+            log.info(f"job {job_id} done: {res}")
+        except IngestCancelled:
+            if self._stopping and not self.store.get(job_id)["cancel"]:
+                self.store.update(job_id, status=QUEUED)  # interrupted by shutdown
+            else:
+                self.store.update(job_id, status=CANCELLED, finished=time.time())
+                log.info(f"job {job_id} cancelled")
+        except Exception as e:
+            log.exception(f"job {job_id} failed")
+            self.store.update(job_id, status=FAILED, finished=time.time(), error=str(e))
+        finally:
+            self._cancel.pop(job_id, None)
+
+_runner: JobRunner | None = None
+
+def get_runner() -> JobRunner:
+    global _runner
+    if _runner is None:
+        store = JobStore(Path(settings.data_dir) / "jobs.sqlite")
+        _runner = JobRunner(store, workers=settings.ingest_job_workers)
+    return _runner
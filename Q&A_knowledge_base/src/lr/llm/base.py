@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Iterator, AsyncIterator
 
 class Embeddings(ABC):
     @abstractmethod
@@ -8,3 +8,24 @@ class Embeddings(ABC):
 class Chat(ABC):
     @abstractmethod
     def chat(self, messages: List[Dict[str, str]]) -> str: ...
+
+    def stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+        # backends without token streaming yield the whole answer at once
+        yield self.chat(messages)
+
+# async twins, used by the API request path
+
+class AsyncEmbeddings(ABC):
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> List[List[float]]: ...
+
+class AsyncChat(ABC):
+    @abstractmethod
+    async def chat(self, messages: List[Dict[str, str]]) -> str: ...
+
+    async def warm(self) -> None:
+        # called once at API startup (see lr.warmup): load the model, open connections
+        return None
+
+    async def stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        yield await self.chat(messages)
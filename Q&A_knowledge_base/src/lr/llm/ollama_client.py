@@ -1,42 +1,294 @@
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 import httpx
-from .base import Embeddings, Chat
+from .base import Embeddings, Chat, AsyncEmbeddings, AsyncChat
 from ..config import settings
 
+log = logging.getLogger("lr.llm.ollama")
+
 _client = httpx.Client(base_url=settings.ollama_base.rstrip("/"), timeout=600)
+# created on first use, inside the running event loop; closed by aclose()
+_aclient: httpx.AsyncClient | None = None
+
+def get_async_client() -> httpx.AsyncClient:
+    global _aclient
+    if _aclient is None:
+        _aclient = httpx.AsyncClient(base_url=settings.ollama_base.rstrip("/"), timeout=600)
+    return _aclient
+
+async def aclose() -> None:
+    global _aclient
+    if _aclient is not None:
+        await _aclient.aclose()
+        _aclient = None
+
+# transient statuses worth retrying (Ollama returns 503 while a model is loading)
+_RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+def _post_json(client: httpx.Client, path: str, body: dict, retries: int, backoff: float) -> dict:
+    attempt = 0
+    while True:
+        try:
+            r = client.post(path, json=body)
+            if r.status_code not in _RETRY_STATUS:
+                r.raise_for_status()
+                return r.json()
+            err: Exception = httpx.HTTPStatusError(
+                f"{r.status_code} from {path}", request=r.request, response=r
+            )
+        except httpx.TransportError as e:
+            err = e
+        if attempt >= retries:
+            raise err
+        delay = backoff * (2 ** attempt)
+        log.warning(f"POST {path} failed ({err}); retry {attempt + 1}/{retries} in {delay:.2f}s")
+        time.sleep(delay)
+        attempt += 1
+
+async def _apost_json(
+    client: httpx.AsyncClient, path: str, body: dict, retries: int, backoff: float
+) -> dict:
+    attempt = 0
+    while True:
+        try:
+            r = await client.post(path, json=body)
+            if r.status_code not in _RETRY_STATUS:
+                r.raise_for_status()
+                return r.json()
+            err: Exception = httpx.HTTPStatusError(
+                f"{r.status_code} from {path}", request=r.request, response=r
+            )
+        except httpx.TransportError as e:
+            err = e
+        if attempt >= retries:
+            raise err
+        delay = backoff * (2 ** attempt)
+        log.warning(f"POST {path} failed ({err}); retry {attempt + 1}/{retries} in {delay:.2f}s")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+def _single_vector(js: dict) -> list[float]:
+    # Ollama: {"embedding":[...]}
+    if "embedding" in js:
+        return js["embedding"]
+    # Some proxies/alt servers: {"data":[{"embedding":[...]}]}
+    if "data" in js and isinstance(js["data"], list) and js["data"]:
+        return js["data"][0]["embedding"]
+    raise RuntimeError(f"Unexpected embeddings response from Ollama: {js}")
+
+def _batch_vectors(js: dict) -> list[list[float]]:
+    # Ollama >= 0.3: {"embeddings":[[...], ...]}
+    if isinstance(js.get("embeddings"), list):
+        return js["embeddings"]
+    if isinstance(js.get("data"), list):
+        return [d["embedding"] for d in js["data"]]
+    raise RuntimeError(f"Unexpected embed response from Ollama: {js}")
 
 class OllamaEmbeddings(Embeddings):
+    """
+    Batches texts into /api/embed calls (one request per `batch_size` texts) and keeps
+    up to `concurrency` batches in flight. Output order always matches input order.
+    Servers without /api/embed fall back to one /api/embeddings call per text.
+    """
+
+    def __init__(
+        self,
+        client: httpx.Client | None = None,
+        model: str | None = None,
+        batch_size: int | None = None,
+        concurrency: int | None = None,
+        retries: int | None = None,
+        backoff: float | None = None,
+    ):
+        self.client = client or _client
+        self.model = model or settings.ollama_embed_model
+        self.batch_size = max(1, batch_size or settings.ollama_embed_batch_size)
+        self.concurrency = max(1, concurrency or settings.ollama_embed_concurrency)
+        self.retries = settings.ollama_embed_retries if retries is None else retries
+        self.backoff = settings.ollama_embed_backoff if backoff is None else backoff
+        self._batch_api = True  # flipped off once the server 404s /api/embed
+
     def embed(self, texts):
         # Accept str or list[str]
         if isinstance(texts, str):
             texts = [texts]
+        texts = list(texts)
+        if not texts:
+            return []
 
-        vectors: list[list[float]] = []
-        for t in texts:
-            r = _client.post("/api/embeddings", json={
-                "model": settings.ollama_embed_model,
-                "prompt": t
-            })
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1 or self.concurrency == 1:
+            results = [self._embed_batch(b) for b in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches))) as pool:
+                results = list(pool.map(self._embed_batch, batches))  # map keeps order
+        return [v for batch in results for v in batch]
 
-            r.raise_for_status()
-            js = r.json()
-            # Ollama: {"embedding":[...]}
-            if "embedding" in js:
-                vectors.append(js["embedding"])
-            # Some proxies/alt servers: {"data":[{"embedding":[...]}]}
-            elif "data" in js and isinstance(js["data"], list) and js["data"]:
-                vectors.append(js["data"][0]["embedding"])
+    def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        if self._batch_api:
+            try:
+                js = _post_json(self.client, "/api/embed", {
+                    "model": self.model,
+                    "input": batch,
+                }, self.retries, self.backoff)
+            except httpx.HTTPStatusError as e:
+                # a missing model is also a 404 -> that is a real error, not an old server
+                if e.response.status_code != 404 or "model" in e.response.text.lower():
+                    raise
+                log.info("/api/embed not available; falling back to /api/embeddings per text")
+                self._batch_api = False
             else:
-                raise RuntimeError(
-                    f"Unexpected embeddings response from Ollama: {js}"
-                )
-        return vectors
-    
+                vecs = _batch_vectors(js)
+                if len(vecs) != len(batch):
+                    raise RuntimeError(
+                        f"Ollama returned {len(vecs)} embeddings for {len(batch)} inputs"
+                    )
+                return vecs
+
+        return [
+            _single_vector(_post_json(self.client, "/api/embeddings", {
+                "model": self.model,
+                "prompt": t,
+            }, self.retries, self.backoff))
+            for t in batch
+        ]
+
 class OllamaChat(Chat):
+    def __init__(self, client: httpx.Client | None = None, model: str | None = None):
+        self.client = client or _client
+        self.model = model or settings.ollama_chat_model
+
     def chat(self, messages):
-        r = _client.post("/api/chat", json={
-            "model": settings.ollama_chat_model,
+        r = self.client.post("/api/chat", json={
+            "model": self.model,
+            "messages": messages,
+            "stream": False
+        })
+        r.raise_for_status()
+        return r.json()["message"]["content"]
+
+    def stream(self, messages):
+        # Ollama streams NDJSON: one {"message":{"content":"..."},"done":false} per token
+        with self.client.stream("POST", "/api/chat", json={
+            "model": self.model,
+            "messages": messages,
+            "stream": True
+        }) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line:
+                    continue
+                js = json.loads(line)
+                if "error" in js:
+                    raise RuntimeError(f"Ollama chat error: {js['error']}")
+                piece = (js.get("message") or {}).get("content")
+                if piece:
+                    yield piece
+                if js.get("done"):
+                    break
+
+class AsyncOllamaEmbeddings(AsyncEmbeddings):
+    """Async OllamaEmbeddings: same batching/retry rules, batches awaited concurrently."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient | None = None,
+        model: str | None = None,
+        batch_size: int | None = None,
+        concurrency: int | None = None,
+        retries: int | None = None,
+        backoff: float | None = None,
+    ):
+        self.client = client or get_async_client()
+        self.model = model or settings.ollama_embed_model
+        self.batch_size = max(1, batch_size or settings.ollama_embed_batch_size)
+        self.concurrency = max(1, concurrency or settings.ollama_embed_concurrency)
+        self.retries = settings.ollama_embed_retries if retries is None else retries
+        self.backoff = settings.ollama_embed_backoff if backoff is None else backoff
+        self._batch_api = True
+
+    async def embed(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        texts = list(texts)
+        if not texts:
+            return []
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        sem = asyncio.Semaphore(self.concurrency)
+
+        async def run(batch):
+            async with sem:
+                return await self._embed_batch(batch)
+
+        results = await asyncio.gather(*(run(b) for b in batches))  # gather keeps order
+        return [v for batch in results for v in batch]
+
+    async def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        if self._batch_api:
+            try:
+                js = await _apost_json(self.client, "/api/embed", {
+                    "model": self.model,
+                    "input": batch,
+                }, self.retries, self.backoff)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 404 or "model" in e.response.text.lower():
+                    raise
+                log.info("/api/embed not available; falling back to /api/embeddings per text")
+                self._batch_api = False
+            else:
+                vecs = _batch_vectors(js)
+                if len(vecs) != len(batch):
+                    raise RuntimeError(
+                        f"Ollama returned {len(vecs)} embeddings for {len(batch)} inputs"
+                    )
+                return vecs
+
+        return [
+            _single_vector(await _apost_json(self.client, "/api/embeddings", {
+                "model": self.model,
+                "prompt": t,
+            }, self.retries, self.backoff))
+            for t in batch
+        ]
+
+class AsyncOllamaChat(AsyncChat):
+    def __init__(self, client: httpx.AsyncClient | None = None, model: str | None = None):
+        self.client = client or get_async_client()
+        self.model = model or settings.ollama_chat_model
+
+    async def chat(self, messages):
+        r = await self.client.post("/api/chat", json={
+            "model": self.model,
             "messages": messages,
             "stream": False
         })
         r.raise_for_status()
         return r.json()["message"]["content"]
+
+    async def warm(self):
+        # a chat request without messages only loads the model into memory
+        r = await self.client.post("/api/chat", json={"model": self.model, "messages": []})
+        r.raise_for_status()
+
+    async def stream(self, messages):
+        async with self.client.stream("POST", "/api/chat", json={
+            "model": self.model,
+            "messages": messages,
+            "stream": True
+        }) as r:
+            r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line:
+                    continue
+                js = json.loads(line)
+                if "error" in js:
+                    raise RuntimeError(f"Ollama chat error: {js['error']}")
+                piece = (js.get("message") or {}).get("content")
+                if piece:
+                    yield piece
+                if js.get("done"):
+                    break
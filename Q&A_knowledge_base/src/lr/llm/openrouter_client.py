@@ -1,16 +1,78 @@
-from openai import OpenAI
-from .base import Embeddings, Chat
+from typing import TYPE_CHECKING
+from .base import Embeddings, Chat, AsyncEmbeddings, AsyncChat
 from ..config import settings
 
-client = OpenAI(base_url=settings.openrouter_base, api_key=settings.openrouter_api_key)
+if TYPE_CHECKING:
+    from openai import OpenAI, AsyncOpenAI
+
+# the openai package is imported with the first client: Ollama-only setups never load it
+_client: "OpenAI | None" = None
+# created on first use, inside the running event loop; closed by aclose()
+_aclient: "AsyncOpenAI | None" = None
+
+def get_client() -> "OpenAI":
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(base_url=settings.openrouter_base, api_key=settings.openrouter_api_key)
+    return _client
+
+def get_async_client() -> "AsyncOpenAI":
+    global _aclient
+    if _aclient is None:
+        from openai import AsyncOpenAI
+        _aclient = AsyncOpenAI(base_url=settings.openrouter_base, api_key=settings.openrouter_api_key)
+    return _aclient
+
+async def aclose() -> None:
+    global _aclient
+    if _aclient is not None:
+        await _aclient.close()
+        _aclient = None
 
 class OpenRouterEmbeddings(Embeddings):
+    def __init__(self, model: str | None = None):
+        self.model = model or settings.openrouter_embed_model
+
     def embed(self, texts):
-        resp = client.embeddings.create(model=settings.openrouter_embed_model, input=texts)
+        resp = get_client().embeddings.create(model=self.model, input=texts)
         return [d.embedding for d in resp.data]
 
 class OpenRouterChat(Chat):
     def chat(self, messages):
         # messages: [{"role": "system"/"user"/"assistant", "content": "..."}]
-        resp = client.chat.completions.create(model=settings.openrouter_chat_model, messages=messages)
+        resp = get_client().chat.completions.create(model=settings.openrouter_chat_model, messages=messages)
+        return resp.choices[0].message.content
+
+    def stream(self, messages):
+        resp = get_client().chat.completions.create(
+            model=settings.openrouter_chat_model, messages=messages, stream=True
+        )
+        for chunk in resp:
+            piece = chunk.choices[0].delta.content if chunk.choices else None
+            if piece:
+                yield piece
+
+class AsyncOpenRouterEmbeddings(AsyncEmbeddings):
+    def __init__(self, model: str | None = None):
+        self.model = model or settings.openrouter_embed_model
+
+    async def embed(self, texts):
+        resp = await get_async_client().embeddings.create(model=self.model, input=texts)
+        return [d.embedding for d in resp.data]
+
+class AsyncOpenRouterChat(AsyncChat):
+    async def chat(self, messages):
+        resp = await get_async_client().chat.completions.create(
+            model=settings.openrouter_chat_model, messages=messages
+        )
         return resp.choices[0].message.content
+
+    async def stream(self, messages):
+        resp = await get_async_client().chat.completions.create(
+            model=settings.openrouter_chat_model, messages=messages, stream=True
+        )
+        async for chunk in resp:
+            piece = chunk.choices[0].delta.content if chunk.choices else None
+            if piece:
+                yield piece
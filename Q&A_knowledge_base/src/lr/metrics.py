@@ -0,0 +1,105 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# seconds; from a cached query embedding up to a slow local LLM or a large ingest
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+
+class Histogram:
+    """
+    Prometheus-style histogram with fixed label names (text exposition format only,
+    so no client library is needed). Safe to observe from any thread.
+    """
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [count per bucket (+Inf last), sum]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            counts, _ = series = self._series.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            counts[bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+        for key, (counts, total) in sorted(series.items()):
+            base = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, key)]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                labels = ",".join(base + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {cumulative}")
+            labels = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Counter:
+    """Prometheus-style counter with fixed label names."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            labels = ",".join(f'{name}="{_escape(v)}"' for name, v in zip(self.labels, key))
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+STAGE_SECONDS = Histogram(
+    "lr_stage_duration_seconds", "Time spent in one stage of a request.", ("endpoint", "stage"),
+)
+REQUEST_SECONDS = Histogram(
+    "lr_request_duration_seconds", "End-to-end request time.", ("endpoint",),
+)
+REJECTED = Counter(
+    "lr_admission_rejected_total", "Requests turned away by LLM admission control.", ("reason",),
+)
+_ALL = (REQUEST_SECONDS, STAGE_SECONDS, REJECTED)
+
+def ms_since(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 2)
+
+@contextmanager
+def stage(timings: dict, name: str):
+    """Adds the block's wall time to timings[f"{name}_ms"]."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[f"{name}_ms"] = round(timings.get(f"{name}_ms", 0.0) + ms_since(t0), 2)
+
+def observe(endpoint: str, timings: dict) -> None:
+    # timings as filled by retrieve/answer/index_stream: {"embed_ms": 12.3, ..., "total_ms": ...}
+    for key, ms in timings.items():
+        if not key.endswith("_ms"):
+            continue
+        name = key[:-3]
+        if name == "total":
+            REQUEST_SECONDS.observe(ms / 1000, endpoint=endpoint)
+        else:
+            STAGE_SECONDS.observe(ms / 1000, endpoint=endpoint, stage=name)
+
+def render() -> str:
+    return "\n".join(line for metric in _ALL for line in metric.render()) + "\n"
@@ -1,13 +1,35 @@
+import asyncio
+import logging
+import time
+from typing import Iterator, AsyncIterator
+from ..admission import SingleFlight, get_llm_gate
 from ..config import settings
-from ..llm.ollama_client import OllamaChat
-from ..llm.openrouter_client import OpenRouterChat
-from .retrieve import retrieve
+from ..llm.ollama_client import OllamaChat, AsyncOllamaChat
+from ..llm.openrouter_client import OpenRouterChat, AsyncOpenRouterChat
+from ..metrics import stage, ms_since
+from .answer_cache import get_answer_cache, cache_key
+from .context import pack
+from .retrieve import (
+    retrieve, aretrieve, aretrieve_batch, query_target, embed_query, aembed_query, aembed_queries,
+)
+
+log = logging.getLogger("lr.rag.answer")
 
 def get_chat():
     if settings.provider == "openrouter":
         return OpenRouterChat()
     return OllamaChat()
 
+def get_async_chat():
+    if settings.provider == "openrouter":
+        return AsyncOpenRouterChat()
+    return AsyncOllamaChat()
+
+def chat_model_name() -> str:
+    if settings.provider == "openrouter":
+        return settings.openrouter_chat_model
+    return settings.ollama_chat_model
+
 SYSTEM_PROMPT = (
     "Role: Local-first RAG Copilot.\n"
     "Answer using only the retrieved context.\n"
@@ -20,38 +42,233 @@ SYSTEM_PROMPT = (
     "• Never browse the web or invent sources\n"
 )
 
-def answer(query: str, only_ext: str | None = None):
-    # stricter retrieval — favor PDFs if you're asking about PDFs
-    hits = retrieve(query, k=6, only_ext=only_ext, min_score=0.25)
+NO_CONTEXT = {
+    "answer": "I don’t know",
+    "bullets": [],
+    "next_step": "ingest more files into ./input (especially relevant PDFs/CSVs).",
+    "used_chunks": [],
+}
 
-    if not hits:
-        return {
-            "answer": "I don’t know",
-            "bullets": [],
-            "next_step": "ingest more files into ./input (especially relevant PDFs/CSVs).",
-            "used_chunks": [],
-        }
-
-    # Build a compact context with [#] tags
-    blocks = []
-    used = []
-    for idx, (pid, score, pl) in enumerate(hits, start=1):
-        src = f"{pl.get('source','?')}::{pl.get('chunk',0)}"
-        snippet = pl.get("text","").strip().replace("\n", " ")[:900]
-        blocks.append(f"[{idx}] {snippet}")
-        used.append({"source": pl.get("source"), "chunk": pl.get("chunk"), "score": round(score, 4)})
-
-    context = "\n\n".join(blocks)
-
-    messages = [
+def _messages(query: str, context: str) -> list[dict]:
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": f"Question: {query}\n\nContext:\n{context}"},
     ]
 
-    chat = OllamaChat()
-    out = chat.chat(messages)
+def _lookup(cache, query: str, q: list[float], target: tuple, only_ext: str | None,
+            timings: dict):
+    key = cache_key(target[0], only_ext, chat_model_name())
+    with stage(timings, "cache"):
+        hit = cache.get(*key, q, query)
+    return hit, {"vector": q, "target": target}, lambda res: cache.put(*key, query, q, res)
+
+def _check_cache(query: str, only_ext: str | None, timings: dict):
+    """
+    -> (cached answer or None, retrieve() kwargs, remember(result) or None). With the
+    answer cache on, the query is embedded here once and retrieval reuses the vector.
+    """
+    cache = get_answer_cache()
+    if cache is None:
+        return None, {}, None
+    target = query_target()
+    with stage(timings, "embed"):
+        q = embed_query(query, target)
+    return _lookup(cache, query, q, target, only_ext, timings)
+
+async def _acheck_cache(query: str, only_ext: str | None, timings: dict):
+    cache = get_answer_cache()
+    if cache is None:
+        return None, {}, None
+    target = query_target()
+    with stage(timings, "embed"):
+        q = await aembed_query(query, target)
+    return _lookup(cache, query, q, target, only_ext, timings)
+
+def answer(query: str, only_ext: str | None = None, timings: dict | None = None):
+    # timings (optional) receives the retrieval stages plus context_ms and llm_ms
+    timings = {} if timings is None else timings
+    cached, known, remember = _check_cache(query, only_ext, timings)
+    if cached is not None:
+        return cached
+    # stricter retrieval — favor PDFs if you're asking about PDFs
+    hits = retrieve(query, k=6, only_ext=only_ext, min_score=0.25, timings=timings, **known)
+
+    if not hits:
+        return dict(NO_CONTEXT)
+
+    with stage(timings, "context"):
+        context, used = pack(hits)
+    with stage(timings, "llm"):
+        out = get_chat().chat(_messages(query, context))
+
+    res = {
+        "answer": out,
+        "used_chunks": used,
+    }
+    if remember is not None:
+        remember(res)
+    return res
+
+def _replay(cached: dict) -> Iterator[tuple[str, object]]:
+    yield "sources", cached["used_chunks"]
+    yield "token", cached["answer"]
+    yield "done", {"cached": True}
+
+def answer_stream(query: str, only_ext: str | None = None,
+                  timings: dict | None = None) -> Iterator[tuple[str, object]]:
+    """
+    Same as answer(), as events: ("sources", used_chunks) as soon as retrieval is done,
+    then ("token", text) per generated piece, then ("done", extra).
+    """
+    timings = {} if timings is None else timings
+    cached, known, remember = _check_cache(query, only_ext, timings)
+    if cached is not None:
+        yield from _replay(cached)
+        return
+    hits = retrieve(query, k=6, only_ext=only_ext, min_score=0.25, timings=timings, **known)
+
+    if not hits:
+        yield "sources", []
+        yield "token", NO_CONTEXT["answer"]
+        yield "done", {"next_step": NO_CONTEXT["next_step"]}
+        return
+
+    with stage(timings, "context"):
+        context, used = pack(hits)
+    yield "sources", used
+    # llm_ms: first request byte to last token (includes the time the consumer holds each token)
+    pieces = []
+    with stage(timings, "llm"):
+        for piece in get_chat().stream(_messages(query, context)):
+            pieces.append(piece)
+            yield "token", piece
+    if remember is not None:
+        remember({"answer": "".join(pieces), "used_chunks": used})
+    yield "done", {}
+
+# identical questions in flight: one embed/search/generation, every asker gets its answer
+_flights = SingleFlight()
+
+async def aanswer(query: str, only_ext: str | None = None, timings: dict | None = None):
+    """
+    answer() for the API. The generation waits for an LLM slot (admission.get_llm_gate;
+    queue_ms) and raises admission.Overloaded when there is none. With ASK_COALESCE, a
+    question already being answered is not asked again: the caller shares that answer
+    and its timings only get coalesced_ms (the wait).
+    """
+    timings = {} if timings is None else timings
+    if not settings.ask_coalesce:
+        return await _aanswer(query, only_ext, timings)
+    t0 = time.perf_counter()
+    res, shared = await _flights.run((query, (only_ext or "").lower()),
+                                     lambda: _aanswer(query, only_ext, timings))
+    if shared:
+        timings["coalesced_ms"] = ms_since(t0)
+    return dict(res)  # callers add their own keys (e.g. timings)
+
+async def _aanswer(query: str, only_ext: str | None, timings: dict):
+    cached, known, remember = await _acheck_cache(query, only_ext, timings)
+    if cached is not None:
+        return cached
+    hits = await aretrieve(query, k=6, only_ext=only_ext, min_score=0.25, timings=timings, **known)
+    if not hits:
+        return dict(NO_CONTEXT)
 
-    return {
+    with stage(timings, "context"):
+        context, used = pack(hits)
+    async with get_llm_gate().slot(timings):
+        with stage(timings, "llm"):
+            out = await get_async_chat().chat(_messages(query, context))
+    res = {
         "answer": out,
         "used_chunks": used,
     }
+    if remember is not None:
+        remember(res)
+    return res
+
+async def aanswer_stream(query: str, only_ext: str | None = None,
+                         timings: dict | None = None) -> AsyncIterator[tuple[str, object]]:
+    timings = {} if timings is None else timings
+    cached, known, remember = await _acheck_cache(query, only_ext, timings)
+    if cached is not None:
+        for event in _replay(cached):
+            yield event
+        return
+    hits = await aretrieve(query, k=6, only_ext=only_ext, min_score=0.25, timings=timings, **known)
+    if not hits:
+        yield "sources", []
+        yield "token", NO_CONTEXT["answer"]
+        yield "done", {"next_step": NO_CONTEXT["next_step"]}
+        return
+
+    with stage(timings, "context"):
+        context, used = pack(hits)
+    yield "sources", used
+    pieces = []
+    # the slot is held until the last token (or until the client goes away)
+    async with get_llm_gate().slot(timings):
+        with stage(timings, "llm"):
+            async for piece in get_async_chat().stream(_messages(query, context)):
+                pieces.append(piece)
+                yield "token", piece
+    if remember is not None:
+        remember({"answer": "".join(pieces), "used_chunks": used})
+    yield "done", {}
+
+async def aanswer_batch(queries: list[str], only_ext: str | None = None,
+                        timings: dict | None = None, concurrency: int | None = None) -> list[dict]:
+    """
+    aanswer() for many questions: one embedding call, one batched search for the ones
+    the answer cache does not know, then at most `concurrency` (ASK_BATCH_CONCURRENCY)
+    generations at a time. These also take LLM slots, but wait for them instead of
+    being turned away. A question that fails gets {"error": ...}; the rest still get
+    answers. Results are in input order, each with its "query".
+    """
+    timings = {} if timings is None else timings
+    unique = list(dict.fromkeys(queries))  # a repeated question is answered once
+    target = query_target()
+    with stage(timings, "embed"):
+        vectors = await aembed_queries(unique, target) if unique else []
+
+    done: dict[str, dict] = {}
+    remember = {}
+    cache = get_answer_cache()
+    if cache is not None:
+        for query, q in zip(unique, vectors):
+            hit, _, remember[query] = _lookup(cache, query, q, target, only_ext, timings)
+            if hit is not None:
+                done[query] = hit
+    todo = [(query, q) for query, q in zip(unique, vectors) if query not in done]
+    found = await aretrieve_batch([query for query, _ in todo], k=6, only_ext=only_ext,
+                                  min_score=0.25, timings=timings,
+                                  vectors=[q for _, q in todo], target=target)
+
+    chat = get_async_chat()
+    slots = asyncio.Semaphore(concurrency or settings.ask_batch_concurrency)
+
+    async def generate(query: str, hits: list) -> dict:
+        if not hits:
+            return dict(NO_CONTEXT)
+        context, used = pack(hits)
+        async with slots, get_llm_gate().slot(shed=False):
+            out = await chat.chat(_messages(query, context))
+        res = {"answer": out, "used_chunks": used}
+        if query in remember:
+            remember[query](res)
+        return res
+
+    # llm_ms: wall time of the whole generation phase
+    with stage(timings, "llm"):
+        results = await asyncio.gather(
+            *(generate(query, hits) for (query, _), hits in zip(todo, found)),
+            return_exceptions=True,
+        )
+    for (query, _), res in zip(todo, results):
+        if isinstance(res, BaseException):
+            if not isinstance(res, Exception):
+                raise res
+            log.warning(f"batch question failed: {query!r}: {res}")
+            res = {"error": str(res)}
+        done[query] = res
+    return [{"query": query, **done[query]} for query in queries]
@@ -0,0 +1,165 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+import numpy as np
+from ..config import settings
+from ..vector.registry import version_info
+
+log = logging.getLogger("lr.rag.answer_cache")
+
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+def _numbers(query: str) -> set[str]:
+    # years, versions, ids: "revenue 2022" and "revenue 2023" embed almost identically
+    return set(_NUMBER.findall(query))
+
+def _unit(vec) -> np.ndarray:
+    v = np.asarray(vec, dtype=np.float32)
+    n = float(np.linalg.norm(v))
+    return v / n if n else v
+
+class AnswerCache:
+    """
+    Earlier answers keyed by their question's embedding (SQLite). `get` returns the answer
+    of the most similar cached question in the same scope if the cosine similarity is at
+    least `threshold` and both questions name the same numbers. Rows of other collection
+    versions are purged as soon as a new version shows up; least-recently-used rows go
+    once `max_entries` is exceeded.
+
+    Similar is not the same question: two that differ only in a name ("Alice's quota"
+    vs "Bob's quota") can still score above the threshold and share an answer. Hence
+    off by default (ANSWER_CACHE).
+    """
+
+    def __init__(self, path: str | Path, threshold: float = 0.97, max_entries: int = 5000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY, version TEXT NOT NULL, scope TEXT NOT NULL,"
+            " query TEXT NOT NULL, vec BLOB NOT NULL, result TEXT NOT NULL, used INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_scope ON answers(version, scope)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS answers_used ON answers(used)")
+        self._conn.commit()
+        self._count, self._clock = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(used), 0) FROM answers"
+        ).fetchone()
+        self._version: str | None = None
+        # (version, scope) -> (row ids, unit vectors); loaded on first use, appended on put
+        self._matrices: dict[tuple[str, str], tuple[list[int], np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _switch(self, version: str) -> None:
+        # versions only move forward (new collection or generation); older rows never hit again
+        if version == self._version:
+            return
+        cur = self._conn.execute("DELETE FROM answers WHERE version != ?", (version,))
+        self._conn.commit()
+        if cur.rowcount:
+            self._count -= cur.rowcount
+            log.info(f"dropped {cur.rowcount} cached answers of older collection versions")
+        self._matrices.clear()
+        self._version = version
+
+    def _matrix(self, version: str, scope: str) -> tuple[list[int], np.ndarray]:
+        key = (version, scope)
+        if key not in self._matrices:
+            rows = self._conn.execute(
+                "SELECT id, vec FROM answers WHERE version=? AND scope=?", (version, scope)
+            ).fetchall()
+            ids = [i for i, _ in rows]
+            mat = np.frombuffer(b"".join(b for _, b in rows), dtype=np.float32)
+            self._matrices[key] = (ids, mat.reshape(len(rows), -1) if rows else mat)
+        return self._matrices[key]
+
+    def get(self, version: str, scope: str, vec, query: str) -> dict | None:
+        q = _unit(vec)
+        want = _numbers(query)
+        with self._lock:
+            self._switch(version)
+            ids, mat = self._matrix(version, scope)
+            if not ids or mat.shape[1] != len(q):
+                return None
+            sims = mat @ q
+            close = np.flatnonzero(sims >= self.threshold)
+            row = None
+            for i in close[np.argsort(-sims[close])]:
+                found = self._conn.execute(
+                    "SELECT query, result FROM answers WHERE id=?", (ids[i],)
+                ).fetchone()
+                # None: evicted since the matrix was loaded
+                if found is not None and _numbers(found[0]) == want:
+                    row, best = found, int(i)
+                    break
+            if row is None:
+                return None
+            self._clock += 1
+            self._conn.execute("UPDATE answers SET used=? WHERE id=?", (self._clock, ids[best]))
+            self._conn.commit()
+        log.info(f"answer cache hit sim={sims[best]:.3f} cached_query={row[0]!r}")
+        return {**json.loads(row[1]), "cached": True, "similarity": round(float(sims[best]), 4)}
+
+    def put(self, version: str, scope: str, query: str, vec, result: dict) -> None:
+        q = _unit(vec)
+        with self._lock:
+            self._switch(version)
+            self._clock += 1
+            cur = self._conn.execute(
+                "INSERT INTO answers (version, scope, query, vec, result, used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (version, scope, query, q.tobytes(), json.dumps(result, ensure_ascii=False),
+                 self._clock),
+            )
+            self._count += 1
+            key = (version, scope)
+            if key in self._matrices:
+                ids, mat = self._matrices[key]
+                mat = np.vstack([mat.reshape(-1, len(q)), q])
+                self._matrices[key] = (ids + [cur.lastrowid], mat)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        over = self._count - self.max_entries
+        if over <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY used ASC LIMIT ?)",
+            (over,),
+        )
+        self._count -= over
+        self._matrices.clear()  # reloaded without the evicted rows on the next lookup
+
+def cache_key(collection: str | None, only_ext: str | None, chat_model: str) -> tuple[str, str]:
+    """(version, scope) for a question: the live version and its ingest generation, then
+    everything else that changes the answer (filter, chat provider/model, context budget)."""
+    generation = (version_info(collection) or {}).get("generation", 0)
+    scope = json.dumps([(only_ext or "").lower(), settings.provider, chat_model,
+                        settings.context_token_budget])
+    return f"{collection}#{generation}", scope
+
+_cache: AnswerCache | None = None
+_cache_lock = threading.Lock()
+
+def get_answer_cache() -> AnswerCache | None:
+    if not settings.answer_cache:
+        return None
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AnswerCache(
+                Path(settings.data_dir) / "answer_cache.sqlite",
+                threshold=settings.answer_cache_threshold,
+                max_entries=settings.answer_cache_max_entries,
+            )
+        return _cache
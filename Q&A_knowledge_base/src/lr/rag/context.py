@@ -0,0 +1,105 @@
+from collections import defaultdict
+from ..config import settings
+from .docstore import get_docstore
+
+# rough size without a tokenizer: ~4 characters per token for English prose and code
+CHARS_PER_TOKEN = 4
+# a block cut shorter than this is more noise than context; skip it and try a smaller one
+_MIN_TOKENS = 40
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+# io.splitter repeats up to 120 chars between neighbours; shorter matches are coincidence
+_MAX_OVERLAP, _MIN_OVERLAP = 400, 8
+
+def _join(a: str, b: str) -> str:
+    # drop the longest suffix of a that b starts with (the overlap between neighbour chunks)
+    for k in range(min(len(a), len(b), _MAX_OVERLAP), _MIN_OVERLAP - 1, -1):
+        if a.endswith(b[:k]):
+            return a + b[k:]
+    return f"{a} {b}"
+
+def _block(members: list[tuple[float, dict]], text: str) -> dict:
+    chunks = sorted(pl.get("chunk") for _, pl in members)
+    return {
+        "score": max(score for score, _ in members),
+        "source": members[0][1].get("source"),
+        "chunks": chunks,
+        "text": text,
+    }
+
+def merge_hits(hits: list, collection: str | None = None) -> list[dict]:
+    """
+    Groups [(id, score, payload)] hits into blocks of adjacent text, one per run of
+    overlapping/touching chunks of the same document: {"score", "source", "chunks", "text"}.
+
+    Hits with docstore offsets are merged by span and cut out of the docstore once per
+    block. Hits that carry their text (DOCSTORE=0) are merged by consecutive
+    chunk number, with the overlap between neighbours removed.
+    """
+    by_doc, by_source = defaultdict(list), defaultdict(list)
+    for _, score, pl in hits:
+        if "doc_id" in pl:
+            by_doc[pl["doc_id"]].append((pl["start"], pl["end"], score, pl))
+        else:
+            by_source[pl.get("source")].append((pl.get("chunk", 0), score, pl))
+
+    runs = []  # (doc_id, start, end, [(score, pl)])
+    for doc_id, items in by_doc.items():
+        items.sort(key=lambda x: (x[0], x[1]))
+        for start, end, score, pl in items:
+            if runs and runs[-1][0] == doc_id and start <= runs[-1][2]:
+                runs[-1][2] = max(runs[-1][2], end)
+                runs[-1][3].append((score, pl))
+            else:
+                runs.append([doc_id, start, end, [(score, pl)]])
+    texts = get_docstore(collection).spans([(d, s, e) for d, s, e, _ in runs]) if runs else []
+    blocks = [_block(members, text) for (_, _, _, members), text in zip(runs, texts)]
+
+    for items in by_source.values():
+        items.sort(key=lambda x: x[0])
+        run, text = [], ""
+        for chunk, score, pl in items:
+            if run and chunk == run[-1][1].get("chunk", 0) + 1:
+                text = _join(text, pl.get("text", ""))
+            else:
+                if run:
+                    blocks.append(_block(run, text))
+                run, text = [], pl.get("text", "")
+            run.append((score, pl))
+        if run:
+            blocks.append(_block(run, text))
+    return blocks
+
+def _truncate(text: str, tokens: int) -> str:
+    cut = text[: tokens * CHARS_PER_TOKEN - 1]
+    if " " in cut:
+        cut = cut[: cut.rindex(" ")]
+    return cut + "…"
+
+def pack(hits: list, budget: int | None = None, collection: str | None = None) -> tuple[str, list[dict]]:
+    """
+    -> (context with [#] tags, used_chunks). Blocks go in best-first until `budget`
+    tokens (CONTEXT_TOKEN_BUDGET) are used; the one that does not fit is cut to what is left.
+    """
+    left = budget or settings.context_token_budget
+    parts, used = [], []
+    for block in sorted(merge_hits(hits, collection), key=lambda b: b["score"], reverse=True):
+        text = block["text"].strip().replace("\n", " ")
+        if not text:
+            continue
+        tag = f"[{len(parts) + 1}] "
+        cost = estimate_tokens(tag + text) + 1  # + the blank line between blocks
+        if cost > left:
+            if left - estimate_tokens(tag) - 1 < _MIN_TOKENS:
+                continue
+            text = _truncate(text, left - estimate_tokens(tag) - 1)
+            cost = left
+        parts.append(tag + text)
+        left -= cost
+        entry = {"source": block["source"], "chunk": block["chunks"][0], "score": round(block["score"], 4)}
+        if len(block["chunks"]) > 1:
+            entry["chunks"] = block["chunks"]
+        used.append(entry)
+    return "\n\n".join(parts), used
@@ -0,0 +1,109 @@
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable
+from ..config import settings
+from ..vector.store import local_state_name
+
+log = logging.getLogger("lr.rag.docstore")
+
+_SQL_CHUNK = 500
+
+class DocStore:
+    """
+    Full document text, stored once per document (SQLite). Qdrant payloads only keep
+    doc_id + start/end character offsets; snippets are cut out here when needed.
+    """
+
+    def __init__(self, path: str | Path):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " doc_id TEXT PRIMARY KEY, source TEXT NOT NULL, text TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_source ON documents(source)")
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def put_many(self, docs: list[tuple[str, str, str]]) -> None:
+        """docs: [(doc_id, source, text)]; an existing doc_id is replaced."""
+        if not docs:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (doc_id, source, text) VALUES (?, ?, ?)", docs
+            )
+            self._conn.commit()
+
+    def delete_by_source(self, sources: Iterable[str]) -> None:
+        sources = list(dict.fromkeys(sources))
+        with self._lock:
+            for i in range(0, len(sources), _SQL_CHUNK):
+                part = sources[i:i + _SQL_CHUNK]
+                self._conn.execute(
+                    f"DELETE FROM documents WHERE source IN ({','.join('?' * len(part))})", part
+                )
+            self._conn.commit()
+
+    def spans(self, refs: list[tuple[str, int, int]]) -> list[str]:
+        """refs: [(doc_id, start, end)] -> snippet per ref ("" if the document is gone)."""
+        out = []
+        with self._lock:
+            for doc_id, start, end in refs:
+                # substr counts characters (1-based), same as Python str offsets
+                row = self._conn.execute(
+                    "SELECT substr(text, ?, ?) FROM documents WHERE doc_id=?",
+                    (start + 1, end - start, doc_id),
+                ).fetchone()
+                out.append(row[0] if row else "")
+        return out
+
+    def hydrate(self, hits: list) -> list:
+        """Fill payload["text"] in place for [(id, score, payload)] hits that only carry offsets."""
+        todo = [pl for _, _, pl in hits if "text" not in pl and "doc_id" in pl]
+        if todo:
+            texts = self.spans([(pl["doc_id"], pl["start"], pl["end"]) for pl in todo])
+            for pl, text in zip(todo, texts):
+                pl["text"] = text
+        return hits
+
+# one per collection version (see vector.store); the live one unless named
+_stores: dict[str, DocStore] = {}
+_stores_lock = threading.Lock()
+
+def _path(name: str) -> Path:
+    return Path(settings.data_dir) / f"docs_{name}.sqlite"
+
+def get_docstore(collection: str | None = None) -> DocStore:
+    name = local_state_name(collection)
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = DocStore(_path(name))
+        return _stores[name]
+
+def close_docstore(collection: str) -> None:
+    with _stores_lock:
+        opened = _stores.pop(collection, None)
+    if opened is not None:
+        opened.close()
+
+def drop_docstore(collection: str) -> None:
+    close_docstore(collection)
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            Path(f"{_path(collection)}{suffix}").unlink(missing_ok=True)
+        except OSError as e:  # still open in another process (Windows); the next promote retries
+            log.warning(f"could not remove {_path(collection)}{suffix}: {e}")
+
+def hydrate(hits: list, collection: str | None = None) -> list:
+    # no-op for hits that already carry text (points indexed with DOCSTORE=0)
+    if any("text" not in pl for _, _, pl in hits):
+        get_docstore(collection).hydrate(hits)
+    return hits
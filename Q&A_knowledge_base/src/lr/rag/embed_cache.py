@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from pathlib import Path
+from ..llm.base import Embeddings
+
+log = logging.getLogger("lr.rag.embed_cache")
+
+# keep well under SQLite's bound-variable limit
+_SQL_CHUNK = 500
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _pack(vec) -> bytes:
+    # float32 is what Qdrant stores anyway
+    return array("f", vec).tobytes()
+
+def _unpack(blob: bytes) -> list[float]:
+    a = array("f")
+    a.frombytes(blob)
+    return a.tolist()
+
+class EmbeddingCache:
+    """
+    On-disk (SQLite) embedding cache keyed by (provider, model, sha256(text)).
+    Least-recently-used rows are evicted once `max_entries` is exceeded.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 200_000):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = str(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " provider TEXT NOT NULL, model TEXT NOT NULL, sha TEXT NOT NULL,"
+            " vec BLOB NOT NULL, used INTEGER NOT NULL,"
+            " PRIMARY KEY (provider, model, sha))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings(used)")
+        self._conn.commit()
+        self._count, self._clock = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(MAX(used), 0) FROM embeddings"
+        ).fetchone()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _tick(self) -> int:
+        # logical LRU clock; wall time is too coarse on some platforms
+        self._clock += 1
+        return self._clock
+
+    def get_many(self, provider: str, model: str, shas: list[str]) -> dict[str, list[float]]:
+        out: dict[str, list[float]] = {}
+        with self._lock:
+            now = self._tick()
+            for i in range(0, len(shas), _SQL_CHUNK):
+                part = shas[i:i + _SQL_CHUNK]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT sha, vec FROM embeddings"
+                    f" WHERE provider=? AND model=? AND sha IN ({marks})",
+                    (provider, model, *part),
+                ).fetchall()
+                for sha, blob in rows:
+                    out[sha] = _unpack(blob)
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET used=?"
+                        f" WHERE provider=? AND model=? AND sha IN ({marks})",
+                        (now, provider, model, *part),
+                    )
+            self._conn.commit()
+        return out
+
+    def put_many(self, provider: str, model: str, items: list[tuple[str, list[float]]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            now = self._tick()
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (provider, model, sha, vec, used)"
+                " VALUES (?, ?, ?, ?, ?)",
+                [(provider, model, sha, _pack(vec), now) for sha, vec in items],
+            )
+            self._count += self._conn.total_changes - before
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        over = self._count - self.max_entries
+        if over <= 0:
+            return
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE rowid IN"
+            " (SELECT rowid FROM embeddings ORDER BY used ASC LIMIT ?)",
+            (over,),
+        )
+        self._count -= over
+        log.info(f"evicted {over} cached embeddings (cap={self.max_entries})")
+
+class CachedEmbeddings(Embeddings):
+    """Wraps any Embeddings; only texts not yet in the cache reach the backend."""
+
+    def __init__(self, inner: Embeddings, cache: EmbeddingCache, provider: str, model: str):
+        self.inner = inner
+        self.cache = cache
+        self.provider = provider
+        self.model = model
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, texts):
+        if isinstance(texts, str):
+            texts = [texts]
+        keys = [text_key(t) for t in texts]
+        found = self.cache.get_many(self.provider, self.model, list(dict.fromkeys(keys)))
+
+        # embed each missing text once, even if it repeats within the call
+        missing: dict[str, str] = {}
+        for k, t in zip(keys, texts):
+            if k not in found and k not in missing:
+                missing[k] = t
+        if missing:
+            vecs = self.inner.embed(list(missing.values()))
+            fresh = list(zip(missing.keys(), vecs))
+            self.cache.put_many(self.provider, self.model, fresh)
+            found.update(fresh)
+
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+        return [found[k] for k in keys]
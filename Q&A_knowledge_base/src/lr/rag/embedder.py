@@ -1,8 +1,38 @@
+from pathlib import Path
 from ..config import settings
-from ..llm.ollama_client import OllamaEmbeddings
-from ..llm.openrouter_client import OpenRouterEmbeddings
+from ..llm.ollama_client import OllamaEmbeddings, AsyncOllamaEmbeddings
+from ..llm.openrouter_client import OpenRouterEmbeddings, AsyncOpenRouterEmbeddings
+from .embed_cache import EmbeddingCache, CachedEmbeddings
 
-def get_embedder():
+_cache: EmbeddingCache | None = None
+
+def get_embedder(provider: str | None = None, model: str | None = None):
+    # provider/model default to settings (queries pass the live collection's, see retrieve)
+    if (provider or settings.provider) == "openrouter":
+        return OpenRouterEmbeddings(model=model)
+    return OllamaEmbeddings(model=model)
+
+def get_async_embedder(provider: str | None = None, model: str | None = None):
+    if (provider or settings.provider) == "openrouter":
+        return AsyncOpenRouterEmbeddings(model=model)
+    return AsyncOllamaEmbeddings(model=model)
+
+def embed_model_name() -> str:
     if settings.provider == "openrouter":
-        return OpenRouterEmbeddings()
-    return OllamaEmbeddings()
+        return settings.openrouter_embed_model
+    return settings.ollama_embed_model
+
+def get_embed_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        _cache = EmbeddingCache(
+            Path(settings.data_dir) / "embed_cache.sqlite",
+            max_entries=settings.embed_cache_max_entries,
+        )
+    return _cache
+
+def get_cached_embedder():
+    # ingestion path: unchanged chunks are served from the local cache
+    if not settings.embed_cache:
+        return get_embedder()
+    return CachedEmbeddings(get_embedder(), get_embed_cache(), settings.provider, embed_model_name())
@@ -0,0 +1,259 @@
+import logging
+import os
+import queue
+import threading
+import uuid
+from itertools import islice
+from typing import Callable, Iterable, Iterator
+from ..config import settings
+from ..io.manifest import Manifest
+from ..metrics import stage
+from ..vector.mini import build_spec, fit_pca, projection, save_projection
+from ..vector.registry import version_info, record_version, bump_generation
+from ..vector.store import (
+    ensure_collection, bulk_writer, delete_by_source, live_collection, promote, drop_version,
+)
+from .docstore import get_docstore
+from .embedder import get_cached_embedder, embed_model_name
+from .sparse import get_sparse_index
+
+log = logging.getLogger("lr.rag.pipeline")
+
+def _batched(items: Iterable, n: int) -> Iterator[list]:
+    it = iter(items)
+    while batch := list(islice(it, n)):
+        yield batch
+
+def point_payload(key: str, text: str) -> dict:
+    # key like "/abs/path/filename.ext::0" (the reader does this, see io.manifest.source_of)
+    source, _, chunk_idx = key.rpartition("::") if "::" in key else (key, "", "")
+    ext = os.path.splitext(source)[1].lower()  # ".pdf", ".md", ".txt", ".csv", ...
+    return {
+        "text": text,
+        "source": source,
+        "chunk": int(chunk_idx or 0),
+        "ext": ext,
+    }
+
+def point_id(key: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, key))
+
+def _timed(items: Iterable, timings: dict, name: str) -> Iterator:
+    # time spent waiting on a lazy producer (reading + parsing for iter_input)
+    it = iter(items)
+    while True:
+        with stage(timings, name):
+            item = next(it, _DONE)
+        if item is _DONE:
+            return
+        yield item
+
+_DONE = object()
+
+def _unpack(item: tuple) -> tuple[str, str, dict | None]:
+    # (key, text) or (key, text, ref) as yielded by io.readers.iter_input
+    key, text, *rest = item
+    return key, text, (rest[0] if rest else None)
+
+def index_stream(
+    pairs: Iterable[tuple],
+    manifest: Manifest | None = None,
+    batch_size: int | None = None,
+    max_pending: int | None = None,
+    on_progress: Callable[[int, int], None] | None = None,
+    rebuild: bool = False,
+    timings: dict | None = None,
+) -> dict:
+    """
+    read -> embed a batch -> upsert a batch, with upserts running on a writer thread.
+
+    At most `batch_size` chunks are being embedded and `max_pending` embedded batches
+    wait for the writer; when Qdrant falls behind, embedding blocks (and so does the
+    reader), so memory stays flat no matter how large the input is.
+
+    `on_progress(files, chunks)` runs after every batch; raising from it (e.g. on
+    cancellation) stops the ingest without committing the manifest.
+
+    Items carrying a ref (see iter_input) put their document in the docstore once and
+    the point payload keeps doc_id/start/end instead of the chunk text.
+
+    With `rebuild`, or when the embedding model (or the MINI_* two-stage layout, see
+    vector.mini) differs from the one the live collection was built with, everything
+    goes into a new collection version that is promoted (alias swap) only after the
+    last batch; queries keep using the live version meanwhile. A failed build drops
+    its half-filled version. A new PCA version holds back its first MINI_PCA_ROWS
+    chunks until the projection is fitted on them.
+
+    `timings` (optional) receives cumulative read_ms, embed_ms, mini_ms (projection),
+    docstore_ms, upsert_ms and sparse_ms; the last three run on the writer thread, overlapping the others.
+    flush_ms is the final wait for upserts still in flight (and for a rebuild's index).
+    """
+    timings = {} if timings is None else timings
+    batch_size = batch_size or settings.ingest_batch_size
+    max_pending = max(1, max_pending or settings.ingest_max_pending)
+    emb = get_cached_embedder()
+    model = embed_model_name()
+
+    live = live_collection(refresh=True)
+    built_with = version_info(live) or {}
+    mini_spec = build_spec()
+    staging = rebuild or (
+        "model" in built_with
+        and ((built_with["provider"], built_with["model"]) != (settings.provider, model)
+             or built_with.get("mini") != mini_spec)
+    )
+    if manifest is not None and not staging:
+        # drop points of changed/deleted files before their new chunks go in
+        delete_by_source(manifest.stale_sources, collection=live)
+        if settings.hybrid:
+            get_sparse_index(live).delete_by_source(manifest.stale_sources)
+        if settings.docstore:
+            get_docstore(live).delete_by_source(manifest.stale_sources)
+    # where this run writes; filled once the first batch tells the vector size
+    dest: dict = {"collection": None, "staged": False, "writer": None, "sparse": None, "docs": None,
+                  "mini": None, "mini_dim": None}
+
+    pending: queue.Queue = queue.Queue(maxsize=max_pending)
+    failed: list[BaseException] = []
+
+    def writer():
+        while (item := pending.get()) is not None:
+            if failed:
+                continue  # keep draining so the producer never blocks forever
+            vecs, mini, payloads, ids, texts, new_docs = item
+            try:
+                if new_docs:
+                    with stage(timings, "docstore"):
+                        dest["docs"].put_many(new_docs)  # before the points that reference them
+                with stage(timings, "upsert"):
+                    dest["writer"].upsert(vecs, payloads, ids, mini=mini)
+                if dest["sparse"] is not None:
+                    with stage(timings, "sparse"):
+                        dest["sparse"].add(ids, payloads, texts)
+            except BaseException as e:
+                failed.append(e)
+
+    def submit(vecs, payloads, ids, texts, new_docs):
+        mini = None
+        if dest["mini"] is not None:
+            with stage(timings, "mini"):
+                mini = dest["mini"].apply(vecs)
+        pending.put((vecs, mini, payloads, ids, texts, new_docs))
+
+    def fit_mini(held: list) -> None:
+        with stage(timings, "mini"):
+            dest["mini"] = fit_pca([v for vecs, *_ in held for v in vecs], dest["mini_dim"])
+        save_projection(dest["collection"], dest["mini"])
+        for item in held:
+            submit(*item)
+
+    t = threading.Thread(target=writer, name="lr-upsert", daemon=True)
+    t.start()
+    dim, n, files, last_source, last_doc = None, 0, 0, None, None
+    held: list | None = None  # batches waiting for a PCA projection to be fitted
+    try:
+        try:
+            for batch in _timed(_batched(map(_unpack, pairs), batch_size), timings, "read"):
+                if failed:
+                    break
+                texts = [text for _, text, _ in batch]
+                with stage(timings, "embed"):
+                    vecs = emb.embed(texts)
+                if dim is None:
+                    if not vecs or not vecs[0]:
+                        raise RuntimeError("Embedding model returned zero-length vectors.")
+                    dim = len(vecs[0])
+                    if mini_spec is not None and mini_spec["dim"] >= dim:
+                        raise ValueError(f"MINI_DIM={mini_spec['dim']} must be smaller than "
+                                         f"the embedding size ({dim})")
+                    target = ensure_collection(dim, new_version=staging,
+                                               mini_dim=mini_spec and mini_spec["dim"])
+                    if "model" not in (version_info(target) or {}):
+                        record_version(target, provider=settings.provider, model=model, dim=dim,
+                                       mini=mini_spec)
+                    staged = live is not None and target != live
+                    dest["mini"] = projection(target)
+                    built_mini = (version_info(target) or {}).get("mini")
+                    if built_mini and dest["mini"] is None:
+                        if target == live:
+                            # refitting would not match the mini vectors already stored
+                            raise RuntimeError(f"the PCA projection of {target} is missing; "
+                                               f"re-ingest with a full rebuild")
+                        dest["mini_dim"], held = built_mini["dim"], []
+                    dest.update(
+                        collection=target,
+                        staged=staged,
+                        # nobody queries a new version (or the very first one) yet:
+                        # fill it with indexing off and build the graph once at the end
+                        writer=bulk_writer(target, bulk=settings.bulk_load and (staged or live is None)),
+                        sparse=get_sparse_index(target) if settings.hybrid else None,
+                        docs=get_docstore(target) if settings.docstore else None,
+                    )
+                payloads, new_docs = [], []
+                for key, text, ref in batch:
+                    pl = point_payload(key, text)
+                    if dest["docs"] is not None and ref is not None:
+                        doc_id = point_id(f"{pl['source']}::doc{ref['doc_no']}")
+                        if doc_id != last_doc:  # chunks of one document arrive together
+                            new_docs.append((doc_id, pl["source"], ref["doc"]))
+                            last_doc = doc_id
+                        del pl["text"]
+                        pl.update(doc_id=doc_id, start=ref["start"], end=ref["end"])
+                    payloads.append(pl)
+                item = (vecs, payloads, [point_id(key) for key, _, _ in batch], texts, new_docs)
+                if held is None:
+                    submit(*item)
+                else:
+                    held.append(item)
+                    if sum(len(h[0]) for h in held) >= settings.mini_pca_rows:
+                        fit_mini(held)
+                        held = None
+                n += len(batch)
+                for key, _, _ in batch:
+                    source = point_payload(key, "")["source"]
+                    if source != last_source:
+                        files, last_source = files + 1, source
+                if on_progress is not None:
+                    on_progress(files, n)
+            if held and not failed:
+                fit_mini(held)  # fewer than MINI_PCA_ROWS chunks in all: fit on what there is
+        finally:
+            pending.put(None)
+            t.join()
+        if failed:
+            raise failed[0]
+        if dest["writer"] is not None:
+            # barrier for the requests still in flight; a rebuild also waits for its index
+            with stage(timings, "flush"):
+                dest["writer"].finish(wait_for_index=dest["staged"])
+        if dest["staged"]:
+            promote(dest["collection"])
+    except BaseException:
+        if dest["writer"] is not None:
+            try:
+                dest["writer"].abort()
+            except Exception as e:  # keep the original error
+                log.warning(f"could not clean up after a failed load: {e}")
+        if dest["staged"]:
+            drop_version(dest["collection"])  # never promoted; nothing points at it
+        raise
+
+    collection = dest["collection"] or live
+    changed = n or manifest is not None and manifest.stale_sources
+    if collection is not None and changed and not dest["staged"]:
+        # answers cached for this version may now be out of date (see rag.answer_cache)
+        bump_generation(collection)
+    if manifest is not None:
+        # the manifest now describes what is in this version
+        manifest.scope = {**manifest.scope, "version": collection}
+        manifest.commit()
+    log.info(f"indexed chunks={n} collection={collection}")
+
+    res = {"chunks_indexed": n, "files_indexed": files, "collection": collection}
+    if dest["staged"]:
+        res["promoted"] = True
+    if manifest is not None:
+        res.update(files_changed=len(manifest.changed), files_removed=len(manifest.removed))
+    if hasattr(emb, "hits"):
+        res.update(cache_hits=emb.hits, cache_misses=emb.misses)
+    return res
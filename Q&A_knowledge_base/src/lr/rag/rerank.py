@@ -0,0 +1,80 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+import numpy as np
+from ..config import settings
+
+log = logging.getLogger("lr.rag.rerank")
+
+# below this many candidates a thread pool costs more than it saves
+_PARALLEL_MIN = 256
+
+class Reranker(ABC):
+    """Scores all candidates of one query in a single call; higher is better."""
+
+    # whether score() reads candidate text (if not, hits are never hydrated from the docstore)
+    needs_text = True
+
+    @abstractmethod
+    def score(self, query: str, texts: list[str], dense: np.ndarray) -> np.ndarray: ...
+
+class NoRerank(Reranker):
+    needs_text = False
+
+    def score(self, query, texts, dense):
+        return dense
+
+class FuzzyReranker(Reranker):
+    # semantic + fuzzy signal (simple heuristic), one cdist call for all candidates
+    def __init__(self, dense_weight: float = 0.6):
+        from rapidfuzz import fuzz, process  # with the first reranker, not with the module
+        self.dense_weight = dense_weight
+        self._cdist, self._scorer = process.cdist, fuzz.token_set_ratio
+
+    def score(self, query, texts, dense):
+        workers = -1 if len(texts) >= _PARALLEL_MIN else 1
+        fuzzy = self._cdist([query], texts, scorer=self._scorer, workers=workers)[0]
+        return self.dense_weight * dense + (1 - self.dense_weight) * (fuzzy / 100.0)
+
+class CrossEncoderReranker(Reranker):
+    def __init__(self, model: str, batch_size: int = 32):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise RuntimeError(
+                "RERANKER=cross-encoder needs sentence-transformers "
+                "(poetry install --extras rerank)"
+            ) from e
+        self.model = CrossEncoder(model)
+        self.batch_size = batch_size
+
+    def score(self, query, texts, dense):
+        logits = self.model.predict([(query, t) for t in texts], batch_size=self.batch_size)
+        return 1.0 / (1.0 + np.exp(-np.asarray(logits, dtype=np.float32)))
+
+_reranker: Reranker | None = None
+_reranker_lock = threading.Lock()
+
+def get_reranker() -> Reranker:
+    # built once: the cross-encoder load is expensive (and async requests rerank in threads)
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            if settings.reranker == "cross-encoder":
+                _reranker = CrossEncoderReranker(settings.rerank_model)
+            elif settings.reranker == "none":
+                _reranker = NoRerank()
+            else:
+                _reranker = FuzzyReranker()
+        return _reranker
+
+def rerank(query: str, hits: list, k: int, reranker: Reranker | None = None) -> list:
+    """hits: [(id, score, payload)] -> best k, ordered by the reranker's score."""
+    if not hits:
+        return []
+    reranker = reranker or get_reranker()
+    texts = [pl.get("text", "") for _, _, pl in hits]
+    dense = np.fromiter((s for _, s, _ in hits), dtype=np.float32, count=len(hits))
+    scores = reranker.score(query, texts, dense)
+    order = np.argsort(-scores, kind="stable")[:k]
+    return [hits[i] for i in order]
@@ -1,52 +1,188 @@
-from rapidfuzz import fuzz
-from ..vector.qdrant_store import ensure_collection, upsert, search
-from .embedder import get_embedder
-import os, uuid
-
-def index_texts(pairs: list[tuple[str, str]]):
-    emb = get_embedder()
-    texts = [t for _, t in pairs]
-    vecs = emb.embed(texts)
-    if not vecs or not vecs[0]:
-        raise RuntimeError("Embedding model returned zero-length vectors.")
-    dim = len(vecs[0])
-    ensure_collection(dim)
-
-    payloads, ids = [], []
-    for key, text in pairs:
-        # key like "filename.ext::0" (your reader does this)
-        source, _, chunk_idx = key.partition("::")
-        ext = os.path.splitext(source)[1].lower()  # ".pdf", ".md", ".txt", ".csv", ...
-        payloads.append({
-            "text": text,
-            "source": source,
-            "chunk": int(chunk_idx or 0),
-            "ext": ext,
-        })
-        ids.append(str(uuid.uuid5(uuid.NAMESPACE_URL, key)))
-
-    upsert(vecs, payloads=payloads, ids=ids)
-    return {"chunks_indexed": len(ids)}
-
-def retrieve(query: str, k: int = 6, only_ext: str | None = None, min_score: float = 0.25):
-    emb = get_embedder()
-    q = emb.embed([query])[0]
-
-    # get generous candidates (3x), then filter
-    hits = search(q, top_k=k * 6, score_threshold=min_score)
-
-    # optional: only certain file types (e.g., PDFs)
-    if only_ext:
-        only_ext = only_ext.lower()
-        hits = [(i,s,pl) for (i,s,pl) in hits if pl.get("ext","").lower() == only_ext]
-
-    # now re-rank by semantic + fuzzy signal (simple heuristic)
-    def keyfn(t):
-        _id, _score, pl = t
-        text = pl.get("text","")
-        return (0.6 * _score) + (0.4 * (fuzz.token_set_ratio(query, text) / 100.0))
-
-    hits = sorted(hits, key=keyfn, reverse=True)[:k]
-
-    # return both plain texts and metadata (up to you)
+import asyncio
+import logging
+import time
+from ..config import settings
+from ..io.manifest import Manifest
+from ..metrics import ms_since
+from ..vector.mini import projection
+from ..vector.registry import version_info
+from ..vector.store import search, asearch, asearch_batch, live_collection
+from .embedder import get_embedder, get_async_embedder, embed_model_name
+from .pipeline import index_stream
+from .docstore import hydrate
+from .rerank import rerank, get_reranker
+from .sparse import get_sparse_index, rrf_fuse
+from typing import Iterable
+
+log = logging.getLogger("lr.rag.retrieve")
+
+def open_manifest(folder: str, full: bool = False) -> Manifest:
+    scope = {
+        "collection": settings.qdrant_collection,
+        "provider": settings.provider,
+        "model": embed_model_name(),
+        # a promoted rebuild (possibly from another folder) invalidates this manifest
+        "version": live_collection(refresh=True),
+    }
+    if settings.vector_backend != "qdrant":
+        # a different index holds none of the files indexed so far (qdrant keeps old manifests)
+        scope["backend"] = settings.vector_backend
+    manifest = Manifest.for_folder(settings.data_dir, folder, scope)
+    if full:
+        manifest.reset()
+    return manifest
+
+def index_texts(pairs: Iterable[tuple[str, str]], manifest: Manifest | None = None,
+                timings: dict | None = None):
+    # pairs may be a lazy iterator (see io.readers.iter_input); it is consumed in batches
+    return index_stream(pairs, manifest=manifest, timings=timings)
+
+def _where(only_ext: str | None) -> dict | None:
+    # the ext filter runs inside Qdrant (payload index), so every candidate is usable
+    return {"ext": only_ext.lower()} if only_ext else None
+
+def _fuse(dense: list, sparse: list, n: int) -> list:
+    """
+    BM25 hits reorder and extend the dense hits that passed min_score, but never stand
+    in for them: with no dense hit the question stays unanswered (NO_CONTEXT) however
+    many of its words match. Scores stay cosine, as with HYBRID=0; a hit only BM25 found
+    gets the weakest dense score of the set.
+    """
+    # nothing indexed sparsely (e.g. collection built before HYBRID) -> keep dense scores
+    if not sparse or not dense:
+        return dense
+    scores = {str(pid): s for pid, s, _ in dense}
+    floor = min(scores.values())
+    return [(pid, scores.get(str(pid), floor), pl)
+            for pid, _, pl in rrf_fuse(dense, sparse, limit=n, k=settings.rrf_k)]
+
+def _rerank(query: str, hits: list, k: int, collection: str | None) -> list:
+    # text for candidates is read from the local docstore only when the reranker needs it
+    reranker = get_reranker()
+    if reranker.needs_text:
+        hydrate(hits, collection)
+    return rerank(query, hits, k, reranker)
+
+def query_target() -> tuple[str | None, str | None, str | None]:
+    # the live version and the provider/model it was built with: until a rebuild is
+    # promoted, queries keep embedding with the old model even if settings changed
+    live = live_collection()
+    info = version_info(live) or {}
+    return live, info.get("provider"), info.get("model")
+
+def embed_query(query: str, target: tuple | None = None) -> list[float]:
+    _, provider, model = target or query_target()
+    return get_embedder(provider, model).embed([query])[0]
+
+async def aembed_query(query: str, target: tuple | None = None) -> list[float]:
+    return (await aembed_queries([query], target))[0]
+
+async def aembed_queries(queries: list[str], target: tuple | None = None) -> list[list[float]]:
+    # one embedding call for all of them (the clients batch and retry internally)
+    _, provider, model = target or query_target()
+    return await get_async_embedder(provider, model).embed(queries)
+
+def _mini(live: str | None, vectors: list) -> list | None:
+    # two-stage versions are searched with the query reduced the way their points were
+    proj = projection(live)
+    return None if proj is None else proj.apply(vectors)
+
+def retrieve(query: str, k: int = 6, only_ext: str | None = None, min_score: float = 0.25,
+             timings: dict | None = None, vector: list[float] | None = None,
+             target: tuple | None = None):
+    # timings (optional) receives per-stage latency: embed_ms, search_ms, sparse_ms, rerank_ms;
+    # vector/target: the query embedding and the query_target() it was made for, if known
+    timings = {} if timings is None else timings
+    target = target or query_target()
+    live = target[0]
+    q = vector
+    if q is None:
+        t0 = time.perf_counter()
+        q = embed_query(query, target)
+        timings["embed_ms"] = ms_since(t0)
+
+    n = k * settings.retrieve_overfetch
+    t0 = time.perf_counter()
+    mini = _mini(live, [q])
+    hits = search(q, top_k=n, score_threshold=min_score, where=_where(only_ext), collection=live,
+                  mini_vector=None if mini is None else mini[0])
+    timings["search_ms"] = ms_since(t0)
+    if settings.hybrid:
+        t0 = time.perf_counter()
+        sparse = get_sparse_index(live).search(query, limit=n, where=_where(only_ext))
+        hits = _fuse(hits, sparse, n)
+        timings["sparse_ms"] = ms_since(t0)
+
+    t0 = time.perf_counter()
+    hits = _rerank(query, hits, k, live)
+    timings["rerank_ms"] = ms_since(t0)
+    log.debug(f"retrieve candidates={k * settings.retrieve_overfetch} timings={timings}")
     return hits  # list of (id, score, payload)
+
+async def aretrieve(query: str, k: int = 6, only_ext: str | None = None, min_score: float = 0.25,
+                    timings: dict | None = None, vector: list[float] | None = None,
+                    target: tuple | None = None):
+    timings = {} if timings is None else timings
+    target = target or query_target()
+    live = target[0]
+    q = vector
+    if q is None:
+        t0 = time.perf_counter()
+        q = await aembed_query(query, target)
+        timings["embed_ms"] = ms_since(t0)
+
+    n = k * settings.retrieve_overfetch
+    t0 = time.perf_counter()
+    mini = _mini(live, [q])
+    dense = asearch(q, top_k=n, score_threshold=min_score, where=_where(only_ext), collection=live,
+                    mini_vector=None if mini is None else mini[0])
+    if settings.hybrid:
+        # both legs at once; the BM25 index is local SQLite, so it runs in a thread
+        hits, sparse = await asyncio.gather(dense, asyncio.to_thread(
+            get_sparse_index(live).search, query, n, _where(only_ext)))
+        hits = _fuse(hits, sparse, n)
+    else:
+        hits = await dense
+    timings["search_ms"] = ms_since(t0)
+
+    t0 = time.perf_counter()
+    # model inference, cdist and docstore reads: off the event loop
+    hits = await asyncio.to_thread(_rerank, query, hits, k, live)
+    timings["rerank_ms"] = ms_since(t0)
+    log.debug(f"aretrieve candidates={k * settings.retrieve_overfetch} timings={timings}")
+    return hits
+
+async def aretrieve_batch(queries: list[str], k: int = 6, only_ext: str | None = None,
+                          min_score: float = 0.25, timings: dict | None = None,
+                          vectors: list[list[float]] | None = None,
+                          target: tuple | None = None) -> list[list]:
+    """aretrieve() for many queries: one embedding call and one batched vector search."""
+    timings = {} if timings is None else timings
+    if not queries:
+        return []
+    target = target or query_target()
+    live = target[0]
+    if vectors is None:
+        t0 = time.perf_counter()
+        vectors = await aembed_queries(queries, target)
+        timings["embed_ms"] = ms_since(t0)
+
+    n = k * settings.retrieve_overfetch
+    t0 = time.perf_counter()
+    dense = asearch_batch(vectors, top_k=n, score_threshold=min_score, where=_where(only_ext),
+                          collection=live, mini_vectors=_mini(live, vectors))
+    if settings.hybrid:
+        index = get_sparse_index(live)
+        # the BM25 index serializes on its own lock anyway: one thread for all queries
+        batches, sparse = await asyncio.gather(dense, asyncio.to_thread(
+            lambda: [index.search(q, n, _where(only_ext)) for q in queries]))
+        batches = [_fuse(hits, sp, n) for hits, sp in zip(batches, sparse)]
+    else:
+        batches = await dense
+    timings["search_ms"] = ms_since(t0)
+
+    t0 = time.perf_counter()
+    batches = await asyncio.to_thread(
+        lambda: [_rerank(q, hits, k, live) for q, hits in zip(queries, batches)])
+    timings["rerank_ms"] = ms_since(t0)
+    return batches
@@ -0,0 +1,225 @@
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Iterable
+from ..config import settings
+from ..vector.store import local_state_name
+from .docstore import get_docstore
+
+log = logging.getLogger("lr.rag.sparse")
+
+# identifiers like ERR_CONN-42, a.b.c, 10.0.0.1:6333 stay one phrase query
+_TERM = re.compile(r"\w+(?:[-_.:/]\w+)*")
+_MAX_TERMS = 32
+_SQL_CHUNK = 500
+# tombstoned rows before the term index is rebuilt (and at least as many as live ones)
+_COMPACT_MIN_DEAD = 1000
+# OR-ed together these would match nearly every chunk of an English corpus
+STOPWORDS = frozenset("""
+a about an and are as at be been but by can could did do does for from had has have how i
+if in into is it its me my no not of on or our so than that the their them then there these
+they this to was we were what when where which who why will with would you your
+""".split())
+
+def _keep(term: str) -> bool:
+    # single letters carry no signal; single digits (v 2, step 3) might
+    return term.lower() not in STOPWORDS and (len(term) > 1 or term.isdigit())
+
+def fts_query(text: str) -> str | None:
+    # each term is quoted: FTS5 syntax in user text cannot break the query
+    terms = [t for t in dict.fromkeys(_TERM.findall(text)) if _keep(t)][:_MAX_TERMS]
+    if not terms:
+        return None
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+class SparseIndex:
+    """
+    Local BM25 index (SQLite FTS5) over the same chunks as the Qdrant collection.
+
+    The FTS table is contentless: it holds the term index, not the text. `docs` maps
+    point ids to FTS rowids and locates each chunk, by doc_id/start/end in the docstore
+    (read through `spans`, see DocStore.spans) or, for points indexed with DOCSTORE=0,
+    by keeping the chunk text itself. Hits carry the same payload fields as dense ones.
+
+    A contentless FTS5 row cannot be removed without its original text, which the
+    docstore may already have replaced; deleting a `docs` row tombstones it instead
+    (searches join on `docs`). Once tombstones outnumber live rows the term index is
+    rebuilt from the live ones.
+    """
+
+    def __init__(self, path: str | Path, spans: Callable[[list], list[str]] | None = None):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._spans = spans
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        old = self._conn.execute("SELECT sql FROM sqlite_master WHERE name='chunks'").fetchone()
+        # indexes built with a text copy in `chunks`: the text moves to `docs` (no docstore
+        # refs are known for them) and the term index is rebuilt without it
+        moved = self._drop_old_layout() if old is not None and "content" not in old[0] else []
+        # AUTOINCREMENT: a rowid is never reused, so a tombstoned FTS row stays unmatched
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " rowid INTEGER PRIMARY KEY AUTOINCREMENT, point_id TEXT NOT NULL UNIQUE,"
+            " source TEXT, ext TEXT, chunk INTEGER,"
+            " doc_id TEXT, start INTEGER, end INTEGER, text TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS docs_source ON docs(source)")
+        self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(text, content='')")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('dead', 0)")
+        self._insert([r[0] for r in moved],
+                     [{"source": src, "ext": ext, "chunk": chunk} for _, src, ext, chunk, _ in moved],
+                     [r[4] for r in moved])
+        self._conn.commit()
+        if moved:
+            log.info(f"moved the sparse index to a contentless table: {len(moved)} chunks")
+
+    def _drop_old_layout(self) -> list:
+        rows = self._conn.execute(
+            "SELECT d.point_id, d.source, d.ext, d.chunk, c.text"
+            " FROM docs d JOIN chunks c ON c.rowid = d.rowid"
+        ).fetchall()
+        self._conn.execute("DROP TABLE chunks")
+        self._conn.execute("DROP TABLE docs")
+        return rows
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def add(self, ids: list[str], payloads: list[dict], texts: list[str] | None = None) -> None:
+        texts = texts or [pl.get("text", "") for pl in payloads]
+        with self._lock:
+            self._delete_ids(ids)
+            self._insert(ids, payloads, texts)
+            self._conn.commit()
+            self._compact_if_needed()
+
+    def _insert(self, ids: list, payloads: list[dict], texts: list[str]) -> None:
+        for pid, pl, text in zip(ids, payloads, texts):
+            ref = "doc_id" in pl
+            cur = self._conn.execute(
+                "INSERT INTO docs (point_id, source, ext, chunk, doc_id, start, end, text)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (str(pid), pl.get("source"), pl.get("ext"), pl.get("chunk"),
+                 pl.get("doc_id"), pl.get("start"), pl.get("end"), None if ref else text),
+            )
+            self._conn.execute(
+                "INSERT INTO chunks (rowid, text) VALUES (?, ?)", (cur.lastrowid, text)
+            )
+
+    def _tombstone(self, where: str, part: list) -> None:
+        n = self._conn.execute(f"DELETE FROM docs WHERE {where}", part).rowcount
+        self._conn.execute("UPDATE meta SET value = value + ? WHERE key='dead'", (n,))
+
+    def _delete_ids(self, ids: list[str]) -> None:
+        for i in range(0, len(ids), _SQL_CHUNK):
+            part = [str(x) for x in ids[i:i + _SQL_CHUNK]]
+            self._tombstone(f"point_id IN ({','.join('?' * len(part))})", part)
+
+    def delete_by_source(self, sources: Iterable[str]) -> None:
+        sources = list(dict.fromkeys(sources))
+        with self._lock:
+            for i in range(0, len(sources), _SQL_CHUNK):
+                part = sources[i:i + _SQL_CHUNK]
+                self._tombstone(f"source IN ({','.join('?' * len(part))})", part)
+            self._conn.commit()
+            self._compact_if_needed()
+
+    def _compact_if_needed(self) -> None:
+        dead = self._conn.execute("SELECT value FROM meta WHERE key='dead'").fetchone()[0]
+        live = self._conn.execute("SELECT count(*) FROM docs").fetchone()[0]
+        if dead < max(live, _COMPACT_MIN_DEAD):
+            return
+        # live chunk texts come from the docstore, which holds the current documents
+        self._conn.execute("INSERT INTO chunks (chunks) VALUES ('delete-all')")
+        cur = self._conn.execute("SELECT rowid, doc_id, start, end, text FROM docs")
+        while rows := cur.fetchmany(_SQL_CHUNK):
+            refs = [(d, s, e) for _, d, s, e, text in rows if text is None]
+            cut = iter(self._spans(refs) if refs else [])
+            self._conn.executemany(
+                "INSERT INTO chunks (rowid, text) VALUES (?, ?)",
+                [(rowid, next(cut) if text is None else text) for rowid, _, _, _, text in rows],
+            )
+        self._conn.execute("UPDATE meta SET value = 0 WHERE key='dead'")
+        self._conn.commit()
+        log.info(f"rebuilt the sparse term index: {live} chunks, {dead} removed")
+
+    def search(self, query: str, limit: int = 12, where: dict | None = None):
+        """
+        -> [(point_id, bm25, payload)], best first (bm25 is positive, higher = better).
+        The payload has the chunk text only for points indexed with DOCSTORE=0; the others
+        carry doc_id/start/end, like dense hits (see docstore.hydrate).
+        """
+        match = fts_query(query)
+        if match is None:
+            return []
+        sql = (
+            "SELECT d.point_id, -bm25(chunks) AS s, d.source, d.ext, d.chunk,"
+            " d.doc_id, d.start, d.end, d.text"
+            " FROM chunks JOIN docs d ON d.rowid = chunks.rowid WHERE chunks MATCH ?"
+        )
+        args: list = [match]
+        for key, value in (where or {}).items():
+            if key not in ("source", "ext"):
+                raise ValueError(f"sparse index cannot filter on {key!r}")
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            sql += f" AND d.{key} IN ({','.join('?' * len(values))})"
+            args += values
+        sql += " ORDER BY bm25(chunks) LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        hits = []
+        for pid, s, src, ext, chunk, doc_id, start, end, text in rows:
+            pl = {"source": src, "ext": ext, "chunk": chunk}
+            pl.update({"text": text} if doc_id is None else {"doc_id": doc_id, "start": start, "end": end})
+            hits.append((pid, float(s), pl))
+        return hits
+
+def rrf_fuse(dense: list, sparse: list, limit: int, k: int = 60) -> list:
+    """
+    Reciprocal rank fusion of two [(id, score, payload)] lists. The fused score is
+    rescaled to (0, 1] (1 = ranked first by both legs) so rerankers can blend it.
+    """
+    fused: dict = {}
+    for hits in (dense, sparse):
+        for rank, (pid, _score, pl) in enumerate(hits):
+            key = str(pid)
+            entry = fused.setdefault(key, [0.0, pid, pl])
+            entry[0] += 1.0 / (k + rank + 1)
+    best = 2.0 / (k + 1)
+    ranked = sorted(fused.values(), key=lambda e: e[0], reverse=True)[:limit]
+    return [(pid, s / best, pl) for s, pid, pl in ranked]
+
+# one per collection version (see vector.store); the live one unless named
+_indexes: dict[str, SparseIndex] = {}
+_indexes_lock = threading.Lock()
+
+def _path(name: str) -> Path:
+    return Path(settings.data_dir) / f"sparse_{name}.sqlite"
+
+def get_sparse_index(collection: str | None = None) -> SparseIndex:
+    name = local_state_name(collection)
+    with _indexes_lock:
+        if name not in _indexes:
+            # chunk text for rebuilding the term index; read from the same version's docstore
+            _indexes[name] = SparseIndex(_path(name), spans=lambda refs: get_docstore(name).spans(refs))
+        return _indexes[name]
+
+def close_sparse_index(collection: str) -> None:
+    with _indexes_lock:
+        opened = _indexes.pop(collection, None)
+    if opened is not None:
+        opened.close()
+
+def drop_sparse_index(collection: str) -> None:
+    close_sparse_index(collection)
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            Path(f"{_path(collection)}{suffix}").unlink(missing_ok=True)
+        except OSError as e:  # still open in another process (Windows); the next promote retries
+            log.warning(f"could not remove {_path(collection)}{suffix}: {e}")
@@ -0,0 +1,93 @@
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple, Union
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import Filter
+from ..config import settings
+from . import qdrant_store
+from .qdrant_store import (
+    COLLECTION_NAME, match_filter, search_params, search_requests, two_stage_requests, _hits,
+)
+
+# request-path twin of qdrant_store; writes (ingest) stay on the sync client
+_client: AsyncQdrantClient | None = None
+
+def get_client() -> AsyncQdrantClient:
+    global _client
+    if _client is None:
+        _client = AsyncQdrantClient(
+            url=f"http://{settings.qdrant_host}:{settings.qdrant_port}",
+            grpc_port=settings.qdrant_grpc_port,
+            prefer_grpc=settings.qdrant_grpc,
+            timeout=30.0,
+        )
+    return _client
+
+async def aclose() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+async def search(
+    query_vector: Union[List[float], Tuple[float, ...]],
+    top_k: int = 12,
+    score_threshold: Optional[float] = None,
+    query_filter: Optional[Filter] = None,
+    where: Optional[Dict[str, Any]] = None,
+    collection: Optional[str] = None,
+    mini_vector=None,
+):
+    if settings.qdrant_location:
+        # embedded local mode: nothing to await, and its storage belongs to the sync client
+        return await asyncio.to_thread(
+            qdrant_store.search, query_vector, top_k, score_threshold, query_filter, where,
+            collection, mini_vector,
+        )
+    if mini_vector is not None:
+        res = await get_client().query_batch_points(
+            collection_name=collection or COLLECTION_NAME,
+            requests=two_stage_requests([query_vector], [mini_vector], top_k, score_threshold,
+                                        query_filter or match_filter(where)),
+        )
+        return _hits(res[0].points)
+    if hasattr(query_vector, "tolist"):
+        query_vector = query_vector.tolist()
+
+    results = await get_client().search(
+        collection_name=collection or COLLECTION_NAME,
+        query_vector=list(query_vector),
+        limit=top_k,
+        with_payload=True,
+        score_threshold=score_threshold,
+        query_filter=query_filter or match_filter(where),
+        search_params=search_params(),
+    )
+    return _hits(results)
+
+async def search_batch(
+    query_vectors: List[List[float]],
+    top_k: int = 12,
+    score_threshold: Optional[float] = None,
+    where: Optional[Dict[str, Any]] = None,
+    collection: Optional[str] = None,
+    mini_vectors=None,
+):
+    if settings.qdrant_location:
+        return await asyncio.to_thread(
+            qdrant_store.search_batch, query_vectors, top_k, score_threshold, where, collection,
+            mini_vectors,
+        )
+    if not len(query_vectors):
+        return []
+    if mini_vectors is not None:
+        res = await get_client().query_batch_points(
+            collection_name=collection or COLLECTION_NAME,
+            requests=two_stage_requests(query_vectors, mini_vectors, top_k, score_threshold,
+                                        match_filter(where)),
+        )
+        return [_hits(r.points) for r in res]
+    batches = await get_client().search_batch(
+        collection_name=collection or COLLECTION_NAME,
+        requests=search_requests(query_vectors, top_k, score_threshold, where),
+    )
+    return [_hits(rs) for rs in batches]
@@ -0,0 +1,104 @@
+import logging
+import os
+import threading
+from pathlib import Path
+import numpy as np
+from ..config import settings
+from .registry import version_info
+
+log = logging.getLogger("lr.vector.mini")
+
+# Two-stage search: next to each full embedding a collection version can keep a reduced
+# "mini" copy. The HNSW graph is built on the mini vectors only; the full ones rescore
+# the shortlist it returns. How a version reduces its vectors is recorded in the
+# registry ({"dim", "method"}); a PCA basis is fitted at build time and kept under
+# DATA_DIR/mini_<version>.npz.
+METHODS = ("prefix", "pca")
+
+class Projection:
+    """
+    Full embedding -> `dim`-dimensional unit vector: its first `dim` components
+    (Matryoshka-trained models put the most information there) or, given a PCA
+    basis (`mean`, `components`), its coordinates along the top principal axes.
+    """
+
+    def __init__(self, dim: int, mean: np.ndarray | None = None,
+                 components: np.ndarray | None = None):
+        self.dim, self.mean, self.components = dim, mean, components
+
+    @property
+    def method(self) -> str:
+        return "prefix" if self.components is None else "pca"
+
+    def apply(self, vectors) -> np.ndarray:
+        m = np.asarray(vectors, dtype=np.float32)
+        if self.components is None:
+            out = m[:, :self.dim]
+        else:
+            out = (m - self.mean) @ self.components.T
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms == 0, 1, norms)
+
+def fit_pca(vectors, dim: int) -> Projection:
+    m = np.asarray(vectors, dtype=np.float32)
+    mean = m.mean(axis=0)
+    _, _, vt = np.linalg.svd(m - mean, full_matrices=False)
+    components = vt[:dim]
+    if len(components) < dim:
+        # fewer vectors than axes: the missing ones stay zero until a rebuild refits
+        log.warning(f"PCA to {dim} dims fitted on {len(m)} vectors only")
+        components = np.vstack([components, np.zeros((dim - len(components), m.shape[1]))])
+    return Projection(dim, mean.astype(np.float32), components.astype(np.float32))
+
+def build_spec() -> dict | None:
+    """What new versions are built with (MINI_DIM/MINI_METHOD); None = single-stage."""
+    if not settings.mini_dim or settings.vector_backend != "qdrant":
+        return None  # the numpy backend has no graph to shrink
+    if settings.mini_method not in METHODS:
+        raise ValueError(f"unknown MINI_METHOD {settings.mini_method!r} "
+                         f"(choose from {', '.join(METHODS)})")
+    return {"dim": settings.mini_dim, "method": settings.mini_method}
+
+# collection version -> its projection, loaded on first use
+_loaded: dict[str, Projection] = {}
+_lock = threading.Lock()
+
+def _path(name: str) -> Path:
+    return Path(settings.data_dir) / f"mini_{name}.npz"
+
+def save_projection(name: str, proj: Projection) -> None:
+    if proj.components is not None:
+        path = _path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, mean=proj.mean, components=proj.components)
+        os.replace(tmp, path)
+    with _lock:
+        _loaded[name] = proj
+
+def projection(name: str | None) -> Projection | None:
+    """How `name` reduces query vectors; None if it has no mini vectors (or, for a
+    PCA version still being built, no basis yet)."""
+    spec = (version_info(name) or {}).get("mini")
+    if not spec:
+        return None
+    with _lock:
+        if name not in _loaded:
+            if spec["method"] == "prefix":
+                _loaded[name] = Projection(spec["dim"])
+            else:
+                try:
+                    with np.load(_path(name)) as f:
+                        _loaded[name] = Projection(spec["dim"], f["mean"], f["components"])
+                except FileNotFoundError:
+                    return None
+        return _loaded[name]
+
+def drop_projection(name: str) -> None:
+    with _lock:
+        _loaded.pop(name, None)
+    try:
+        _path(name).unlink(missing_ok=True)
+    except OSError as e:
+        log.warning(f"could not remove {_path(name)}: {e}")
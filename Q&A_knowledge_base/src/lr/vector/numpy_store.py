@@ -0,0 +1,503 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+import numpy as np
+from ..config import settings
+
+log = logging.getLogger("lr.vector.numpy")
+
+# Embedded vector index: same functions as qdrant_store, no server. One directory
+# per collection under DATA_DIR/vectors:
+#   vectors.f32     append-only float32 rows (normalized, so cosine = dot product)
+#   rows.bin        per row: id key, payload offset/length, source and ext codes (ROW)
+#   payloads.jsonl  {"id", "payload"} per row, read only for the hits a search returns
+#   vocab.json      source/ext value -> code, as used in rows.bin
+#   dead.i64        row numbers of replaced/deleted rows
+#   ivf.npz         k-means centroids + row assignments, once the index is large enough
+# A cold start maps vectors.f32 and rows.bin and reads dead.i64; no payload is parsed.
+# rows.bin is appended last: a row exists once its record is there.
+
+_BLOCK = 65536      # rows per matmul block when assigning rows to centroids
+_KMEANS_SAMPLE = 50000
+_KMEANS_ITERS = 10
+# payload fields kept as integer codes, so `where` filters are vectorized
+INDEXED_FIELDS = ("source", "ext")
+# files _compact rewrites
+_COMPACTED = ("vectors.f32", "payloads.jsonl", "rows.bin")
+ROW = np.dtype([("key", "<u8"), ("off", "<i8"), ("len", "<i8")]
+               + [(f, "<i8") for f in INDEXED_FIELDS])
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=-1, keepdims=True)
+    return m / np.where(norms == 0, 1, norms)
+
+def _key(pid) -> int:
+    # 64-bit key of a point id (int or str); ids themselves only live in payloads.jsonl
+    return int.from_bytes(hashlib.blake2b(str(pid).encode("utf-8"), digest_size=8).digest(), "little")
+
+def _record(pid, payload) -> bytes:
+    return (json.dumps({"id": pid, "payload": payload}, ensure_ascii=False) + "\n").encode("utf-8")
+
+class _Snapshot(NamedTuple):
+    # what one search reads, taken under the collection lock
+    mat: np.ndarray
+    index: np.ndarray   # rows.bin records
+    payloads: BinaryIO  # payloads.jsonl, as of `index`
+    rows: np.ndarray    # live rows matching the filter
+
+class NumpyCollection:
+    """
+    Exact search (one matmul over the memory-mapped matrix) below `ivf_min_rows`
+    live rows; above it, an IVF index: rows are bucketed by nearest k-means centroid
+    and a query only scores the rows of its `nprobe` nearest buckets.
+    """
+
+    def __init__(self, path: Union[str, Path], ivf_min_rows: int = 50000, nprobe: int = 8):
+        self.path = Path(path)
+        self.ivf_min_rows = ivf_min_rows
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---- state -------------------------------------------------------------------
+    def _load(self) -> None:
+        self.dim: Optional[int] = None
+        self.n = 0
+        self.alive = np.zeros(0, dtype=bool)
+        self.centroids: Optional[np.ndarray] = None
+        self.assign = np.zeros(0, dtype=np.int32)
+        self._trained_on = 0
+        self._vocab: Dict[str, Dict[Any, int]] = {f: {} for f in INDEXED_FIELDS}
+        self._rows = np.zeros(0, dtype=ROW)
+        self._mat = None
+        # id key -> live row; built on the first write (searches never need it)
+        self._row_of: Optional[Dict[int, int]] = None
+        meta = self.path / "meta.json"
+        if not meta.exists():
+            return
+        self.dim = json.loads(meta.read_text())["dim"]
+        if (self.path / "compact.done").exists():
+            self._finish_compact()
+        for name in _COMPACTED:  # an unfinished compaction, before its marker
+            (self.path / f"{name}.tmp").unlink(missing_ok=True)
+        vocab = self.path / "vocab.json"
+        if vocab.exists():
+            saved = json.loads(vocab.read_text(encoding="utf-8"))
+            self._vocab = {f: {v: i for i, v in enumerate(saved.get(f, []))} for f in INDEXED_FIELDS}
+        # a crash between the appends can leave vectors without a row (or the reverse)
+        n = min(os.path.getsize(self.path / "rows.bin") // ROW.itemsize,
+                os.path.getsize(self.path / "vectors.f32") // (4 * self.dim))
+        self.n = n
+        self._remap()
+        self.alive = np.ones(n, dtype=bool)
+        dead = np.fromfile(self.path / "dead.i64", dtype="<i8") if (self.path / "dead.i64").exists() \
+            else np.zeros(0, dtype="<i8")
+        self.alive[dead[dead < n]] = False
+        ivf = self.path / "ivf.npz"
+        if ivf.exists():
+            data = np.load(ivf)
+            self.centroids, assign = data["centroids"], data["assign"][:n]
+            self.assign = np.concatenate([assign, self._nearest(self._mat[len(assign):n])])
+            self._trained_on = int(self.alive[:len(assign)].sum())
+
+    def _remap(self) -> None:
+        n = self.n
+        self._mat = (np.memmap(self.path / "vectors.f32", dtype=np.float32, mode="r",
+                               shape=(n, self.dim)) if n else np.zeros((0, self.dim), np.float32))
+        self._rows = (np.memmap(self.path / "rows.bin", dtype=ROW, mode="r", shape=(n,))
+                      if n else np.zeros(0, dtype=ROW))
+
+    def _append(self, ids: list, payloads: List[Dict[str, Any]]) -> None:
+        # payloads and vocab first, rows.bin last (see the layout above)
+        blobs = [_record(pid, pl) for pid, pl in zip(ids, payloads)]
+        with open(self.path / "payloads.jsonl", "ab") as f:
+            f.seek(0, os.SEEK_END)
+            base = f.tell()
+            f.write(b"".join(blobs))
+        rows = np.zeros(len(ids), dtype=ROW)
+        rows["key"] = [_key(pid) for pid in ids]
+        rows["len"] = [len(b) for b in blobs]
+        rows["off"] = base + np.cumsum(rows["len"]) - rows["len"]
+        grew = False
+        for field in INDEXED_FIELDS:
+            vocab = self._vocab[field]
+            before = len(vocab)
+            rows[field] = [vocab.setdefault(pl.get(field), len(vocab)) for pl in payloads]
+            grew = grew or len(vocab) > before
+        if grew:
+            tmp = self.path / "vocab.json.tmp"
+            tmp.write_text(json.dumps({f: list(v) for f, v in self._vocab.items()},
+                                      ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, self.path / "vocab.json")
+        with open(self.path / "rows.bin", "ab") as f:
+            f.write(rows.tobytes())
+        self.n += len(ids)
+
+    def _row_index(self) -> Dict[int, int]:
+        if self._row_of is None:
+            live = np.flatnonzero(self.alive)
+            self._row_of = dict(zip(self._rows["key"][live].tolist(), live.tolist()))
+        return self._row_of
+
+    def _snapshot(self, where: Optional[Dict[str, Any]]) -> _Snapshot:
+        # caller holds _lock. _compact renumbers rows and replaces payloads.jsonl; a handle
+        # opened now keeps reading the file these offsets belong to
+        return _Snapshot(self._mat, self._rows, open(self.path / "payloads.jsonl", "rb"),
+                         np.flatnonzero(self.alive & self._where_mask(where)))
+
+    @staticmethod
+    def _read(index: np.ndarray, f, rows) -> List[Tuple[Any, Dict[str, Any]]]:
+        # (id, payload) of the given rows, straight from payloads.jsonl
+        out = []
+        for r in rows:
+            f.seek(int(index["off"][r]))
+            rec = json.loads(f.read(int(index["len"][r])))
+            out.append((rec["id"], rec["payload"]))
+        return out
+
+    def _top(self, snap: _Snapshot, scores: np.ndarray, rows: np.ndarray, top_k: int,
+             score_threshold: Optional[float]) -> List[Tuple[Any, float, Dict[str, Any]]]:
+        if len(rows) > top_k:
+            top = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            top = np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if score_threshold is not None:
+            top = top[scores[top] >= score_threshold]
+        return [(pid, float(scores[i]), pl)
+                for i, (pid, pl) in zip(top, self._read(snap.index, snap.payloads, rows[top].tolist()))]
+
+    # ---- collection API ------------------------------------------------------------
+    def ensure(self, dim: int) -> None:
+        with self._lock:
+            if self.dim is not None and self.dim != dim:
+                log.info(f"dimension changed {self.dim} -> {dim}, recreating {self.path.name}")
+                self._mat = self._rows = None
+                shutil.rmtree(self.path)
+                self._load()
+            if self.dim is None:
+                self.path.mkdir(parents=True, exist_ok=True)
+                for name in ("vectors.f32", "rows.bin", "payloads.jsonl", "dead.i64"):
+                    (self.path / name).touch()
+                (self.path / "meta.json").write_text(json.dumps({"dim": dim}))
+                self.dim = dim
+                self._remap()
+            elif self.n and (~self.alive).sum() > 0.2 * self.n:
+                self._compact()
+            else:
+                self._repair()
+
+    def _repair(self) -> None:
+        # drop what a crashed write left past the last complete row, before appending more
+        n = self.n
+        ends = {"vectors.f32": n * self.dim * 4, "rows.bin": n * ROW.itemsize,
+                "payloads.jsonl": int(self._rows["off"][-1] + self._rows["len"][-1]) if n else 0}
+        for name, end in ends.items():
+            if os.path.getsize(self.path / name) > end:
+                self._mat = self._rows = None  # Windows cannot truncate a mapped file
+                os.truncate(self.path / name, end)
+                self._remap()
+
+    def upsert(self, vectors, payloads: List[Dict[str, Any]], ids: List[Union[int, str]]) -> None:
+        if self.dim is None:
+            raise RuntimeError("ensure_collection() must run before upsert()")
+        mat = _normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        ids, payloads = list(ids), list(payloads)
+        with self._lock:
+            start = self.n
+            row_of = self._row_index()
+            keys = [_key(pid) for pid in ids]
+            replaced = [row_of[k] for k in keys if k in row_of]
+            with open(self.path / "vectors.f32", "ab") as f:
+                f.write(mat.tobytes())
+            self._append(ids, payloads)
+            if replaced:
+                with open(self.path / "dead.i64", "ab") as f:
+                    f.write(np.asarray(replaced, dtype="<i8").tobytes())
+            self.alive = np.concatenate([self.alive, np.ones(len(ids), dtype=bool)])
+            self.alive[replaced] = False
+            for i, k in enumerate(keys):
+                row_of[k] = start + i
+            self._remap()
+            if self.centroids is not None:
+                self.assign = np.concatenate([self.assign, self._nearest(mat)])
+            live = int(self.alive.sum())
+            # (re)train when the index first gets large, and again each time it doubles
+            if live >= self.ivf_min_rows and (self.centroids is None or live > 2 * self._trained_on):
+                self._build_ivf()
+
+    def delete_by_source(self, sources: Iterable[str]) -> None:
+        sources = list(dict.fromkeys(sources))
+        if not sources or self.dim is None:
+            return
+        with self._lock:
+            dead = np.flatnonzero(self.alive & self._where_mask({"source": sources}))
+            if not len(dead):
+                return
+            with open(self.path / "dead.i64", "ab") as f:
+                f.write(dead.astype("<i8").tobytes())
+            self.alive[dead] = False
+            if self._row_of is not None:
+                for k in self._rows["key"][dead].tolist():
+                    self._row_of.pop(k, None)
+
+    def search(self, query_vector, top_k: int = 12, score_threshold: Optional[float] = None,
+               where: Optional[Dict[str, Any]] = None) -> List[Tuple[Any, float, Dict[str, Any]]]:
+        if self.dim is None or not self.n:
+            return []
+        q = _normalize(np.asarray(query_vector, dtype=np.float32))
+        with self._lock:
+            # consistent snapshot; the scoring below runs without the lock
+            snap, centroids, assign = self._snapshot(where), self.centroids, self.assign
+        with snap.payloads:
+            mat, rows = snap.mat, snap.rows
+            if centroids is not None and len(rows) > top_k:
+                probe = np.argsort(-(centroids @ q))[:self.nprobe]
+                near = rows[np.isin(assign[rows], probe)]
+                if len(near) >= top_k:  # a selective filter can empty the probed buckets
+                    rows = near
+            if not len(rows):
+                return []
+            # unfiltered exact search scores the mapped matrix in place, without a gather copy
+            scores = mat @ q if len(rows) == len(mat) else mat[rows] @ q
+            return self._top(snap, scores, rows, top_k, score_threshold)
+
+    def search_batch(self, query_vectors, top_k: int = 12, score_threshold: Optional[float] = None,
+                     where: Optional[Dict[str, Any]] = None) -> List[list]:
+        if self.centroids is not None or self.dim is None or not self.n:
+            # IVF probes different buckets per query
+            return [self.search(q, top_k, score_threshold, where) for q in query_vectors]
+        if not len(query_vectors):
+            return []
+        qs = _normalize(np.asarray(query_vectors, dtype=np.float32))
+        with self._lock:
+            snap = self._snapshot(where)
+        with snap.payloads:
+            mat, rows = snap.mat, snap.rows
+            if not len(rows):
+                return [[] for _ in query_vectors]
+            # one matrix-matrix product for all queries instead of a pass over the matrix each
+            scores = mat @ qs.T if len(rows) == len(mat) else mat[rows] @ qs.T
+            return [self._top(snap, scores[:, j], rows, top_k, score_threshold)
+                    for j in range(len(qs))]
+
+    def _where_mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = np.ones(self.n, dtype=bool)
+        for key, value in (where or {}).items():
+            values = set(value) if isinstance(value, (list, tuple, set)) else {value}
+            if key in self._vocab:
+                wanted = [self._vocab[key][v] for v in values if v in self._vocab[key]]
+                mask &= np.isin(self._rows[key], wanted)
+            else:
+                # not indexed: reads every payload
+                with open(self.path / "payloads.jsonl", "rb") as f:
+                    found = self._read(self._rows, f, range(self.n))
+                mask &= np.fromiter((pl.get(key) in values for _, pl in found),
+                                    dtype=bool, count=self.n)
+        return mask
+
+    # ---- maintenance ---------------------------------------------------------------
+    def _nearest(self, mat: np.ndarray) -> np.ndarray:
+        out = np.empty(len(mat), dtype=np.int32)
+        for i in range(0, len(mat), _BLOCK):
+            out[i:i + _BLOCK] = np.argmax(np.asarray(mat[i:i + _BLOCK]) @ self.centroids.T, axis=1)
+        return out
+
+    def _build_ivf(self) -> None:
+        rows = np.flatnonzero(self.alive)
+        nlist = max(1, int(np.sqrt(len(rows))))
+        rng = np.random.default_rng(0)
+        sample = np.asarray(self._mat[np.sort(rng.choice(rows, min(len(rows), _KMEANS_SAMPLE), replace=False))])
+        centroids = sample[rng.choice(len(sample), min(nlist, len(sample)), replace=False)]
+        for _ in range(_KMEANS_ITERS):  # spherical k-means
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = ~np.bincount(labels, minlength=len(centroids)).astype(bool)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        self.centroids = centroids.astype(np.float32)
+        self.assign = self._nearest(self._mat)
+        self._trained_on = len(rows)
+        np.savez(self.path / "ivf.npz", centroids=self.centroids, assign=self.assign)
+        log.info(f"built IVF index: rows={len(rows)} lists={len(self.centroids)}")
+
+    def _compact(self) -> None:
+        # rewrite only live rows; row numbers change, so the IVF index is retrained
+        keep = np.flatnonzero(self.alive)
+        with open(self.path / "vectors.f32.tmp", "wb") as f:
+            for i in range(0, len(keep), _BLOCK):
+                f.write(np.asarray(self._mat[keep[i:i + _BLOCK]]).tobytes())
+        rows = np.array(self._rows[keep])
+        rows["off"] = np.cumsum(rows["len"]) - rows["len"]
+        with open(self.path / "payloads.jsonl", "rb") as src, \
+                open(self.path / "payloads.jsonl.tmp", "wb") as f:
+            for off, size in zip(self._rows["off"][keep].tolist(), rows["len"].tolist()):
+                src.seek(off)
+                f.write(src.read(size))
+        rows.tofile(self.path / "rows.bin.tmp")
+        self._mat = self._rows = None
+        # the three files only make sense together: once the marker exists, a crash
+        # part-way through the swap is finished by the next _load
+        (self.path / "compact.done").touch()
+        self._finish_compact()
+        log.info(f"compacted {self.path.name}: {self.n} -> {len(keep)} rows")
+        self._load()
+        if len(keep) >= self.ivf_min_rows:
+            self._build_ivf()
+
+    def _finish_compact(self) -> None:
+        for name in _COMPACTED:
+            if (self.path / f"{name}.tmp").exists():
+                os.replace(self.path / f"{name}.tmp", self.path / name)
+        (self.path / "dead.i64").write_bytes(b"")
+        (self.path / "ivf.npz").unlink(missing_ok=True)
+        (self.path / "compact.done").unlink()
+
+    def drop(self) -> None:
+        with self._lock:
+            self._mat = self._rows = None
+            shutil.rmtree(self.path, ignore_errors=True)
+            self._load()
+
+# Versions: like qdrant_store, "<name>_v<n>" directories; "<name>.live" holds the
+# live one and is replaced atomically (the file-system counterpart of the alias).
+_collections: Dict[str, NumpyCollection] = {}
+_open_lock = threading.Lock()
+
+def _root() -> Path:
+    return Path(settings.data_dir) / "vectors"
+
+def _alias_file() -> Path:
+    return _root() / f"{settings.qdrant_collection}.live"
+
+def _version_no(name: str) -> Optional[int]:
+    prefix = f"{settings.qdrant_collection}_v"
+    tail = name[len(prefix):]
+    return int(tail) if name.startswith(prefix) and tail.isdigit() else None
+
+def versions() -> List[str]:
+    if not _root().is_dir():
+        return []
+    names = [d.name for d in _root().iterdir() if d.is_dir() and _version_no(d.name) is not None]
+    return sorted(names, key=_version_no)
+
+def live_collection() -> Optional[str]:
+    try:
+        return _alias_file().read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+def get_collection(name: Optional[str] = None) -> NumpyCollection:
+    name = name or live_collection() or settings.qdrant_collection
+    with _open_lock:
+        if name not in _collections:
+            _collections[name] = NumpyCollection(
+                _root() / name, ivf_min_rows=settings.ivf_min_rows, nprobe=settings.ivf_nprobe,
+            )
+        return _collections[name]
+
+def _no_mini(value) -> None:
+    if value is not None:
+        raise ValueError("the numpy backend has no two-stage (MINI_DIM) search")
+
+def ensure_collection(dim: int, new_version: bool = False, mini_dim: Optional[int] = None) -> str:
+    _no_mini(mini_dim or None)
+    live = live_collection()
+    if live is not None and not new_version:
+        col = get_collection(live)
+        if col.dim in (None, dim):
+            col.ensure(dim)
+            return live
+        log.info(f"dimension changed on {live}, building a new version next to it")
+    n = max([_version_no(v) for v in versions()] or [0]) + 1
+    name = f"{settings.qdrant_collection}_v{n}"
+    get_collection(name).ensure(dim)
+    if live is None:
+        promote(name)
+    return name
+
+def promote(name: str) -> List[str]:
+    _root().mkdir(parents=True, exist_ok=True)
+    tmp = _alias_file().with_suffix(".tmp")
+    tmp.write_text(name, encoding="utf-8")
+    os.replace(tmp, _alias_file())
+    dropped = [v for v in versions() if v != name]
+    for v in dropped:
+        drop_version(v)
+    log.info(f"{settings.qdrant_collection} -> {name}; dropped {dropped or 'nothing'}")
+    return dropped
+
+def drop_version(name: str) -> None:
+    if name == live_collection():
+        return
+    with _open_lock:
+        col = _collections.pop(name, None)
+    if col is not None:
+        col.drop()
+    else:
+        shutil.rmtree(_root() / name, ignore_errors=True)
+
+def drop_collection() -> None:
+    _alias_file().unlink(missing_ok=True)
+    for v in versions():
+        drop_version(v)
+
+# same module-level API as qdrant_store (see vector.store)
+
+def upsert(vectors, payloads: Iterable[Dict[str, Any]], ids: Optional[Iterable[Union[int, str]]] = None,
+           collection: Optional[str] = None):
+    payloads = list(payloads)
+    ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in payloads]
+    get_collection(collection).upsert(vectors, payloads, ids)
+
+class BulkWriter:
+    """Same interface as qdrant_store.BulkWriter; writes here are synchronous already."""
+
+    def __init__(self, collection: Optional[str] = None, bulk: bool = False):
+        self.collection = collection
+
+    def upsert(self, vectors, payloads: List[Dict[str, Any]], ids: List[Union[int, str]],
+               mini=None) -> None:
+        _no_mini(mini)
+        upsert(vectors, payloads, ids, collection=self.collection)
+
+    def finish(self, wait_for_index: bool = False) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+def delete_by_source(sources: Iterable[str], collection: Optional[str] = None) -> None:
+    get_collection(collection).delete_by_source(sources)
+
+def search(
+    query_vector: Union[List[float], Tuple[float, ...]],
+    top_k: int = 12,
+    score_threshold: Optional[float] = None,
+    query_filter=None,
+    where: Optional[Dict[str, Any]] = None,
+    collection: Optional[str] = None,
+    mini_vector=None,
+):
+    _no_mini(mini_vector)
+    if query_filter is not None:
+        raise ValueError("the numpy backend filters with `where` only")
+    return get_collection(collection).search(query_vector, top_k, score_threshold, where)
+
+def search_batch(
+    query_vectors: List[List[float]],
+    top_k: int = 12,
+    score_threshold: Optional[float] = None,
+    where: Optional[Dict[str, Any]] = None,
+    collection: Optional[str] = None,
+    mini_vectors=None,
+):
+    _no_mini(mini_vectors)
+    return get_collection(collection).search_batch(query_vectors, top_k, score_threshold, where)
@@ -1,41 +1,284 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Iterable, List, Dict, Any, Optional, Tuple, Union
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter
+from qdrant_client.http.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchAny, MatchValue,
+    FilterSelector, PayloadSchemaType, HnswConfigDiff, ScalarQuantization,
+    ScalarQuantizationConfig, ScalarType, BinaryQuantization, BinaryQuantizationConfig,
+    SearchParams, QuantizationSearchParams, VectorParamsDiff, CollectionParamsDiff, Disabled,
+    CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation, SearchRequest,
+    CollectionStatus, Prefetch, QueryRequest,
+)
 from ..config import settings  # <- use .env
 
-client = QdrantClient(
-    url=f"http://{settings.qdrant_host}:{settings.qdrant_port}",
-    prefer_grpc=False,
-    timeout=30.0,
-)
+log = logging.getLogger("lr.vector.qdrant")
+
+def _make_client() -> QdrantClient:
+    # QDRANT_LOCATION switches to qdrant-client's embedded local mode (tests, benchmarks)
+    if settings.qdrant_location == ":memory:":
+        return QdrantClient(location=":memory:")
+    if settings.qdrant_location:
+        return QdrantClient(path=settings.qdrant_location)
+    return QdrantClient(
+        url=f"http://{settings.qdrant_host}:{settings.qdrant_port}",
+        grpc_port=settings.qdrant_grpc_port,
+        prefer_grpc=settings.qdrant_grpc,
+        timeout=30.0,
+    )
+
+client = _make_client()
 COLLECTION_NAME = settings.qdrant_collection
 
-def ensure_collection(dim: int) -> None:
-    # If exists, verify dim; recreate if different
-    try:
-        info = client.get_collection(collection_name=COLLECTION_NAME)
-        # Qdrant 1.9+ exposes config like this:
-        current_dim = None
-        params = getattr(info, "config", None) and getattr(info.config, "params", None)
-        vectors = params and getattr(params, "vectors", None)
-        if hasattr(vectors, "size"):
-            current_dim = vectors.size  # single-vector collection
-        elif isinstance(vectors, dict) and "size" in vectors:
-            current_dim = vectors["size"]
-
-        if current_dim == dim:
-            return
-
-        # Dimension mismatch -> recreate
-        client.delete_collection(collection_name=COLLECTION_NAME)
-    except Exception:
-        # Not existing or cannot read -> create fresh
-        pass
+# keyword indexes so filters on these run inside Qdrant instead of in Python
+INDEXED_FIELDS = ("source", "ext")
+# named vector of two-stage versions (see vector.mini); the full embedding stays unnamed
+MINI_VECTOR = "mini"
+
+# Collection profiles (COLLECTION_PROFILE): memory vs recall vs latency trade-offs.
+# Quantized profiles search the small in-RAM copy first, then rescore an
+# `oversampling`x larger candidate set with the original vectors.
+PROFILES: Dict[str, Dict[str, Any]] = {
+    # float32 vectors and payloads in RAM, Qdrant's default graph (m=16, ef_construct=100)
+    "default": {},
+    # int8 copy in RAM (4x smaller), originals and payloads on disk
+    "compact": {"quantization": "scalar", "on_disk": True, "on_disk_payload": True, "oversampling": 2.0},
+    # 1 bit per dimension in RAM (32x smaller); meant for >=768-dim embedding models
+    "binary": {"quantization": "binary", "on_disk": True, "on_disk_payload": True, "oversampling": 3.0},
+    # denser graph and wider search: best recall, slower indexing, more RAM
+    "accurate": {"m": 32, "ef_construct": 256, "ef": 128},
+}
+_PROFILE_DEFAULTS = {
+    "quantization": None, "on_disk": False, "on_disk_payload": False,
+    "m": None, "ef_construct": None, "ef": None, "oversampling": None,
+}
+
+def profile(name: Optional[str] = None) -> Dict[str, Any]:
+    name = (name or settings.collection_profile).lower()
+    if name not in PROFILES:
+        raise ValueError(f"unknown COLLECTION_PROFILE {name!r} (choose from {', '.join(PROFILES)})")
+    p = {**_PROFILE_DEFAULTS, **PROFILES[name], "name": name}
+    for key, value in (("m", settings.hnsw_m), ("ef_construct", settings.hnsw_ef_construct),
+                       ("ef", settings.hnsw_ef)):
+        if value:
+            p[key] = value
+    return p
+
+PROFILE = profile()
+
+def _hnsw_config(p: Dict[str, Any]) -> Optional[HnswConfigDiff]:
+    if p["m"] is None and p["ef_construct"] is None:
+        return None
+    return HnswConfigDiff(m=p["m"], ef_construct=p["ef_construct"])
+
+def _quantization_config(p: Dict[str, Any]):
+    # always_ram: the quantized copy is what gets scanned, so it must not page in from disk
+    if p["quantization"] == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8, quantile=0.99, always_ram=True))
+    if p["quantization"] == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def search_params(p: Optional[Dict[str, Any]] = None) -> Optional[SearchParams]:
+    p = p or PROFILE
+    quant = None
+    if p["quantization"]:
+        quant = QuantizationSearchParams(rescore=True, oversampling=p["oversampling"])
+    if quant is None and p["ef"] is None:
+        return None
+    return SearchParams(hnsw_ef=p["ef"], quantization=quant)
+
+def _two_stage(info) -> bool:
+    vectors = info.config.params.vectors
+    return isinstance(vectors, dict) and MINI_VECTOR in vectors
+
+def _profile_drift(info, p: Dict[str, Any]) -> bool:
+    # only what the profile sets is compared; unset knobs keep whatever the collection has
+    # (two-stage versions keep their full vectors on disk whatever the profile says)
+    cfg = info.config
+    hnsw = cfg.hnsw_config
+    quant = cfg.quantization_config
+    kind = "scalar" if isinstance(quant, ScalarQuantization) else (
+        "binary" if isinstance(quant, BinaryQuantization) else None)
+    return (
+        (p["m"] is not None and hnsw.m != p["m"])
+        or (p["ef_construct"] is not None and hnsw.ef_construct != p["ef_construct"])
+        or kind != p["quantization"]
+        or (not _two_stage(info)
+            and bool(getattr(cfg.params.vectors, "on_disk", False)) != p["on_disk"])
+        or bool(cfg.params.on_disk_payload) != p["on_disk_payload"]
+    )
 
+def _apply_profile(info, p: Dict[str, Any], name: str) -> None:
+    # local mode accepts but ignores index settings, so there is nothing to reconcile
+    if settings.qdrant_location or not _profile_drift(info, p):
+        return
+    log.info(f"updating collection {name} to profile {p['name']}")
+    client.update_collection(
+        collection_name=name,
+        vectors_config=None if _two_stage(info) else {"": VectorParamsDiff(on_disk=p["on_disk"])},
+        hnsw_config=_hnsw_config(p),
+        quantization_config=_quantization_config(p) or Disabled.DISABLED,
+        collection_params=CollectionParamsDiff(on_disk_payload=p["on_disk_payload"]),
+    )
+
+# Versioned collections: points live in physical collections "<name>_v<n>" and
+# COLLECTION_NAME is a Qdrant alias for the live one. A rebuild fills a new version
+# while queries keep hitting the alias, then promote() swaps it atomically.
+
+def _version_no(name: str) -> Optional[int]:
+    prefix = f"{COLLECTION_NAME}_v"
+    tail = name[len(prefix):]
+    return int(tail) if name.startswith(prefix) and tail.isdigit() else None
+
+def versions() -> List[str]:
+    names = [c.name for c in client.get_collections().collections]
+    return sorted((n for n in names if _version_no(n) is not None), key=_version_no)
+
+def live_collection() -> Optional[str]:
+    for a in client.get_aliases().aliases:
+        if a.alias_name == COLLECTION_NAME:
+            return a.collection_name
+    return None
+
+def _vector_size(info) -> Optional[int]:
+    # Qdrant 1.9+ exposes config like this:
+    params = getattr(info, "config", None) and getattr(info.config, "params", None)
+    vectors = params and getattr(params, "vectors", None)
+    if hasattr(vectors, "size"):
+        return vectors.size  # single-vector collection
+    if isinstance(vectors, dict) and "size" in vectors:
+        return vectors["size"]
+    if isinstance(vectors, dict) and "" in vectors:
+        return vectors[""].size  # named vectors: the full embedding is the unnamed one
+    return None
+
+def _mini_size(info) -> Optional[int]:
+    return info.config.params.vectors[MINI_VECTOR].size if _two_stage(info) else None
+
+def migrate_legacy() -> Optional[str]:
+    """
+    One-time move of a pre-versioning collection (a real collection named
+    COLLECTION_NAME) into "<name>_v1" behind the alias. Returns the new name, if any.
+    """
+    if COLLECTION_NAME not in {c.name for c in client.get_collections().collections}:
+        return None
+    info = client.get_collection(collection_name=COLLECTION_NAME)
+    target = f"{COLLECTION_NAME}_v1"
+    log.info(f"migrating collection {COLLECTION_NAME} -> {target} (+ alias)")
+    _create(target, _vector_size(info))
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=COLLECTION_NAME, limit=512, offset=offset,
+                                       with_payload=True, with_vectors=True)
+        if points:
+            client.upsert(collection_name=target, points=[
+                PointStruct(id=pt.id, vector=pt.vector, payload=pt.payload) for pt in points
+            ])
+        if offset is None:
+            break
+    # an alias cannot share its name with a collection: the old one goes first
+    client.delete_collection(collection_name=COLLECTION_NAME)
+    promote(target)
+    return target
+
+def _create(name: str, dim: int, mini_dim: Optional[int] = None) -> None:
+    p = PROFILE
+    vectors: Any = VectorParams(size=dim, distance=Distance.COSINE, on_disk=p["on_disk"])
+    if mini_dim:
+        # the graph (and RAM) goes to the small vectors; full ones only rescore a shortlist
+        vectors = {
+            "": VectorParams(size=dim, distance=Distance.COSINE, on_disk=True,
+                             hnsw_config=HnswConfigDiff(m=0)),
+            MINI_VECTOR: VectorParams(size=mini_dim, distance=Distance.COSINE),
+        }
     client.create_collection(
-        collection_name=COLLECTION_NAME,
-        vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        collection_name=name,
+        vectors_config=vectors,
+        hnsw_config=_hnsw_config(p),
+        quantization_config=_quantization_config(p),
+        on_disk_payload=p["on_disk_payload"],
     )
+    _ensure_payload_indexes(name)
+
+def ensure_collection(dim: int, new_version: bool = False, mini_dim: Optional[int] = None) -> str:
+    """
+    -> physical collection to write to. That is the live one, unless `new_version`
+    is asked for or `dim` (or `mini_dim`, the two-stage vector size) changed: then a
+    new, not yet live version is created and the caller promote()s it once it is
+    filled. With no live version at all the new one goes live right away (nothing
+    to protect).
+    """
+    live = live_collection()
+    if live is not None and not new_version:
+        info = client.get_collection(collection_name=live)
+        if _vector_size(info) == dim and _mini_size(info) == (mini_dim or None):
+            if info.config.hnsw_config.m == 0 and not settings.qdrant_location:
+                log.warning(f"{live} was left unindexed by an interrupted bulk load; indexing it")
+                _set_hnsw_m(live, PROFILE["m"] or _DEFAULT_M)
+            _apply_profile(info, PROFILE, live)
+            _ensure_payload_indexes(live, info)
+            return live
+        log.info(f"vector size changed on {live}, building a new version next to it")
+    n = max([_version_no(v) for v in versions()] or [0]) + 1
+    name = f"{COLLECTION_NAME}_v{n}"
+    _create(name, dim, mini_dim)
+    if live is None:
+        promote(name)
+    return name
+
+def promote(name: str) -> List[str]:
+    """Point the alias at `name` (one atomic alias update), then drop the other versions."""
+    live = live_collection()
+    ops = []
+    if live is not None:
+        ops.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=COLLECTION_NAME)))
+    ops.append(CreateAliasOperation(create_alias=CreateAlias(
+        collection_name=name, alias_name=COLLECTION_NAME)))
+    client.update_collection_aliases(change_aliases_operations=ops)
+    dropped = [v for v in versions() if v != name]
+    for v in dropped:
+        client.delete_collection(collection_name=v)
+    log.info(f"{COLLECTION_NAME} -> {name}; dropped {dropped or 'nothing'}")
+    return dropped
+
+def drop_version(name: str) -> None:
+    if name != live_collection() and client.collection_exists(collection_name=name):
+        client.delete_collection(collection_name=name)
+
+def drop_collection() -> None:
+    # the alias and every version (tests, wipe script)
+    if live_collection() is not None:
+        client.update_collection_aliases(change_aliases_operations=[
+            DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=COLLECTION_NAME))])
+    for v in versions():
+        client.delete_collection(collection_name=v)
+
+def _ensure_payload_indexes(name: str, info=None) -> None:
+    have = set((getattr(info, "payload_schema", None) or {}).keys())
+    for field in INDEXED_FIELDS:
+        if field not in have:
+            client.create_payload_index(
+                collection_name=name,
+                field_name=field,
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
+
+def match_filter(where: Optional[Dict[str, Any]]) -> Optional[Filter]:
+    """{"ext": ".pdf", "source": ["a.pdf", "b.pdf"]} -> Filter(must=[...])"""
+    if not where:
+        return None
+    must = []
+    for key, value in where.items():
+        if isinstance(value, (list, tuple, set)):
+            must.append(FieldCondition(key=key, match=MatchAny(any=list(value))))
+        else:
+            must.append(FieldCondition(key=key, match=MatchValue(value=value)))
+    return Filter(must=must)
 
 def _to_list(vec):
     try:
@@ -46,16 +289,21 @@ def _to_list(vec):
         pass
     return list(vec)
 
+def _point_vector(vec, mini=None):
+    return _to_list(vec) if mini is None else {"": _to_list(vec), MINI_VECTOR: _to_list(mini)}
+
 def upsert(
     points_or_vectors: Iterable,
     payloads: Optional[Iterable[Dict[str, Any]]] = None,
     ids: Optional[Iterable[Union[int, str]]] = None,
     batch_size: int = 512,
+    collection: Optional[str] = None,
 ):
     """
     Supports:
       A) upsert([{"id": "...", "vector": [...], "payload": {...}}, ...])
       B) upsert(vectors=[...], payloads=[...], ids=[...])
+    `collection` defaults to the alias (the live version).
     """
     # Mode A: list of point dicts
     if payloads is None and (
@@ -74,7 +322,7 @@ def upsert(
             pl = p.get("payload") or {k: v for k, v in p.items() if k not in ("id", "vector", "embedding", "values")}
             pls.append(pl or {})
             id_list.append(p.get("id"))
-        _upsert_batches(vectors, pls, id_list, batch_size=batch_size)
+        _upsert_batches(vectors, pls, id_list, batch_size=batch_size, collection=collection)
         return
 
     # Mode B: vectors/payloads/ids
@@ -92,30 +340,182 @@ def upsert(
     if len(pl_list) != len(vec_list):
         raise ValueError("Length of payloads must match vectors.")
 
-    _upsert_batches(vec_list, pl_list, id_list, batch_size=batch_size)
+    _upsert_batches(vec_list, pl_list, id_list, batch_size=batch_size, collection=collection)
 
 def _upsert_batches(
     vectors: List[List[float]],
     payloads: List[Dict[str, Any]],
     ids: List[Optional[Union[int, str]]],
     batch_size: int = 512,
+    collection: Optional[str] = None,
 ) -> None:
-    n = len(vectors)
-    for i in range(0, n, batch_size):
-        chunk = []
-        for vec, pl, pid in zip(vectors[i:i+batch_size], payloads[i:i+batch_size], ids[i:i+batch_size]):
-            point = {"vector": vec, "payload": pl}
-            if pid is not None:
-                point["id"] = pid
-            chunk.append(point)
-        client.upsert(collection_name=COLLECTION_NAME, points=chunk)
+    writer = BulkWriter(collection, batch_size=batch_size)
+    try:
+        writer.upsert(vectors, payloads, ids)
+        writer.finish()
+    except BaseException:
+        writer.abort()
+        raise
+
+# ---- bulk loading --------------------------------------------------------------------
+_DEFAULT_M = 16  # Qdrant's default graph degree
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+def _upsert_pool() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, settings.upsert_parallel),
+                                           thread_name_prefix="lr-qdrant-upsert")
+        return _executor
+
+def _set_hnsw_m(name: str, m: int) -> None:
+    client.update_collection(collection_name=name, hnsw_config=HnswConfigDiff(m=m))
+
+def wait_indexed(name: str, timeout_s: float) -> bool:
+    """Wait until the optimizers are done with `name` (status green)."""
+    deadline = time.monotonic() + timeout_s
+    while client.get_collection(collection_name=name).status != CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            log.warning(f"{name} still indexing after {timeout_s:.0f}s; continuing anyway")
+            return False
+        time.sleep(1.0)
+    return True
+
+class BulkWriter:
+    """
+    Upserts of one load into one collection. Requests go out with wait=False (Qdrant
+    acknowledges them once they are in its WAL) and up to `parallel` are in flight, so
+    a load is bounded by Qdrant's ingest rate, not by round trips; finish() is the barrier:
+    it waits for every request, then for one more sent with wait=True, and before a
+    staged version is promoted, until the collection counts every point written.
+
+    With `bulk`, HNSW indexing is off (m=0) during the load and the graph is built once
+    at the end. Only for collections nobody queries yet: search falls back to full scans.
+    """
+
+    def __init__(self, collection: Optional[str] = None, parallel: Optional[int] = None,
+                 bulk: bool = False, batch_size: int = 512):
+        self.name = collection or COLLECTION_NAME
+        self.batch_size = batch_size
+        # local mode is in-process and synchronous: nothing to overlap
+        self.parallel = (0 if settings.qdrant_location
+                         else max(1, parallel or settings.upsert_parallel))
+        self._slots = threading.BoundedSemaphore(max(1, self.parallel))
+        self._futures: List[Future] = []
+        self._last: Optional[List[PointStruct]] = None
+        self._ids: set = set()  # ids sent with wait=False, for finish()
+        self._m: Optional[int] = None
+        if bulk and self.parallel:
+            self._m = client.get_collection(collection_name=self.name).config.hnsw_config.m
+            self._m = self._m or PROFILE["m"] or _DEFAULT_M
+            _set_hnsw_m(self.name, 0)
+            log.info(f"bulk load into {self.name}: HNSW indexing off until it is done")
+
+    def upsert(self, vectors, payloads: List[Dict[str, Any]],
+               ids: List[Optional[Union[int, str]]], mini=None) -> None:
+        # mini: the reduced vectors of a two-stage collection, row for row
+        self._raise_failed()
+        n = self.batch_size
+        for i in range(0, len(vectors), n):
+            minis = [None] * len(vectors[i:i+n]) if mini is None else mini[i:i+n]
+            chunk = [
+                PointStruct(id=pid if pid is not None else str(uuid.uuid4()),
+                            vector=_point_vector(vec, m), payload=pl)
+                for vec, m, pl, pid in zip(vectors[i:i+n], minis, payloads[i:i+n], ids[i:i+n])
+            ]
+            if not self.parallel:
+                client.upsert(collection_name=self.name, points=chunk)
+                continue
+            self._slots.acquire()  # blocks while `parallel` requests are unacknowledged
+            try:
+                fut = _upsert_pool().submit(client.upsert, collection_name=self.name,
+                                            points=chunk, wait=False)
+            except BaseException:
+                self._slots.release()
+                raise
+            fut.add_done_callback(lambda _: self._slots.release())
+            self._futures.append(fut)
+            self._last = chunk
+            self._ids.update(p.id for p in chunk)
+
+    def _raise_failed(self) -> None:
+        pending = []
+        for fut in self._futures:
+            if fut.done():
+                fut.result()
+            else:
+                pending.append(fut)
+        self._futures = pending
+
+    def finish(self, wait_for_index: bool = False) -> None:
+        # every request, not just up to the first failure: none may still be in flight
+        errors = [fut.exception() for fut in self._futures]
+        self._futures = []
+        for e in errors:
+            if e is not None:
+                raise e
+        if self._last is not None:
+            # sent after every other request was acknowledged, and Qdrant applies updates
+            # in WAL order: once this one is applied, so are all the others
+            client.upsert(collection_name=self.name, points=self._last, wait=True)
+            self._last = None
+        if wait_for_index and self._ids:
+            self._wait_counted(settings.bulk_index_wait_s)
+        self._ids = set()
+        self._restore_index()
+        if wait_for_index and self.parallel:
+            wait_indexed(self.name, settings.bulk_index_wait_s)
+
+    def _wait_counted(self, timeout_s: float) -> None:
+        # only for a staged version: nothing else writes to it or deletes from it
+        deadline = time.monotonic() + timeout_s
+        while (got := client.count(collection_name=self.name, exact=True).count) < len(self._ids):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{self.name} holds {got} of {len(self._ids)} points "
+                                   f"after {timeout_s:.0f}s; not promoting it")
+            time.sleep(0.5)
+
+    def abort(self) -> None:
+        for fut in self._futures:
+            fut.exception()  # wait; the error that got us here is already being raised
+        self._futures = []
+        self._ids = set()
+        self._restore_index()
+
+    def _restore_index(self) -> None:
+        if self._m is not None:
+            _set_hnsw_m(self.name, self._m)
+            log.info(f"bulk load into {self.name} done: building the HNSW index (m={self._m})")
+            self._m = None
+
+def delete_by_source(sources: Iterable[str], collection: Optional[str] = None) -> None:
+    sources = list(dict.fromkeys(sources))
+    name = collection or COLLECTION_NAME
+    if not sources or not client.collection_exists(collection_name=name):
+        return
+    client.delete(
+        collection_name=name,
+        points_selector=FilterSelector(filter=match_filter({"source": sources})),
+        wait=True,
+    )
 
 def search(
     query_vector: Union[List[float], Tuple[float, ...]],
     top_k: int = 12,
     score_threshold: Optional[float] = None,
     query_filter: Optional[Filter] = None,
+    where: Optional[Dict[str, Any]] = None,
+    collection: Optional[str] = None,
+    mini_vector=None,
 ):
+    # mini_vector: the query reduced like the collection's mini vectors -> two-stage search
+    if mini_vector is not None:
+        req = two_stage_requests([query_vector], [mini_vector], top_k, score_threshold,
+                                 query_filter or match_filter(where))
+        res = client.query_batch_points(collection_name=collection or COLLECTION_NAME, requests=req)
+        return _hits(res[0].points)
     try:
         if hasattr(query_vector, "tolist"):
             query_vector = query_vector.tolist()
@@ -123,11 +523,68 @@ def search(
         query_vector = list(query_vector)
 
     results = client.search(
-        collection_name=COLLECTION_NAME,
+        collection_name=collection or COLLECTION_NAME,
         query_vector=query_vector,
         limit=top_k,
         with_payload=True,
         score_threshold=score_threshold,
-        query_filter=query_filter,
+        query_filter=query_filter or match_filter(where),
+        search_params=search_params(),
     )
+    return _hits(results)
+
+def _hits(results) -> List[Tuple[Any, float, Dict[str, Any]]]:
     return [(r.id, float(r.score), dict(r.payload or {})) for r in results]
+
+# the shortlist is small: score it with the original floats, never a quantized copy
+_RESCORE = SearchParams(quantization=QuantizationSearchParams(ignore=True))
+
+def two_stage_requests(query_vectors, mini_vectors, top_k: int, score_threshold: Optional[float],
+                       flt: Optional[Filter]) -> List[QueryRequest]:
+    """Graph search on the mini vectors for a MINI_OVERSAMPLING x larger shortlist,
+    rescored with the full vectors; one request per query."""
+    shortlist = top_k * max(1, settings.mini_oversampling)
+    return [
+        QueryRequest(
+            prefetch=Prefetch(query=_to_list(m), using=MINI_VECTOR, limit=shortlist, filter=flt,
+                              params=search_params()),
+            query=_to_list(q), limit=top_k, score_threshold=score_threshold, with_payload=True,
+            params=_RESCORE,
+        )
+        for q, m in zip(query_vectors, mini_vectors)
+    ]
+
+def search_requests(query_vectors, top_k: int, score_threshold: Optional[float],
+                    where: Optional[Dict[str, Any]]) -> List[SearchRequest]:
+    flt = match_filter(where)
+    return [
+        SearchRequest(
+            vector=list(v.tolist() if hasattr(v, "tolist") else v), limit=top_k, with_payload=True,
+            score_threshold=score_threshold, filter=flt, params=search_params(),
+        )
+        for v in query_vectors
+    ]
+
+def search_batch(
+    query_vectors: List[List[float]],
+    top_k: int = 12,
+    score_threshold: Optional[float] = None,
+    where: Optional[Dict[str, Any]] = None,
+    collection: Optional[str] = None,
+    mini_vectors=None,
+):
+    """One request for many queries (same filter) -> [[(id, score, payload)], ...]."""
+    if not len(query_vectors):
+        return []
+    if mini_vectors is not None:
+        res = client.query_batch_points(
+            collection_name=collection or COLLECTION_NAME,
+            requests=two_stage_requests(query_vectors, mini_vectors, top_k, score_threshold,
+                                        match_filter(where)),
+        )
+        return [_hits(r.points) for r in res]
+    batches = client.search_batch(
+        collection_name=collection or COLLECTION_NAME,
+        requests=search_requests(query_vectors, top_k, score_threshold, where),
+    )
+    return [_hits(rs) for rs in batches]
@@ -0,0 +1,60 @@
+import json
+import os
+import threading
+from pathlib import Path
+from ..config import settings
+
+# physical collection -> {"provider", "model", "dim"} it was built with, so queries
+# keep using the live version's embedding model until a rebuild is promoted, plus a
+# "generation" bumped by every ingest that changes its contents (see rag.answer_cache)
+_lock = threading.Lock()
+_cache: tuple[tuple, dict] | None = None
+
+def _path() -> Path:
+    return Path(settings.data_dir) / "collections.json"
+
+def _key(st: os.stat_result) -> tuple:
+    return str(_path()), st.st_mtime_ns, st.st_size
+
+def _read() -> dict:
+    global _cache
+    try:
+        key = _key(_path().stat())
+    except FileNotFoundError:
+        return {}
+    if _cache is None or _cache[0] != key:
+        _cache = (key, json.loads(_path().read_text(encoding="utf-8")))
+    return _cache[1]
+
+def _write(data: dict) -> None:
+    global _cache
+    _path().parent.mkdir(parents=True, exist_ok=True)
+    tmp = _path().with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+    os.replace(tmp, _path())
+    # coarse mtimes could hide a write made in the same tick as the last read
+    _cache = (_key(_path().stat()), data)
+
+def version_info(name: str | None) -> dict | None:
+    if name is None:
+        return None
+    with _lock:
+        return _read().get(name)
+
+def record_version(name: str, **info) -> None:
+    with _lock:
+        data = _read()
+        _write({**data, name: {**data.get(name, {}), **info}})
+
+def bump_generation(name: str) -> int:
+    with _lock:
+        data = _read()
+        info = {**data.get(name, {})}
+        info["generation"] = info.get("generation", 0) + 1
+        _write({**data, name: info})
+        return info["generation"]
+
+def forget_versions(names: list[str]) -> None:
+    with _lock:
+        data = {k: v for k, v in _read().items() if k not in names}
+        _write(data)
@@ -0,0 +1,158 @@
+import asyncio
+import importlib
+import re
+import sys
+import time
+from pathlib import Path
+from ..config import settings
+from .mini import drop_projection
+from .registry import forget_versions
+
+# VECTOR_BACKEND -> module with ensure_collection / upsert / delete_by_source / search
+# and the version API (live_collection / versions / promote / drop_version); qdrant_store
+# also has migrate_legacy, for the unversioned collection of earlier installs
+BACKENDS = {
+    "qdrant": "lr.vector.qdrant_store",
+    "numpy": "lr.vector.numpy_store",
+}
+
+# how long another process's promote() may go unnoticed by this one
+_LIVE_TTL_S = 5.0
+
+_store = None
+_live: tuple[float, str | None] | None = None
+
+def get_store():
+    # imported on first use: the numpy backend never loads qdrant_client
+    global _store
+    if _store is None:
+        if settings.vector_backend not in BACKENDS:
+            raise ValueError(f"unknown VECTOR_BACKEND {settings.vector_backend!r} "
+                             f"(choose from {', '.join(BACKENDS)})")
+        _store = importlib.import_module(BACKENDS[settings.vector_backend])
+    return _store
+
+def live_collection(refresh: bool = False) -> str | None:
+    """Physical collection behind the alias (None before the first versioned ingest)."""
+    global _live
+    if refresh or _live is None or time.monotonic() - _live[0] > _LIVE_TTL_S:
+        _live = (time.monotonic(), get_store().live_collection())
+    return _live[1]
+
+def local_state_name(collection: str | None = None) -> str:
+    # name for per-version local files (BM25 index, docstore); pre-versioning
+    # installs keep using the ones named after the collection itself
+    return collection or live_collection() or settings.qdrant_collection
+
+def _rename_legacy_state(target: str) -> None:
+    from ..rag.docstore import close_docstore
+    from ..rag.sparse import close_sparse_index
+    close_sparse_index(settings.qdrant_collection)
+    close_docstore(settings.qdrant_collection)
+    data = Path(settings.data_dir)
+    for prefix in ("sparse_", "docs_"):
+        for suffix in ("", "-wal", "-shm"):
+            old = data / f"{prefix}{settings.qdrant_collection}.sqlite{suffix}"
+            if old.exists():
+                old.replace(data / f"{prefix}{target}.sqlite{suffix}")
+
+def ensure_collection(dim: int, new_version: bool = False, mini_dim: int | None = None) -> str:
+    store = get_store()
+    migrated = store.migrate_legacy() if hasattr(store, "migrate_legacy") else None
+    if migrated is not None:
+        _rename_legacy_state(migrated)
+    name = store.ensure_collection(dim, new_version=new_version, mini_dim=mini_dim)
+    live_collection(refresh=True)
+    return name
+
+def promote(name: str) -> list[str]:
+    """Make `name` live (atomic swap), then drop older versions and their local state."""
+    from ..rag.docstore import drop_docstore
+    from ..rag.sparse import drop_sparse_index
+    dropped = get_store().promote(name)
+    live_collection(refresh=True)
+    # plus files of versions dropped earlier whose delete failed (open elsewhere)
+    stale = set(dropped) | {n for n in _local_state_versions() if n != name}
+    for old in stale:
+        drop_sparse_index(old)
+        drop_docstore(old)
+        drop_projection(old)
+    forget_versions(sorted(stale))
+    return dropped
+
+def _local_state_versions() -> set[str]:
+    data = Path(settings.data_dir)
+    pattern = re.compile(
+        rf"(?:sparse_|docs_|mini_)({re.escape(settings.qdrant_collection)}_v\d+)\.(?:sqlite|npz)")
+    return {m.group(1) for f in data.glob("*") if (m := pattern.fullmatch(f.name))}
+
+def drop_version(name: str) -> None:
+    from ..rag.docstore import drop_docstore
+    from ..rag.sparse import drop_sparse_index
+    get_store().drop_version(name)
+    drop_sparse_index(name)
+    drop_docstore(name)
+    drop_projection(name)
+    forget_versions([name])
+
+def versions() -> list[str]:
+    return get_store().versions()
+
+def upsert(vectors, payloads=None, ids=None, collection=None):
+    return get_store().upsert(vectors, payloads=payloads, ids=ids, collection=collection)
+
+def bulk_writer(collection=None, bulk: bool = False):
+    """Writer for one load: upsert(vectors, payloads, ids, mini=None)..., then finish()
+    or abort()."""
+    return get_store().BulkWriter(collection, bulk=bulk)
+
+def delete_by_source(sources, collection=None) -> None:
+    return get_store().delete_by_source(sources, collection=collection)
+
+# mini_vector(s): the query reduced by the collection's projection (vector.mini), for
+# two-stage search; None searches the full vectors directly
+
+def search(query_vector, top_k: int = 12, score_threshold=None, query_filter=None, where=None,
+           collection=None, mini_vector=None):
+    return get_store().search(query_vector, top_k, score_threshold, query_filter, where, collection,
+                              mini_vector)
+
+async def asearch(query_vector, top_k: int = 12, score_threshold=None, query_filter=None, where=None,
+                  collection=None, mini_vector=None):
+    if settings.vector_backend == "qdrant":
+        from . import async_qdrant_store
+        return await async_qdrant_store.search(
+            query_vector, top_k, score_threshold, query_filter, where, collection, mini_vector)
+    # in-process index: CPU work, kept off the event loop
+    return await asyncio.to_thread(
+        search, query_vector, top_k, score_threshold, query_filter, where, collection, mini_vector)
+
+def search_batch(query_vectors, top_k: int = 12, score_threshold=None, where=None, collection=None,
+                 mini_vectors=None):
+    return get_store().search_batch(query_vectors, top_k, score_threshold, where, collection,
+                                    mini_vectors)
+
+async def asearch_batch(query_vectors, top_k: int = 12, score_threshold=None, where=None,
+                        collection=None, mini_vectors=None):
+    if settings.vector_backend == "qdrant":
+        from . import async_qdrant_store
+        return await async_qdrant_store.search_batch(
+            query_vectors, top_k, score_threshold, where, collection, mini_vectors)
+    return await asyncio.to_thread(
+        search_batch, query_vectors, top_k, score_threshold, where, collection, mini_vectors)
+
+async def awarm() -> str | None:
+    """Loads the backend and opens its connections (API startup); -> the live version."""
+    live = await asyncio.to_thread(live_collection, True)
+    if settings.vector_backend == "numpy" and live is not None:
+        await asyncio.to_thread(get_store().get_collection, live)  # reads its row log
+    elif settings.vector_backend == "qdrant" and not settings.qdrant_location:
+        from . import async_qdrant_store
+        await async_qdrant_store.get_client().get_collections()
+    return live
+
+async def aclose() -> None:
+    # only if the async Qdrant client was ever loaded
+    mod = sys.modules.get("lr.vector.async_qdrant_store")
+    if mod is not None:
+        await mod.aclose()
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from .config import settings
+from . import metrics
+
+log = logging.getLogger("lr.warmup")
+
+# longest pause between attempts at a step that keeps failing (e.g. Ollama not up yet)
+_MAX_BACKOFF_S = 30.0
+
+async def _vector():
+    # the backend, its connections and the live version's local indexes
+    from .rag.answer_cache import get_answer_cache
+    from .rag.docstore import get_docstore
+    from .rag.sparse import get_sparse_index
+    from .vector.store import awarm
+    live = await awarm()
+
+    def local():
+        if settings.hybrid:
+            get_sparse_index(live)
+        if settings.docstore:
+            get_docstore(live)
+        get_answer_cache()  # None with ANSWER_CACHE=0
+    await asyncio.to_thread(local)
+
+async def _embed():
+    # loads the embedding model the live version was built with
+    from .rag.retrieve import aembed_query
+    await aembed_query("warm-up")
+
+async def _rerank():
+    from .rag.rerank import get_reranker
+    await asyncio.to_thread(get_reranker)
+
+async def _chat():
+    from .rag.answer import get_async_chat
+    await get_async_chat().warm()
+
+# name -> step; they run concurrently, each retried until it succeeds
+STEPS = {"vector": _vector, "embed": _embed, "rerank": _rerank, "chat": _chat}
+
+# step -> {"ms": ...} once done or {"error": ..., "attempts": n} while it keeps failing
+_state: dict = {"done": False, "steps": {}}
+
+async def _step(name: str, fn) -> None:
+    attempt = 0
+    while True:
+        attempt += 1
+        t0 = time.perf_counter()
+        try:
+            await fn()
+        except Exception as e:
+            _state["steps"][name] = {"error": str(e) or type(e).__name__, "attempts": attempt}
+            delay = min(_MAX_BACKOFF_S, 2.0 ** (attempt - 1))
+            log.warning(f"warm-up {name} failed (attempt {attempt}), retrying in {delay:.0f}s: {e}")
+            await asyncio.sleep(delay)
+            continue
+        ms = metrics.ms_since(t0)
+        _state["steps"][name] = {"ms": ms}
+        metrics.observe("warmup", {f"{name}_ms": ms})
+        return
+
+async def run() -> None:
+    """
+    Everything the first /ask would otherwise pay for: imports, connection pools,
+    model loads. Started by the API lifespan; /ready answers 200 once it is done.
+    """
+    _state.update(done=False, steps={})
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_step(name, fn) for name, fn in STEPS.items()))
+    _state["done"] = True
+    log.info(f"warm-up done in {metrics.ms_since(t0):.0f}ms: {_state['steps']}")
+
+def readiness() -> tuple[bool, dict]:
+    # with WARMUP=0 nothing is primed and the service is ready as soon as it is up
+    ready = _state["done"] or not settings.warmup
+    return ready, {"ready": ready, "warmup": _state["steps"]}
@@ -7,7 +7,7 @@ import re
 import uuid
 import yaml
 import requests
-from PyPDF2 import PdfReader
+from pypdf import PdfReader
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct
 
@@ -11,9 +11,9 @@ import uuid
 from typing import List, Dict, Any
 
 try:
-    from PyPDF2 import PdfReader
+    from pypdf import PdfReader
 except ImportError:
-    raise SystemExit("Please install PyPDF2: pip install PyPDF2")
+    raise SystemExit("Please install pypdf: pip install pypdf")
 
 # --- Config ---
 QDRANT_URL = "http://localhost:6333"
@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from lr.llm.base import Embeddings
+
+os.environ.setdefault("PROVIDER", "ollama")
+os.environ.setdefault("OLLAMA_EMBED_MODEL", "stub-embed")
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+os.environ.setdefault("QDRANT_LOCATION", ":memory:")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="lr-test-"))
+os.environ.setdefault("ANSWER_CACHE", "0")
+
+def fake_vector(text: str, dim: int = 8) -> list[float]:
+    # deterministic per text, so order can be asserted
+    h = abs(hash(text))
+    return [float((h >> i) & 0xFF) for i in range(dim)]
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, dim: int = 8):
+        self.dim = dim
+
+    def embed(self, texts):
+        return [fake_vector(t, self.dim) for t in texts]
+
+def items(n: int, prefix: str = "a.md") -> list[tuple[str, str]]:
+    # (key, chunk) pairs for pipeline.index_stream
+    return [(f"{prefix}::{i}", f"chunk {prefix} {i}") for i in range(n)]
+
+@pytest.fixture
+def embed_dim():
+    # override in a test module for other vector sizes
+    return 8
+
+@pytest.fixture
+def fresh(tmp_path, monkeypatch, embed_dim):
+    """Empty DATA_DIR and collection; the pipeline embeds with FakeEmbeddings(embed_dim)."""
+    # imported here: lr.config reads the environment set above
+    import lr.rag.docstore as docstore
+    import lr.rag.pipeline as pipeline
+    import lr.rag.sparse as sparse
+    import lr.vector.mini as mini
+    from lr.config import settings
+    from lr.vector import qdrant_store as qs
+    from lr.vector import store
+
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(sparse, "_indexes", {})
+    monkeypatch.setattr(docstore, "_stores", {})
+    monkeypatch.setattr(mini, "_loaded", {})
+    monkeypatch.setattr(pipeline, "get_cached_embedder", lambda: FakeEmbeddings(embed_dim))
+    yield tmp_path
+    qs.drop_collection()
+    store.live_collection(refresh=True)
+
+class _OllamaStub(BaseHTTPRequestHandler):
+    # class-level knobs, reset per fixture
+    calls: list = []
+    fail_first: int = 0
+    batch_api: bool = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code: int, body: dict):
+        raw = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).calls.append((self.path, body))
+        if type(self).fail_first > 0:
+            type(self).fail_first -= 1
+            return self._send(503, {"error": "loading"})
+        if self.path == "/api/embed" and type(self).batch_api:
+            return self._send(200, {"embeddings": [fake_vector(t) for t in body["input"]]})
+        if self.path == "/api/embeddings":
+            return self._send(200, {"embedding": fake_vector(body["prompt"])})
+        if self.path == "/api/chat":
+            words = ["The", " answer", " is", " 42."]
+            if not body.get("stream"):
+                return self._send(200, {"message": {"content": "".join(words)}, "done": True})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for w in words:
+                self.wfile.write(json.dumps({"message": {"content": w}, "done": False}).encode() + b"\n")
+                self.wfile.flush()
+            self.wfile.write(json.dumps({"message": {"content": ""}, "done": True}).encode() + b"\n")
+            return
+        return self._send(404, {"error": "404 page not found"})
+
+@pytest.fixture
+def ollama_stub():
+    _OllamaStub.calls = []
+    _OllamaStub.fail_first = 0
+    _OllamaStub.batch_api = True
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _OllamaStub)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield _OllamaStub, f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+import lr.rag.answer as ans
+from lr.admission import Gate, Overloaded, SingleFlight
+
+def test_gate_queues_then_sheds():
+    async def run():
+        gate = Gate(limit=1, max_waiting=1, timeout_s=5)
+        order = []
+
+        async def worker(name, hold):
+            async with gate.slot():
+                order.append(name)
+                await hold.wait()
+
+        first, second = asyncio.Event(), asyncio.Event()
+        a = asyncio.create_task(worker("a", first))
+        await asyncio.sleep(0)
+        b = asyncio.create_task(worker("b", second))
+        await asyncio.sleep(0)
+        assert (gate.active, gate.waiting) == (1, 1)
+        with pytest.raises(Overloaded):  # queue full: turned away at once
+            await gate.acquire()
+        first.set()
+        await a
+        await asyncio.sleep(0.01)  # the slot went straight to the waiter
+        assert order == ["a", "b"] and gate.active == 1
+        second.set()
+        await b
+        assert (gate.active, gate.waiting) == (0, 0)
+
+    asyncio.run(run())
+
+def test_gate_wait_times_out():
+    async def run():
+        gate = Gate(limit=1, max_waiting=4, timeout_s=0.05)
+        await gate.acquire()
+        timings = {}
+        with pytest.raises(Overloaded):
+            async with gate.slot(timings):
+                pass
+        assert gate.waiting == 0 and timings["queue_ms"] >= 50
+        gate.release()
+        assert gate.active == 0
+
+    asyncio.run(run())
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def run():
+        flights = SingleFlight()
+        return await asyncio.gather(*(flights.run("k", work) for _ in range(3)))
+
+    assert asyncio.run(run()) == [("done", False), ("done", True), ("done", True)]
+    assert len(calls) == 1
+
+def test_identical_questions_are_answered_once(monkeypatch):
+    hits = [("id1", 0.5, {"text": "ctx", "source": "a.md", "chunk": 0})]
+    asked = []
+
+    async def fake_aretrieve(query, *a, **kw):
+        return hits
+
+    class Chat:
+        async def chat(self, messages):
+            asked.append(messages[-1]["content"])
+            await asyncio.sleep(0.01)
+            return "42"
+
+    monkeypatch.setattr(ans, "aretrieve", fake_aretrieve)
+    monkeypatch.setattr(ans, "get_async_chat", lambda: Chat())
+
+    async def run():
+        timings = [{} for _ in range(4)]
+        queries = ["same", "same", "same", "other"]
+        res = await asyncio.gather(*(ans.aanswer(q, timings=t) for q, t in zip(queries, timings)))
+        return res, timings
+
+    res, timings = asyncio.run(run())
+    assert [r["answer"] for r in res] == ["42"] * 4
+    assert len(asked) == 2
+    assert res[0] is not res[1]  # each caller gets its own dict
+    assert "coalesced_ms" in timings[1] and "llm_ms" not in timings[1]
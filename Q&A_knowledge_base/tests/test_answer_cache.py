@@ -0,0 +1,61 @@
+import asyncio
+
+import lr.rag.answer as ans
+from lr.rag.answer_cache import AnswerCache
+from lr.vector.registry import bump_generation
+
+def test_similar_question_in_the_same_scope_hits(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite", threshold=0.95)
+    cache.put("c_v1#0", "all", "how do I open port 21115?", [1.0, 0.0, 0.2], {"answer": "a1"})
+    hit = cache.get("c_v1#0", "all", [1.0, 0.01, 0.21], "how to open port 21115")
+    assert hit["answer"] == "a1" and hit["cached"] and hit["similarity"] >= 0.95
+    assert cache.get("c_v1#0", "all", [0.0, 1.0, 0.0], "port 21115") is None
+    assert cache.get("c_v1#0", "pdf-only", [1.0, 0.0, 0.2], "port 21115") is None
+
+def test_questions_about_other_numbers_do_not_hit(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite", threshold=0.95)
+    cache.put("c_v1#0", "all", "what was the revenue in 2022?", [1.0, 0.0, 0.2], {"answer": "a1"})
+    assert cache.get("c_v1#0", "all", [1.0, 0.0, 0.2], "what was the revenue in 2023?") is None
+    assert cache.get("c_v1#0", "all", [1.0, 0.0, 0.2], "revenue in 2022?")["answer"] == "a1"
+
+def test_new_version_drops_older_answers(tmp_path):
+    cache = AnswerCache(tmp_path / "answers.sqlite")
+    cache.put("c_v1#0", "all", "q", [1.0, 0.0], {"answer": "old"})
+    assert cache.get("c_v1#1", "all", [1.0, 0.0], "q") is None
+    assert len(cache) == 0
+    # survives a restart
+    cache.put("c_v1#1", "all", "q", [1.0, 0.0], {"answer": "new"})
+    assert AnswerCache(tmp_path / "answers.sqlite").get("c_v1#1", "all", [1.0, 0.0], "q")["answer"] == "new"
+
+def test_aanswer_serves_repeats_until_the_next_ingest(tmp_path, monkeypatch):
+    cache = AnswerCache(tmp_path / "answers.sqlite")
+    calls = {"retrieve": 0, "llm": 0}
+    hits = [("id1", 0.8, {"text": "ctx", "source": "a.md", "chunk": 0})]
+
+    async def fake_embed(query, target=None):
+        return [1.0, 0.0, 0.1 if "?" in query else 0.0]
+
+    async def fake_aretrieve(*a, vector=None, **kw):
+        assert vector is not None  # embedded once, for the cache and for the search
+        calls["retrieve"] += 1
+        return hits
+
+    class Chat:
+        async def chat(self, messages):
+            calls["llm"] += 1
+            return "42"
+
+    monkeypatch.setattr(ans, "get_answer_cache", lambda: cache)
+    monkeypatch.setattr(ans, "query_target", lambda: ("cache_test_v1", None, None))
+    monkeypatch.setattr(ans, "aembed_query", fake_embed)
+    monkeypatch.setattr(ans, "aretrieve", fake_aretrieve)
+    monkeypatch.setattr(ans, "get_async_chat", lambda: Chat())
+
+    first = asyncio.run(ans.aanswer("what is the answer"))
+    again = asyncio.run(ans.aanswer("what is the answer?"))
+    assert "cached" not in first and again["cached"] and again["answer"] == "42"
+    assert calls == {"retrieve": 1, "llm": 1}
+
+    bump_generation("cache_test_v1")
+    assert "cached" not in asyncio.run(ans.aanswer("what is the answer"))
+    assert calls == {"retrieve": 2, "llm": 2}
@@ -0,0 +1,47 @@
+import httpx
+
+import lr.rag.answer as ans
+from lr.llm.ollama_client import OllamaChat
+
+def test_ollama_chat_streams_tokens(ollama_stub):
+    _, base = ollama_stub
+    chat = OllamaChat(client=httpx.Client(base_url=base, timeout=10))
+    msgs = [{"role": "user", "content": "q"}]
+    assert list(chat.stream(msgs)) == ["The", " answer", " is", " 42."]
+    assert chat.chat(msgs) == "The answer is 42."
+
+def test_answer_stream_sends_sources_first(ollama_stub, monkeypatch):
+    _, base = ollama_stub
+    hits = [("id1", 0.91, {"text": "ctx", "source": "a.pdf", "chunk": 3})]
+    monkeypatch.setattr(ans, "retrieve", lambda *a, **kw: hits)
+    monkeypatch.setattr(ans, "get_chat", lambda: OllamaChat(client=httpx.Client(base_url=base)))
+
+    events = list(ans.answer_stream("q"))
+    assert events[0] == ("sources", [{"source": "a.pdf", "chunk": 3, "score": 0.91}])
+    assert "".join(d for e, d in events if e == "token") == "The answer is 42."
+    assert events[-1][0] == "done"
+
+def test_answer_stream_without_hits(monkeypatch):
+    monkeypatch.setattr(ans, "retrieve", lambda *a, **kw: [])
+    events = list(ans.answer_stream("q"))
+    assert [e for e, _ in events] == ["sources", "token", "done"]
+
+def test_async_answer_stream(ollama_stub, monkeypatch):
+    import asyncio
+    from lr.llm.ollama_client import AsyncOllamaChat
+
+    _, base = ollama_stub
+    hits = [("id1", 0.5, {"text": "ctx", "source": "a.md", "chunk": 0})]
+
+    async def fake_aretrieve(*a, **kw):
+        return hits
+
+    async def run():
+        async with httpx.AsyncClient(base_url=base, timeout=10) as client:
+            monkeypatch.setattr(ans, "aretrieve", fake_aretrieve)
+            monkeypatch.setattr(ans, "get_async_chat", lambda: AsyncOllamaChat(client=client))
+            return [e async for e in ans.aanswer_stream("q")]
+
+    events = asyncio.run(run())
+    assert events[0][0] == "sources"
+    assert "".join(d for e, d in events if e == "token") == "The answer is 42."
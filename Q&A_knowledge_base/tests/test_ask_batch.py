@@ -0,0 +1,40 @@
+import asyncio
+
+import lr.rag.answer as ans
+
+def test_batch_embeds_once_and_isolates_failures(monkeypatch):
+    seen = {"embed": [], "retrieve": [], "live": 0, "peak": 0}
+
+    async def fake_embed(queries, target=None):
+        seen["embed"].append(list(queries))
+        return [[float(len(q)), 1.0] for q in queries]
+
+    async def fake_retrieve_batch(queries, vectors=None, **kw):
+        seen["retrieve"].append(list(queries))
+        return [[] if q == "unknown" else [("id", 0.9, {"text": q, "source": "a.md", "chunk": 0})]
+                for q in queries]
+
+    class Chat:
+        async def chat(self, messages):
+            seen["live"] += 1
+            seen["peak"] = max(seen["peak"], seen["live"])
+            await asyncio.sleep(0.01)
+            seen["live"] -= 1
+            if "boom" in messages[-1]["content"]:
+                raise RuntimeError("model crashed")
+            return "answer"
+
+    monkeypatch.setattr(ans, "query_target", lambda: ("batch_v1", None, None))
+    monkeypatch.setattr(ans, "aembed_queries", fake_embed)
+    monkeypatch.setattr(ans, "aretrieve_batch", fake_retrieve_batch)
+    monkeypatch.setattr(ans, "get_async_chat", lambda: Chat())
+
+    queries = ["a", "boom", "unknown", "a", "b", "c"]
+    results = asyncio.run(ans.aanswer_batch(queries, concurrency=2))
+    assert [r["query"] for r in results] == queries
+    assert seen["embed"] == [["a", "boom", "unknown", "b", "c"]]  # once, deduplicated
+    assert seen["retrieve"] == seen["embed"]
+    assert results[0]["answer"] == results[3]["answer"] == "answer"
+    assert results[1] == {"query": "boom", "error": "model crashed"}
+    assert results[2]["answer"] == ans.NO_CONTEXT["answer"]
+    assert seen["peak"] == 2
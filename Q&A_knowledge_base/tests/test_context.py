@@ -0,0 +1,42 @@
+from lr.io.splitter import split_spans
+from lr.rag.context import estimate_tokens, merge_hits, pack
+from lr.rag.docstore import get_docstore
+
+TEXT = " ".join(f"Sentence number {i} says something about port {6000 + i}." for i in range(200))
+SPANS = split_spans(TEXT)
+
+def _text_hit(chunk, score):
+    s, e = SPANS[chunk]
+    return (f"p{chunk}", score, {"text": TEXT[s:e], "source": "a.md", "chunk": chunk})
+
+def _span_hit(chunk, score):
+    s, e = SPANS[chunk]
+    return (f"p{chunk}", score, {"doc_id": "d1", "start": s, "end": e, "source": "a.md", "chunk": chunk})
+
+def test_neighbours_merge_without_repeating_the_overlap():
+    blocks = merge_hits([_text_hit(1, 0.5), _text_hit(0, 0.9), _text_hit(3, 0.7)])
+    merged = next(b for b in blocks if b["chunks"] == [0, 1])
+    assert merged["text"] == TEXT[SPANS[0][0]:SPANS[1][1]]
+    assert merged["score"] == 0.9
+    assert [b["chunks"] for b in blocks if b is not merged] == [[3]]
+
+def test_docstore_spans_merge_into_one_cut():
+    get_docstore("ctx_test").put_many([("d1", "a.md", TEXT)])
+    blocks = merge_hits([_span_hit(2, 0.4), _span_hit(1, 0.8), _span_hit(5, 0.6)], "ctx_test")
+    assert [(b["chunks"], b["text"]) for b in blocks] == [
+        ([1, 2], TEXT[SPANS[1][0]:SPANS[2][1]]),
+        ([5], TEXT[SPANS[5][0]:SPANS[5][1]]),
+    ]
+
+def test_pack_fills_the_budget_best_first():
+    hits = [_text_hit(0, 0.2), _text_hit(4, 0.9), _text_hit(8, 0.5)]
+    context, used = pack(hits, budget=300)
+    assert [u["chunk"] for u in used] == [4, 8]  # chunk 8 is cut; nothing left for chunk 0
+    assert context.startswith("[1] " + TEXT[SPANS[4][0]:SPANS[4][0] + 40])
+    assert context.endswith("…")
+    assert estimate_tokens(context) <= 300
+
+def test_pack_lists_merged_chunks():
+    context, used = pack([_text_hit(0, 0.9), _text_hit(1, 0.3)], budget=2000)
+    assert used == [{"source": "a.md", "chunk": 0, "score": 0.9, "chunks": [0, 1]}]
+    assert context.count("Sentence number 16 ") == 1
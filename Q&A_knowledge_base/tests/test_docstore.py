@@ -0,0 +1,25 @@
+from lr.io.splitter import split_spans, split_text
+from lr.rag.docstore import DocStore
+
+def test_spans_cut_the_same_chunks_as_split_text():
+    text = "  intro line\n" + "word " * 500 + "\n\n  tail  "
+    spans = split_spans(text, max_len=200, overlap=40)
+    assert [text[s:e] for s, e in spans] == split_text(text, max_len=200, overlap=40)
+
+def test_hydrate_fills_only_offset_payloads(tmp_path):
+    doc = "Qdrant listens on 6333. Ollama listens on 11434."
+    store = DocStore(tmp_path / "docs.sqlite")
+    store.put_many([("d1", "ports.md", doc)])
+    hits = [
+        ("p1", 0.9, {"source": "ports.md", "doc_id": "d1", "start": 24, "end": 48}),
+        ("p2", 0.8, {"source": "other.md", "text": "kept as is"}),
+    ]
+    store.hydrate(hits)
+    assert hits[0][2]["text"] == "Ollama listens on 11434."
+    assert hits[1][2]["text"] == "kept as is"
+
+def test_delete_by_source(tmp_path):
+    store = DocStore(tmp_path / "docs.sqlite")
+    store.put_many([("d1", "a.md", "alpha"), ("d2", "b.md", "beta")])
+    store.delete_by_source(["a.md"])
+    assert store.spans([("d1", 0, 5), ("d2", 0, 4)]) == ["", "beta"]
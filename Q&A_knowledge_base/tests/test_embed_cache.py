@@ -0,0 +1,43 @@
+from lr.llm.base import Embeddings
+from lr.rag.embed_cache import EmbeddingCache, CachedEmbeddings
+
+class CountingEmbeddings(Embeddings):
+    def __init__(self):
+        self.seen: list[str] = []
+
+    def embed(self, texts):
+        self.seen.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+def test_second_pass_is_served_from_cache(tmp_path):
+    inner = CountingEmbeddings()
+    cache = EmbeddingCache(tmp_path / "c.sqlite")
+    emb = CachedEmbeddings(inner, cache, "ollama", "m")
+
+    first = emb.embed(["aa", "bbb", "aa"])
+    assert inner.seen == ["aa", "bbb"]
+    assert (emb.hits, emb.misses) == (1, 2)
+
+    again = emb.embed(["bbb", "aa", "cccc"])
+    assert inner.seen == ["aa", "bbb", "cccc"]
+    assert again[:2] == [first[1], first[0]]
+    assert (emb.hits, emb.misses) == (3, 3)
+
+def test_cache_is_keyed_by_model_and_persists(tmp_path):
+    inner = CountingEmbeddings()
+    CachedEmbeddings(inner, EmbeddingCache(tmp_path / "c.sqlite"), "ollama", "m1").embed(["x"])
+
+    reopened = EmbeddingCache(tmp_path / "c.sqlite")
+    assert len(reopened) == 1
+    CachedEmbeddings(inner, reopened, "ollama", "m1").embed(["x"])
+    CachedEmbeddings(inner, reopened, "ollama", "m2").embed(["x"])
+    assert inner.seen == ["x", "x"]
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = EmbeddingCache(tmp_path / "c.sqlite", max_entries=2)
+    cache.put_many("p", "m", [("a", [1.0])])
+    cache.put_many("p", "m", [("b", [2.0])])
+    cache.get_many("p", "m", ["a"])  # touch a
+    cache.put_many("p", "m", [("c", [3.0])])
+    assert len(cache) == 2
+    assert set(cache.get_many("p", "m", ["a", "b", "c"])) == {"a", "c"}
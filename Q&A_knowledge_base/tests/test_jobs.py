@@ -0,0 +1,81 @@
+import threading
+import time
+
+from lr.jobs import JobStore, JobRunner
+
+def _wait(store, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job stayed {store.get(job_id)['status']}, wanted {status}")
+
+def test_job_runs_and_reports_progress(tmp_path):
+    def ingest(folder, full, on_progress):
+        for i in range(1, 4):
+            on_progress(i, i * 10)
+        return {"chunks_indexed": 30, "files_indexed": 3}
+
+    runner = JobRunner(JobStore(tmp_path / "jobs.sqlite"), workers=1, ingest=ingest)
+    job_id = runner.submit("./input")
+    job = _wait(runner.store, job_id, "done")
+    assert (job["files_done"], job["chunks_done"]) == (3, 30)
+    assert job["result"]["chunks_indexed"] == 30
+    assert job["chunks_per_s"] is not None
+    runner.shutdown()
+
+def test_partial_result_keeps_the_last_progress(tmp_path):
+    def ingest(folder, full, on_progress):
+        on_progress(2, 20)
+        return {"chunks_indexed": 25}
+
+    runner = JobRunner(JobStore(tmp_path / "jobs.sqlite"), workers=1, ingest=ingest)
+    job = _wait(runner.store, runner.submit("./input"), "done")
+    assert (job["files_done"], job["chunks_done"]) == (2, 25)
+    runner.shutdown()
+
+def test_running_job_can_be_cancelled(tmp_path):
+    started = threading.Event()
+
+    def ingest(folder, full, on_progress):
+        started.set()
+        for i in range(500):
+            time.sleep(0.01)
+            on_progress(1, i)
+        return {}
+
+    runner = JobRunner(JobStore(tmp_path / "jobs.sqlite"), workers=1, ingest=ingest)
+    job_id = runner.submit("./input")
+    assert started.wait(5)
+    runner.cancel(job_id)
+    job = _wait(runner.store, job_id, "cancelled")
+    assert job["chunks_done"] < 499
+    runner.shutdown()
+
+def test_failure_is_recorded(tmp_path):
+    def ingest(folder, full, on_progress):
+        raise RuntimeError("qdrant down")
+
+    runner = JobRunner(JobStore(tmp_path / "jobs.sqlite"), workers=1, ingest=ingest)
+    job = _wait(runner.store, runner.submit("./input"), "failed")
+    assert job["error"] == "qdrant down"
+    runner.shutdown()
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    store = JobStore(tmp_path / "jobs.sqlite")
+    job_id = store.create("./input", full=True)
+    store.update(job_id, status="running", started=time.time())
+
+    seen = []
+    def ingest(folder, full, on_progress):
+        seen.append((folder, full))
+        return {}
+
+    # a fresh process: new store on the same file
+    runner = JobRunner(JobStore(tmp_path / "jobs.sqlite"), workers=1, ingest=ingest)
+    assert runner.resume() == [job_id]
+    _wait(runner.store, job_id, "done")
+    assert seen == [("./input", True)]
+    runner.shutdown()
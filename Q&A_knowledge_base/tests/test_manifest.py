@@ -0,0 +1,106 @@
+import os
+
+from lr.io.manifest import Manifest, source_of
+
+SCOPE = {"collection": "c", "provider": "ollama", "model": "m"}
+
+def _files(base):
+    return sorted(p for p in base.rglob("*") if p.is_file())
+
+def _commit_all(path, base, scope=SCOPE):
+    m = Manifest(path, scope)
+    m.diff(base, _files(base))
+    m.commit()
+    return m
+
+def test_only_new_and_changed_files_are_returned(tmp_path):
+    base = tmp_path / "in"
+    base.mkdir()
+    (base / "a.txt").write_text("alpha")
+    (base / "b.txt").write_text("beta")
+    mpath = tmp_path / "m.json"
+
+    first = Manifest(mpath, SCOPE)
+    assert [p.name for p in first.diff(base, _files(base))] == ["a.txt", "b.txt"]
+    assert first.stale_sources == []
+    first.commit()
+
+    (base / "b.txt").write_text("beta v2")
+    (base / "c.txt").write_text("gamma")
+    m = Manifest(mpath, SCOPE)
+    assert [p.name for p in m.diff(base, _files(base))] == ["b.txt", "c.txt"]
+    assert m.changed == ["b.txt", "c.txt"]
+    assert m.stale_sources == [source_of(base / "b.txt")]
+
+def test_removed_files_are_stale(tmp_path):
+    base = tmp_path / "in"
+    base.mkdir()
+    (base / "a.txt").write_text("alpha")
+    (base / "gone.md").write_text("bye")
+    _commit_all(tmp_path / "m.json", base)
+
+    (base / "gone.md").unlink()
+    m = Manifest(tmp_path / "m.json", SCOPE)
+    assert m.diff(base, _files(base)) == []
+    assert m.removed == ["gone.md"]
+    assert m.stale_sources == [source_of(base / "gone.md")]
+
+def test_touched_file_with_same_bytes_is_skipped(tmp_path):
+    base = tmp_path / "in"
+    base.mkdir()
+    f = base / "a.txt"
+    f.write_text("alpha")
+    _commit_all(tmp_path / "m.json", base)
+
+    st = f.stat()
+    os.utime(f, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    m = Manifest(tmp_path / "m.json", SCOPE)
+    assert m.diff(base, _files(base)) == []
+    assert m.stale_sources == []
+
+def test_scope_change_and_reset_reindex_everything(tmp_path):
+    base = tmp_path / "in"
+    base.mkdir()
+    (base / "a.txt").write_text("alpha")
+    _commit_all(tmp_path / "m.json", base)
+
+    other = Manifest(tmp_path / "m.json", {**SCOPE, "model": "m2"})
+    assert [p.name for p in other.diff(base, _files(base))] == ["a.txt"]
+    assert other.stale_sources == [source_of(base / "a.txt")]
+
+    full = Manifest(tmp_path / "m.json", SCOPE)
+    full.reset()
+    assert [p.name for p in full.diff(base, _files(base))] == ["a.txt"]
+
+def test_nothing_is_written_before_commit(tmp_path):
+    base = tmp_path / "in"
+    base.mkdir()
+    (base / "a.txt").write_text("alpha")
+    m = Manifest(tmp_path / "m.json", SCOPE)
+    m.diff(base, _files(base))
+    assert not (tmp_path / "m.json").exists()
+
+def test_discarded_file_is_retried_next_run(tmp_path):
+    base = tmp_path / "in"
+    base.mkdir()
+    (base / "a.pdf").write_text("x")
+    (base / "b.pdf").write_text("y")
+    m = Manifest(tmp_path / "m.json", SCOPE)
+    m.diff(base, _files(base))
+    m.discard(base / "b.pdf")
+    m.commit()
+
+    again = Manifest(tmp_path / "m.json", SCOPE)
+    assert [p.name for p in again.diff(base, _files(base))] == ["b.pdf"]
+
+def test_same_name_in_another_folder_is_not_stale(tmp_path):
+    base = tmp_path / "in"
+    for sub in ("sub1", "sub2"):
+        (base / sub).mkdir(parents=True)
+        (base / sub / "report.md").write_text(f"report of {sub}")
+    _commit_all(tmp_path / "m.json", base)
+
+    (base / "sub1" / "report.md").write_text("report of sub1, v2")
+    m = Manifest(tmp_path / "m.json", SCOPE)
+    assert m.diff(base, _files(base)) == [base / "sub1" / "report.md"]
+    assert m.stale_sources == [source_of(base / "sub1" / "report.md")]
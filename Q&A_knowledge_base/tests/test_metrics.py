@@ -0,0 +1,43 @@
+import asyncio
+
+import lr.rag.answer as ans
+from lr import metrics
+from lr.metrics import Histogram
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 0.5, 7.0):
+        h.observe(v, stage='say "hi"')
+    lines = h.render()
+    assert 't_seconds_bucket{stage="say \\"hi\\"",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{stage="say \\"hi\\"",le="1.0"} 3' in lines
+    assert 't_seconds_bucket{stage="say \\"hi\\"",le="+Inf"} 4' in lines
+    assert 't_seconds_count{stage="say \\"hi\\""} 4' in lines
+
+def test_stage_accumulates_and_observe_maps_total():
+    timings = {}
+    for _ in range(2):
+        with metrics.stage(timings, "embed"):
+            pass
+    assert set(timings) == {"embed_ms"}
+    metrics.observe("unit", {**timings, "total_ms": 1500.0, "note": "ignored"})
+    text = metrics.render()
+    assert 'lr_stage_duration_seconds_count{endpoint="unit",stage="embed"} 1' in text
+    assert 'lr_request_duration_seconds_bucket{endpoint="unit",le="2.5"} 1' in text
+
+def test_aanswer_fills_timings(monkeypatch):
+    hits = [("id1", 0.5, {"text": "ctx", "source": "a.md", "chunk": 0})]
+
+    async def fake_aretrieve(*a, timings=None, **kw):
+        timings.update(embed_ms=1.0, search_ms=2.0, rerank_ms=0.5)
+        return hits
+
+    class Chat:
+        async def chat(self, messages):
+            return "42"
+
+    monkeypatch.setattr(ans, "aretrieve", fake_aretrieve)
+    monkeypatch.setattr(ans, "get_async_chat", lambda: Chat())
+    timings = {}
+    assert asyncio.run(ans.aanswer("q", timings=timings))["answer"] == "42"
+    assert set(timings) == {"embed_ms", "search_ms", "rerank_ms", "context_ms", "queue_ms", "llm_ms"}
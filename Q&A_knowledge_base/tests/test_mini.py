@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import lr.rag.pipeline as pipeline
+import lr.rag.retrieve as retrieve
+import lr.vector.mini as mini
+from lr.config import settings
+from lr.vector import qdrant_store as qs
+from lr.vector.registry import version_info
+
+from tests.conftest import FakeEmbeddings, items
+
+@pytest.fixture
+def embed_dim():
+    return 16
+
+@pytest.fixture(autouse=True)
+def dense_only(monkeypatch):
+    monkeypatch.setattr(settings, "hybrid", False)
+
+def test_two_stage_search_finds_the_exact_neighbours(fresh):
+    rng = np.random.default_rng(0)
+    # like real embeddings, most of the variance lies in a few directions
+    vecs = rng.normal(size=(400, 8)) @ rng.normal(size=(8, 32)) + 0.05 * rng.normal(size=(400, 32))
+    vecs = (vecs / np.linalg.norm(vecs, axis=1, keepdims=True)).astype(np.float32)
+    proj = mini.fit_pca(vecs, 8)
+    name = qs.ensure_collection(32, mini_dim=8)
+    writer = qs.BulkWriter(name)
+    writer.upsert(vecs, [{"row": i} for i in range(400)], list(range(400)), mini=proj.apply(vecs))
+    writer.finish()
+
+    queries = vecs[:20] + 0.05 * rng.normal(size=(20, 32)).astype(np.float32)
+    truth = np.argsort(-(queries @ vecs.T), axis=1)[:, :5]
+    got = qs.search_batch(queries, top_k=5, mini_vectors=proj.apply(queries))
+    recall = np.mean([len({pid for pid, _, _ in hits} & set(want)) / 5
+                      for hits, want in zip(got, truth.tolist())])
+    assert recall >= 0.9
+    # scores come from the full vectors
+    pid, score, _ = qs.search(queries[0], top_k=1, mini_vector=proj.apply(queries[:1])[0])[0]
+    want = float(queries[0] @ vecs[pid] / np.linalg.norm(queries[0]))
+    assert score == pytest.approx(want, abs=1e-4)
+
+def test_pca_build_stores_mini_vectors_and_retrieve_uses_them(fresh, monkeypatch):
+    monkeypatch.setattr(settings, "mini_dim", 4)
+    monkeypatch.setattr(settings, "mini_method", "pca")
+    monkeypatch.setattr(settings, "mini_pca_rows", 10)
+    timings = {}
+    res = pipeline.index_stream(iter(items(30)), batch_size=4, timings=timings)
+    name = res["collection"]
+    assert version_info(name)["mini"] == {"dim": 4, "method": "pca"}
+    assert (Path(fresh) / f"mini_{name}.npz").exists() and timings["mini_ms"] >= 0
+    points, _ = qs.client.scroll(name, limit=100, with_vectors=True)
+    assert len(points) == 30 and all(len(p.vector[qs.MINI_VECTOR]) == 4 for p in points)
+
+    calls = []
+    query_batch_points = qs.client.query_batch_points
+    monkeypatch.setattr(qs.client, "query_batch_points",
+                        lambda **kw: calls.append(kw) or query_batch_points(**kw))
+    monkeypatch.setattr(retrieve, "get_embedder", lambda *a, **k: FakeEmbeddings(16))
+    monkeypatch.setattr(settings, "reranker", "none")
+    mini._loaded.clear()  # as in a fresh process: the basis comes from disk
+    hits = retrieve.retrieve("chunk a.md 7", k=3, min_score=0.0)
+    assert calls and hits[0][0] == pipeline.point_id("a.md::7")
+
+def test_changing_the_mini_layout_stages_a_new_version(fresh, monkeypatch):
+    first = pipeline.index_stream(iter(items(5)))
+    assert not qs._two_stage(qs.client.get_collection(first["collection"]))
+    monkeypatch.setattr(settings, "mini_dim", 8)
+    res = pipeline.index_stream(iter(items(5)))
+    assert res["promoted"] and version_info(res["collection"])["mini"]["method"] == "prefix"
+    # the same settings again: incremental, into the two-stage version
+    again = pipeline.index_stream(iter(items(2, "b.md")))
+    assert again["collection"] == res["collection"] and "promoted" not in again
+    assert qs.client.count(qs.COLLECTION_NAME).count == 7
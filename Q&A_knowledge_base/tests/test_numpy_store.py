@@ -0,0 +1,125 @@
+import threading
+
+import numpy as np
+
+from lr.vector.numpy_store import NumpyCollection
+
+def _load(col):
+    col.ensure(3)
+    col.upsert(
+        [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.0, 1.0, 0.0], [0.8, 0.0, 0.2]],
+        [
+            {"source": "a.md", "ext": ".md", "chunk": 0},
+            {"source": "b.pdf", "ext": ".pdf", "chunk": 0},
+            {"source": "b.pdf", "ext": ".pdf", "chunk": 1},
+            {"source": "c.txt", "ext": ".txt", "chunk": 0},
+        ],
+        [1, 2, 3, 4],
+    )
+    return col
+
+def test_exact_search_filter_and_threshold(tmp_path):
+    col = _load(NumpyCollection(tmp_path / "c"))
+    hits = col.search([1.0, 0.0, 0.0], top_k=2)
+    assert [h[0] for h in hits] == [1, 2]
+    assert abs(hits[0][1] - 1.0) < 1e-6
+    assert [h[0] for h in col.search([1.0, 0.0, 0.0], top_k=3, where={"ext": ".pdf"})] == [2, 3]
+    assert [h[0] for h in col.search([0.0, 1.0, 0.0], top_k=4, score_threshold=0.5)] == [3]
+
+def test_search_batch_matches_single_searches(tmp_path):
+    col = _load(NumpyCollection(tmp_path / "c"))
+    queries = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.5, 0.5, 0.5]]
+    for where in (None, {"ext": ".pdf"}):
+        assert col.search_batch(queries, top_k=2, score_threshold=0.1, where=where) == [
+            col.search(q, top_k=2, score_threshold=0.1, where=where) for q in queries
+        ]
+
+def test_upsert_replaces_and_delete_persist_across_reopen(tmp_path):
+    col = _load(NumpyCollection(tmp_path / "c"))
+    col.upsert([[0.0, 0.0, 1.0]], [{"source": "a.md", "ext": ".md", "chunk": 0}], [1])
+    col.delete_by_source(["b.pdf"])
+    again = NumpyCollection(tmp_path / "c")
+    hits = again.search([0.0, 0.0, 1.0], top_k=10)
+    assert sorted(h[0] for h in hits) == [1, 4]
+    assert hits[0][0] == 1
+
+def test_dimension_change_recreates(tmp_path):
+    col = _load(NumpyCollection(tmp_path / "c"))
+    col.ensure(2)
+    assert col.search([1.0, 0.0], top_k=5) == []
+
+def test_ivf_recall_and_compaction(tmp_path):
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(20, 16))
+    vecs = centers[rng.integers(20, size=3000)] + 0.2 * rng.normal(size=(3000, 16))
+    col = NumpyCollection(tmp_path / "c", ivf_min_rows=1000, nprobe=8)
+    col.ensure(16)
+    col.upsert(vecs, [{"source": f"s{i % 10}", "ext": ".md"} for i in range(3000)], list(range(3000)))
+    assert col.centroids is not None
+
+    norm = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    found = 0
+    for q in norm[:50]:
+        truth = set(np.argsort(-(norm @ q))[:5].tolist())
+        found += len(truth & {h[0] for h in col.search(q, top_k=5)})
+    assert found / 250 >= 0.9
+
+    col.delete_by_source([f"s{i}" for i in range(5)])
+    col.ensure(16)  # >20% dead rows -> compacted
+    assert col.n == 1500 and col.alive.all()
+    assert all(h[2]["source"] in {f"s{i}" for i in range(5, 10)} for h in col.search(norm[0], top_k=20))
+
+def test_reopen_reads_payloads_of_hits_only(tmp_path, monkeypatch):
+    col = _load(NumpyCollection(tmp_path / "c"))
+    col.upsert([[0.0, 0.0, 1.0]], [{"source": "a.md", "ext": ".md", "chunk": 9}], [1])
+    col.delete_by_source(["c.txt"])
+
+    read = []
+    real = NumpyCollection._read
+    monkeypatch.setattr(NumpyCollection, "_read",
+                        staticmethod(lambda index, f, rows: real(index, f, read.append(list(rows)) or rows)))
+    again = NumpyCollection(tmp_path / "c")
+    assert read == []
+    assert again.search([0.0, 0.0, 1.0], top_k=1)[0][2] == {"source": "a.md", "ext": ".md", "chunk": 9}
+    assert read == [[4]]
+    assert sorted(h[0] for h in again.search([1.0, 0.0, 0.0], top_k=10)) == [1, 2, 3]
+    # a replace after reopening still finds the row it replaces
+    again.upsert([[0.0, 1.0, 0.0]], [{"source": "b.pdf", "ext": ".pdf", "chunk": 0}], [2])
+    assert sorted(h[0] for h in NumpyCollection(tmp_path / "c").search([1.0, 0.0, 0.0], top_k=10)) == [1, 2, 3]
+    assert len(NumpyCollection(tmp_path / "c").search([0.0, 1.0, 0.0], top_k=10, score_threshold=0.99)) == 2
+
+def test_search_during_compaction_returns_each_hits_own_payload(tmp_path):
+    rng = np.random.default_rng(0)
+    vecs = rng.normal(size=(600, 8))
+    col = NumpyCollection(tmp_path / "c")
+    col.ensure(8)
+    col.upsert(vecs, [{"source": f"s{i % 6}", "ext": ".md", "row": i} for i in range(600)],
+               list(range(600)))
+    errors, stop = [], threading.Event()
+
+    def query():
+        try:
+            while not stop.is_set():
+                for hits in [col.search(vecs[7], top_k=20)] + col.search_batch(vecs[:3], top_k=5):
+                    assert all(pl["row"] == pid for pid, _, pl in hits)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    readers = [threading.Thread(target=query) for _ in range(2)]
+    for t in readers:
+        t.start()
+    # each round tombstones a third of the rows and re-adds them: ensure() compacts every time
+    for rnd in range(30):
+        gone = [f"s{(rnd + k) % 6}" for k in range(2)]
+        col.delete_by_source(gone)
+        keep = [i for i in range(600) if f"s{i % 6}" in gone]
+        col.upsert(vecs[keep], [{"source": f"s{i % 6}", "ext": ".md", "row": i} for i in keep], keep)
+        col.ensure(8)
+        if stop.is_set():
+            break
+    stop.set()
+    for t in readers:
+        t.join()
+    assert errors == []
+    assert col.alive.all() and col.n == 600
@@ -0,0 +1,48 @@
+import httpx
+
+from lr.llm.ollama_client import OllamaEmbeddings
+from tests.conftest import fake_vector
+
+def _emb(base, **kw):
+    return OllamaEmbeddings(client=httpx.Client(base_url=base, timeout=10), backoff=0.01, **kw)
+
+def test_batches_preserve_order(ollama_stub):
+    stub, base = ollama_stub
+    texts = [f"chunk {i}" for i in range(50)]
+    vecs = _emb(base, batch_size=8, concurrency=4).embed(texts)
+    assert vecs == [fake_vector(t) for t in texts]
+    # 50 texts / 8 per batch -> 7 requests instead of 50
+    assert len(stub.calls) == 7
+    assert all(path == "/api/embed" for path, _ in stub.calls)
+
+def test_accepts_single_string(ollama_stub):
+    _, base = ollama_stub
+    assert _emb(base).embed("hello") == [fake_vector("hello")]
+
+def test_retries_transient_errors(ollama_stub):
+    stub, base = ollama_stub
+    stub.fail_first = 2
+    assert _emb(base, retries=3).embed(["a", "b"]) == [fake_vector("a"), fake_vector("b")]
+    assert len(stub.calls) == 3
+
+def test_falls_back_to_legacy_endpoint(ollama_stub):
+    stub, base = ollama_stub
+    stub.batch_api = False
+    texts = ["x", "y", "z"]
+    assert _emb(base, batch_size=2).embed(texts) == [fake_vector(t) for t in texts]
+    assert [p for p, _ in stub.calls].count("/api/embeddings") == 3
+
+def test_async_embeddings_match_sync(ollama_stub):
+    import asyncio
+    from lr.llm.ollama_client import AsyncOllamaEmbeddings
+
+    stub, base = ollama_stub
+    texts = [f"chunk {i}" for i in range(20)]
+
+    async def run():
+        async with httpx.AsyncClient(base_url=base, timeout=10) as client:
+            emb = AsyncOllamaEmbeddings(client=client, batch_size=6, concurrency=3, backoff=0.01)
+            return await emb.embed(texts)
+
+    assert asyncio.run(run()) == [fake_vector(t) for t in texts]
+    assert len(stub.calls) == 4
@@ -0,0 +1,52 @@
+import os
+import time
+from pathlib import Path
+
+from lr.io.parse_pool import parse_files
+
+def fake_parse(p: Path) -> list[str]:
+    # module-level so spawn workers can import it
+    if "slow" in p.name:
+        time.sleep(30)
+    return [f"{p.name}:{os.getpid()}"]
+
+def _touch(tmp_path, names):
+    out = []
+    for n in names:
+        f = tmp_path / n
+        f.write_text("x")
+        out.append(f)
+    return out
+
+def test_results_keep_input_order_across_workers(tmp_path):
+    paths = _touch(tmp_path, [f"doc{i}.pdf" for i in range(6)] + ["notes.md"])
+    got = list(parse_files(paths, fake_parse, workers=3, timeout=30))
+    assert [p for p, _ in got] == paths
+    pids = {chunks[0].split(":")[1] for p, chunks in got if p.suffix == ".pdf"}
+    assert str(os.getpid()) not in pids
+    # plain text is read in-process
+    assert got[-1][1] == [f"notes.md:{os.getpid()}"]
+
+def test_timed_out_file_is_skipped(tmp_path):
+    paths = _touch(tmp_path, ["a.pdf", "slow.pdf", "b.pdf"])
+    skipped = []
+    start = time.monotonic()
+    got = list(parse_files(paths, fake_parse, workers=2, timeout=1, on_timeout=skipped.append))
+    assert [p.name for p, _ in got] == ["a.pdf", "b.pdf"]
+    assert [p.name for p in skipped] == ["slow.pdf"]
+    assert time.monotonic() - start < 20
+
+def test_single_worker_runs_inline(tmp_path):
+    paths = _touch(tmp_path, ["a.pdf", "b.pdf"])
+    got = list(parse_files(paths, fake_parse, workers=1))
+    assert all(c[0].endswith(f":{os.getpid()}") for _, c in got)
+
+def test_stuck_workers_are_replaced(tmp_path):
+    # as many stuck files as workers: the files behind them still get parsed
+    paths = _touch(tmp_path, ["slow1.pdf", "slow2.pdf", "a.pdf", "b.pdf", "c.pdf"])
+    skipped = []
+    start = time.monotonic()
+    got = list(parse_files(paths, fake_parse, workers=2, timeout=2, on_timeout=skipped.append))
+    assert [p.name for p, _ in got] == ["a.pdf", "b.pdf", "c.pdf"]
+    assert [p.name for p in skipped] == ["slow1.pdf", "slow2.pdf"]
+    assert time.monotonic() - start < 20
@@ -0,0 +1,105 @@
+from lr.config import settings
+from lr.io import pdf
+from lr.io.pdf import PageCache, extract_pages
+
+def write_pdf(path, pages: list[str], forms: bool = False) -> None:
+    # one line of Helvetica per page; just enough PDF for pypdf and PyMuPDF. With `forms`
+    # each page only runs "/Fm0 Do" and the text sits in that form XObject
+    n = len(pages)
+    font = 3 + 2 * n
+    objs = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % (3 + 2 * i) for i in range(n))
+        + b"] /Count %d >>" % n,
+    ]
+    for i, text in enumerate(pages):
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("latin-1") + b") Tj ET"
+        resources = b"/Font << /F1 %d 0 R >>" % font
+        if forms:
+            resources = b"/XObject << /Fm0 %d 0 R >>" % (font + 1 + i)
+            stream = b"q /Fm0 Do Q"
+        objs.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+                    b" /Resources << " + resources + b" >> /Contents %d 0 R >>" % (4 + 2 * i))
+        objs.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for text in pages if forms else []:
+        stream = b"BT /F1 12 Tf 72 720 Td (" + text.encode("latin-1") + b") Tj ET"
+        objs.append(b"<< /Type /XObject /Subtype /Form /BBox [0 0 612 792]"
+                    b" /Resources << /Font << /F1 %d 0 R >> >> /Length %d >>\nstream\n"
+                    % (font, len(stream)) + stream + b"\nendstream")
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for no, body in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % no + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    path.write_bytes(bytes(out))
+
+def _count_extractions(monkeypatch) -> list[int]:
+    calls = []
+    text = pdf._PyPdf.text
+
+    def counting(self, i):
+        calls.append(i)
+        return text(self, i)
+    monkeypatch.setattr(pdf._PyPdf, "text", counting)
+    return calls
+
+def test_unchanged_and_edited_files_reuse_cached_pages(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pdf_backend", "pypdf")
+    calls = _count_extractions(monkeypatch)
+    cache = PageCache(tmp_path / "pages.sqlite")
+    f = tmp_path / "manual.pdf"
+    write_pdf(f, ["Page one", "Page two", "Page three"])
+
+    assert [t.strip() for t in extract_pages(f, cache=cache)] == ["Page one", "Page two", "Page three"]
+    assert calls == [0, 1, 2]
+
+    # same bytes: answered from the cache without opening the file
+    calls.clear()
+    assert [t.strip() for t in extract_pages(f, cache=cache)][1] == "Page two"
+    assert calls == []
+
+    # one page edited, one inserted: only those two are extracted
+    write_pdf(f, ["Page one", "Page 2, revised", "Page three", "Page four"])
+    got = [t.strip() for t in extract_pages(f, cache=cache)]
+    assert got == ["Page one", "Page 2, revised", "Page three", "Page four"]
+    assert calls == [1, 3]
+
+def test_page_ranges_over_processes_match_serial(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pdf_backend", "pypdf")
+    monkeypatch.setattr(settings, "pdf_parallel_min_pages", 4)
+    f = tmp_path / "big.pdf"
+    write_pdf(f, [f"Section {i}" for i in range(9)])
+
+    serial = extract_pages(f, cache=PageCache(tmp_path / "a.sqlite"), workers=1)
+    calls = _count_extractions(monkeypatch)
+    parallel = extract_pages(f, cache=PageCache(tmp_path / "b.sqlite"), workers=2)
+    assert parallel == serial
+    assert [t.strip() for t in parallel] == [f"Section {i}" for i in range(9)]
+    # extracted in the workers, not here
+    assert calls == []
+    assert pdf._ranges(list(range(9)), 4) == [[0, 1, 2], [3, 4, 5], [6, 7, 8]]
+
+def test_pages_drawn_through_form_xobjects_do_not_share_text(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pdf_backend", "pypdf")
+    cache = PageCache(tmp_path / "pages.sqlite")
+    # same content streams ("/Fm0 Do") and fonts: only the forms differ
+    write_pdf(tmp_path / "a.pdf", ["Invoice for Alice", "Total 10 EUR"], forms=True)
+    write_pdf(tmp_path / "b.pdf", ["Invoice for Bob", "Total 99 EUR"], forms=True)
+
+    assert [t.strip() for t in extract_pages(tmp_path / "a.pdf", cache=cache)] == [
+        "Invoice for Alice", "Total 10 EUR"]
+    calls = _count_extractions(monkeypatch)
+    assert [t.strip() for t in extract_pages(tmp_path / "b.pdf", cache=cache)] == [
+        "Invoice for Bob", "Total 99 EUR"]
+    assert calls == [0, 1]
+
+    # the same pages under other object numbers are still found in the cache
+    calls.clear()
+    write_pdf(tmp_path / "c.pdf", ["Cover", "Invoice for Bob", "Total 99 EUR"], forms=True)
+    assert [t.strip() for t in extract_pages(tmp_path / "c.pdf", cache=cache)][1] == "Invoice for Bob"
+    assert calls == [0]
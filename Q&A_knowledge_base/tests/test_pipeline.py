@@ -0,0 +1,92 @@
+import threading
+
+import pytest
+
+import lr.rag.pipeline as pipeline
+
+from tests.conftest import FakeEmbeddings
+
+@pytest.fixture
+def fake_store(monkeypatch):
+    store = {"dim": None, "points": {}, "deleted": [], "upserts": 0}
+    monkeypatch.setattr(pipeline, "get_cached_embedder", lambda: FakeEmbeddings(2))
+    monkeypatch.setattr(pipeline, "live_collection", lambda refresh=False: "test_v1")
+
+    def ensure_collection(dim, new_version=False, mini_dim=None):
+        store.update(dim=dim)
+        return "test_v1"
+    monkeypatch.setattr(pipeline, "ensure_collection", ensure_collection)
+    monkeypatch.setattr(pipeline, "delete_by_source",
+                        lambda s, collection=None: store["deleted"].extend(s))
+
+    def upsert(vecs, payloads, ids):
+        store["upserts"] += 1
+        store["points"].update(zip(ids, payloads))
+    store["upsert"] = upsert
+
+    class Writer:
+        def __init__(self, collection, bulk=False):
+            store["bulk"] = bulk
+
+        def upsert(self, vecs, payloads, ids, mini=None):
+            store["upsert"](vecs, payloads, ids)
+
+        def finish(self, wait_for_index=False):
+            store["finished"] = True
+
+        def abort(self):
+            pass
+    monkeypatch.setattr(pipeline, "bulk_writer", Writer)
+    return store
+
+def test_streams_in_batches(fake_store):
+    pairs = ((f"doc.md::{i}", f"chunk {i}") for i in range(25))
+    res = pipeline.index_stream(pairs, batch_size=10)
+    assert res["chunks_indexed"] == 25
+    assert fake_store["upserts"] == 3
+    assert fake_store["dim"] == 2
+    pl = fake_store["points"][pipeline.point_id("doc.md::7")]
+    assert pl == {"text": "chunk 7", "source": "doc.md", "chunk": 7, "ext": ".md"}
+
+def test_reader_is_throttled_by_slow_upserts(fake_store, monkeypatch):
+    release = threading.Event()
+    pulled = []
+
+    def slow_upsert(vecs, payloads, ids):
+        release.wait(5)
+    fake_store["upsert"] = slow_upsert
+
+    def pairs():
+        for i in range(100):
+            pulled.append(i)
+            yield (f"a.txt::{i}", "x")
+
+    t = threading.Thread(target=pipeline.index_stream, args=(pairs(),),
+                         kwargs={"batch_size": 5, "max_pending": 1})
+    t.start()
+    t.join(0.5)
+    # 1 batch in the writer + 1 queued + 1 being embedded: the rest is never read
+    assert len(pulled) <= 16
+    release.set()
+    t.join(5)
+    assert len(pulled) == 100
+
+def test_upsert_failure_is_raised(fake_store, monkeypatch):
+    def boom(*a, **kw):
+        raise ConnectionError("qdrant down")
+    fake_store["upsert"] = boom
+    with pytest.raises(ConnectionError):
+        pipeline.index_stream(((f"a.txt::{i}", "x") for i in range(50)), batch_size=5)
+
+def test_refs_move_text_to_the_docstore(fake_store):
+    from lr.rag.docstore import get_docstore
+    doc = "first chunk. second chunk."
+    items = [
+        ("refs.md::0", doc[:12], {"doc_no": 0, "doc": doc, "start": 0, "end": 12}),
+        ("refs.md::1", doc[13:], {"doc_no": 0, "doc": doc, "start": 13, "end": len(doc)}),
+    ]
+    pipeline.index_stream(iter(items), batch_size=1)
+    pl = fake_store["points"][pipeline.point_id("refs.md::1")]
+    assert "text" not in pl
+    assert (pl["start"], pl["end"]) == (13, len(doc))
+    assert get_docstore("test_v1").spans([(pl["doc_id"], pl["start"], pl["end"])]) == ["second chunk."]
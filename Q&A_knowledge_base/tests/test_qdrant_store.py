@@ -0,0 +1,151 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from lr.vector import qdrant_store as qs
+
+@pytest.fixture
+def collection():
+    qs.ensure_collection(3)
+    yield qs
+    qs.drop_collection()
+
+def _load(store):
+    vecs = [[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.0, 1.0, 0.0], [0.8, 0.0, 0.2]]
+    payloads = [
+        {"source": "a.md", "ext": ".md", "chunk": 0},
+        {"source": "b.pdf", "ext": ".pdf", "chunk": 0},
+        {"source": "b.pdf", "ext": ".pdf", "chunk": 1},
+        {"source": "c.txt", "ext": ".txt", "chunk": 0},
+    ]
+    store.upsert(vecs, payloads=payloads, ids=list(range(1, 5)))
+
+def test_where_filter_is_applied_by_qdrant(collection):
+    _load(collection)
+    hits = collection.search([1.0, 0.0, 0.0], top_k=2, where={"ext": ".pdf"})
+    assert [pl["ext"] for _, _, pl in hits] == [".pdf", ".pdf"]
+    assert hits[0][0] == 2
+
+def test_match_filter_shapes():
+    assert qs.match_filter(None) is None
+    f = qs.match_filter({"ext": ".pdf", "source": ["a", "b"]})
+    assert f.must[0].match.value == ".pdf"
+    assert f.must[1].match.any == ["a", "b"]
+
+def test_delete_by_source(collection):
+    _load(collection)
+    collection.delete_by_source(["b.pdf", "missing.md"])
+    assert collection.client.count(collection.COLLECTION_NAME).count == 2
+
+def test_delete_by_source_without_collection_is_noop():
+    qs.delete_by_source(["a.md"])
+
+def test_profiles_map_to_qdrant_configs(monkeypatch):
+    compact = qs.profile("compact")
+    assert compact["on_disk"] and qs._quantization_config(compact).scalar.always_ram
+    params = qs.search_params(compact)
+    assert params.quantization.rescore and params.quantization.oversampling == 2.0
+    assert qs.search_params(qs.profile("default")) is None
+    monkeypatch.setattr(qs.settings, "hnsw_ef", 200)
+    accurate = qs.profile("accurate")
+    assert qs._hnsw_config(accurate).m == 32 and qs.search_params(accurate).hnsw_ef == 200
+    with pytest.raises(ValueError):
+        qs.profile("huge")
+
+def test_profile_drift_only_checks_what_the_profile_sets():
+    qs.client.create_collection(qs.COLLECTION_NAME, vectors_config=qs.VectorParams(
+        size=3, distance=qs.Distance.COSINE))
+    try:
+        info = qs.client.get_collection(qs.COLLECTION_NAME)
+        assert not qs._profile_drift(info, qs.profile("default"))
+        assert qs._profile_drift(info, qs.profile("compact"))
+        assert qs._profile_drift(info, qs.profile("accurate"))
+    finally:
+        qs.client.delete_collection(qs.COLLECTION_NAME)
+
+class _FakeServer:
+    """Records what BulkWriter sends; each wait=False upsert takes a little while."""
+
+    def __init__(self, fail_batch=None):
+        NS = SimpleNamespace
+        self.lock, self.calls, self.live, self.peak = threading.Lock(), [], 0, 0
+        self.fail_batch, self.status_polls = fail_batch, 0
+        # point ids applied so far; `count` only sees them `lag` polls later
+        self.applied, self.lag, self.count_polls = set(), 0, 0
+        self.info = NS(config=NS(hnsw_config=NS(m=16)), status=qs.CollectionStatus.YELLOW)
+
+    def upsert(self, collection_name, points, wait=True):
+        with self.lock:
+            self.live += 1
+            self.peak = max(self.peak, self.live)
+            self.calls.append(("upsert", points[0].id, wait))
+        time.sleep(0.02)
+        with self.lock:
+            self.live -= 1
+        if points[0].id == self.fail_batch:
+            raise ConnectionError("qdrant down")
+        with self.lock:
+            self.applied.update(p.id for p in points)
+
+    def count(self, collection_name, exact=True):
+        self.count_polls += 1
+        seen = len(self.applied) if self.count_polls > self.lag else len(self.applied) // 2
+        return SimpleNamespace(count=seen)
+
+    def update_collection(self, collection_name, hnsw_config):
+        self.calls.append(("hnsw_m", hnsw_config.m))
+
+    def get_collection(self, collection_name):
+        self.status_polls += 1
+        if self.status_polls > 2:
+            self.info.status = qs.CollectionStatus.GREEN
+        return self.info
+
+def _bulk(monkeypatch, server, **kw):
+    monkeypatch.setattr(qs, "client", server)
+    monkeypatch.setattr(qs.settings, "qdrant_location", None)
+    monkeypatch.setattr(qs, "time", SimpleNamespace(monotonic=time.monotonic, sleep=lambda s: None))
+    return qs.BulkWriter("c_v2", parallel=3, batch_size=2, **kw)
+
+def test_bulk_writer_pipelines_requests_then_barriers(monkeypatch):
+    server = _FakeServer()
+    writer = _bulk(monkeypatch, server, bulk=True)
+    writer.upsert([[0.1, 0.2]] * 20, [{}] * 20, list(range(20)))
+    writer.finish(wait_for_index=True)
+    assert server.calls[0] == ("hnsw_m", 0)
+    sent = [c for c in server.calls if c[0] == "upsert"]
+    assert len(sent) == 11 and all(not wait for _, _, wait in sent[:10])
+    assert sent[-1] == ("upsert", 18, True)  # barrier: the last batch again, acknowledged
+    assert server.calls[-1] == ("hnsw_m", 16)
+    assert 1 < server.peak <= 3
+    assert server.info.status == qs.CollectionStatus.GREEN
+
+def test_bulk_writer_surfaces_failed_requests_and_restores_indexing(monkeypatch):
+    server = _FakeServer(fail_batch=4)
+    writer = _bulk(monkeypatch, server, bulk=True)
+    writer.upsert([[0.1, 0.2]] * 10, [{}] * 10, list(range(10)))
+    with pytest.raises(ConnectionError):
+        writer.finish()
+    writer.abort()
+    assert server.calls[-1] == ("hnsw_m", 16)
+    # every request was waited for, including those after the failed one
+    assert server.live == 0 and {8} <= server.applied
+
+def test_bulk_writer_promotes_only_once_every_point_is_counted(monkeypatch):
+    server = _FakeServer()
+    server.lag = 3
+    writer = _bulk(monkeypatch, server, bulk=True)
+    writer.upsert([[0.1, 0.2]] * 10, [{}] * 10, list(range(10)))
+    writer.finish(wait_for_index=True)
+    assert server.count_polls == 4
+
+    server = _FakeServer()
+    server.lag = 10**6
+    writer = _bulk(monkeypatch, server, bulk=True)
+    monkeypatch.setattr(qs.settings, "bulk_index_wait_s", 0.05)
+    monkeypatch.setattr(qs, "time", SimpleNamespace(monotonic=time.monotonic, sleep=time.sleep))
+    writer.upsert([[0.1, 0.2]] * 10, [{}] * 10, list(range(10)))
+    with pytest.raises(TimeoutError):
+        writer.finish(wait_for_index=True)
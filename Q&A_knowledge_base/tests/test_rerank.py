@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+from rapidfuzz import fuzz
+
+from lr.rag.rerank import rerank, FuzzyReranker, NoRerank, Reranker
+
+def _hits(n, seed=0):
+    rng = random.Random(seed)
+    words = ["port", "rustdesk", "ec2", "security", "group", "docker", "n8n", "telegram"]
+    return [
+        (i, rng.random(), {"text": " ".join(rng.choices(words, k=12))})
+        for i in range(n)
+    ]
+
+def test_fuzzy_matches_per_hit_blend():
+    query = "rustdesk security group port"
+    hits = _hits(300)
+
+    def old_key(t):
+        _id, score, pl = t
+        return 0.6 * score + 0.4 * (fuzz.token_set_ratio(query, pl["text"]) / 100.0)
+
+    expected = sorted(hits, key=old_key, reverse=True)[:6]
+    got = rerank(query, hits, 6, FuzzyReranker())
+    assert [h[0] for h in got] == [h[0] for h in expected]
+
+def test_no_rerank_keeps_dense_order():
+    hits = [(1, 0.2, {}), (2, 0.9, {}), (3, 0.5, {})]
+    assert [h[0] for h in rerank("q", hits, 2, NoRerank())] == [2, 3]
+
+def test_custom_reranker_and_empty_input():
+    class ByLength(Reranker):
+        def score(self, query, texts, dense):
+            return np.array([len(t) for t in texts], dtype=np.float32)
+
+    hits = [(1, 0.9, {"text": "a"}), (2, 0.1, {"text": "abc"})]
+    assert [h[0] for h in rerank("q", hits, 2, ByLength())] == [2, 1]
+    assert rerank("q", [], 3) == []
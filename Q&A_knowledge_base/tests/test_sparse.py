@@ -0,0 +1,98 @@
+from lr.rag.retrieve import _fuse
+from lr.rag import sparse
+from lr.rag.sparse import SparseIndex, fts_query, rrf_fuse
+
+def _pl(source, chunk, text):
+    return {"source": source, "ext": "." + source.rsplit(".", 1)[1], "chunk": chunk, "text": text}
+
+def _index(tmp_path):
+    idx = SparseIndex(tmp_path / "sparse.sqlite")
+    idx.add(["p1", "p2", "p3"], [
+        _pl("guide.pdf", 0, "Open TCP ports 21115-21119 in the EC2 security group."),
+        _pl("errors.txt", 0, "ERR_CONN_REFUSED means qdrant is not reachable on 6333."),
+        _pl("notes.md", 0, "Docker compose starts ollama and qdrant together."),
+    ])
+    return idx
+
+def test_exact_identifier_is_found(tmp_path):
+    hits = _index(tmp_path).search("what does ERR_CONN_REFUSED mean?")
+    assert hits[0][0] == "p2"
+    assert hits[0][2]["source"] == "errors.txt"
+
+def test_ext_filter_and_delete(tmp_path):
+    idx = _index(tmp_path)
+    assert [h[0] for h in idx.search("qdrant", where={"ext": ".md"})] == ["p3"]
+    idx.delete_by_source(["notes.md"])
+    assert [h[0] for h in idx.search("qdrant")] == ["p2"]
+
+def test_re_adding_a_point_replaces_it(tmp_path):
+    idx = _index(tmp_path)
+    idx.add(["p1"], [_pl("guide.pdf", 0, "rewritten chunk about rustdesk")])
+    assert idx.search("21115") == []
+    assert [h[0] for h in idx.search("rustdesk")] == ["p1"]
+
+def test_fts_query_quotes_user_syntax():
+    assert fts_query('port "6333" OR NEAR(x)') == '"port" OR "6333" OR "NEAR"'
+    assert fts_query("?!") is None
+
+def test_stopwords_alone_match_nothing(tmp_path):
+    assert fts_query("what is the capital of france") == '"capital" OR "france"'
+    assert fts_query("what is it?") is None
+    assert _index(tmp_path).search("what is it in there?") == []
+
+def test_rrf_prefers_hits_found_by_both_legs():
+    dense = [("a", 0.9, {}), ("b", 0.8, {}), ("c", 0.7, {})]
+    sparse = [("c", 12.0, {}), ("d", 9.0, {})]
+    fused = rrf_fuse(dense, sparse, limit=3)
+    assert [h[0] for h in fused] == ["c", "a", "b"]
+    assert 0 < fused[-1][1] < fused[0][1] <= 1.0
+
+def test_sparse_hits_never_stand_in_for_dense_ones():
+    sparse = [("c", 12.0, {}), ("d", 9.0, {})]
+    # nothing passed min_score: no context, whatever BM25 matched
+    assert _fuse([], sparse, 4) == []
+    fused = _fuse([("a", 0.9, {}), ("c", 0.4, {})], sparse, 4)
+    assert [h[0] for h in fused] == ["c", "a", "d"]
+    # cosine scores, not rank scores; "d" (BM25 only) gets the weakest dense score
+    assert [h[1] for h in fused] == [0.4, 0.9, 0.4]
+
+def test_docstore_chunks_keep_no_text_copy_and_rebuild_from_spans(tmp_path, monkeypatch):
+    monkeypatch.setattr(sparse, "_COMPACT_MIN_DEAD", 2)
+    docs = {"d1": "Port 6333 is qdrant. Port 11434 is ollama.", "d2": "Open 21115 in the security group."}
+    read = []
+
+    def spans(refs):
+        read.extend(refs)
+        return [docs[d][s:e] for d, s, e in refs]
+
+    idx = SparseIndex(tmp_path / "sparse.sqlite", spans=spans)
+    ref = lambda d, s, e, chunk: {"source": d + ".md", "ext": ".md", "chunk": chunk,
+                                  "doc_id": d, "start": s, "end": e}
+    idx.add(["a", "b", "c"], [ref("d1", 0, 20, 0), ref("d1", 21, 43, 1), ref("d2", 0, 33, 0)],
+            [docs["d1"][:20], docs["d1"][21:], docs["d2"]])
+    assert idx._conn.execute("SELECT count(*) FROM docs WHERE text IS NOT NULL").fetchone() == (0,)
+    hit = idx.search("ollama")[0]
+    assert hit[0] == "b" and hit[2] == ref("d1", 21, 43, 1)
+
+    # d1 rewritten, then removed: its old terms must not match, before or after the rebuild
+    docs["d1"] = "Port 8080 serves the API."
+    idx.add(["a"], [ref("d1", 0, 25, 0)], [docs["d1"]])
+    assert idx.search("6333") == [] and [h[0] for h in idx.search("8080")] == ["a"]
+    assert read == []
+    idx.delete_by_source(["d1.md"])  # 3 tombstones > 1 live row: rebuilt from the docstore
+    assert read == [("d2", 0, 33)]
+    assert idx.search("ollama") == [] and idx.search("8080") == []
+    assert [h[0] for h in idx.search("21115")] == ["c"]
+
+def test_index_with_a_text_copy_is_migrated(tmp_path):
+    import sqlite3
+    conn = sqlite3.connect(tmp_path / "sparse.sqlite")
+    conn.execute("CREATE TABLE docs (rowid INTEGER PRIMARY KEY, point_id TEXT NOT NULL UNIQUE,"
+                 " source TEXT, ext TEXT, chunk INTEGER)")
+    conn.execute("CREATE VIRTUAL TABLE chunks USING fts5(text)")
+    conn.execute("INSERT INTO docs VALUES (1, 'p1', 'notes.md', '.md', 0)")
+    conn.execute("INSERT INTO chunks (rowid, text) VALUES (1, 'compose starts qdrant')")
+    conn.commit()
+    conn.close()
+    hits = SparseIndex(tmp_path / "sparse.sqlite").search("qdrant")
+    assert hits == [("p1", hits[0][1], _pl("notes.md", 0, "compose starts qdrant"))]
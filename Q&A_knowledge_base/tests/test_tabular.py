@@ -0,0 +1,37 @@
+import types
+
+from lr.io.manifest import source_of
+from lr.io.readers import iter_input, iter_table_blocks, read_spans
+
+def _write_table(path, n, sep=","):
+    lines = [sep.join(["id", "name", "note"])]
+    lines += [sep.join([str(i), f"row{i}", "" if i % 2 else "x"]) for i in range(n)]
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+def test_blocks_have_header_and_fixed_row_count(tmp_path):
+    blocks = list(iter_table_blocks(_write_table(tmp_path / "t.csv", 120), rows=50))
+    assert len(blocks) == 3
+    assert all(b.startswith("id,name,note\n") for b in blocks)
+    assert [b.count("\n") - 1 for b in blocks] == [50, 50, 20]
+    # values are kept as written: ids are not re-typed, empty cells stay empty
+    assert "\n119,row119,\n" in blocks[-1]
+
+def test_tsv_and_empty_file(tmp_path):
+    blocks = list(iter_table_blocks(_write_table(tmp_path / "t.tsv", 3, sep="\t"), rows=2))
+    assert blocks[0].splitlines()[0] == "id\tname\tnote"
+    (tmp_path / "empty.csv").write_text("")
+    assert list(iter_table_blocks(tmp_path / "empty.csv")) == []
+
+def test_tables_are_streamed_lazily(tmp_path):
+    assert isinstance(read_spans(_write_table(tmp_path / "t.csv", 10)), types.GeneratorType)
+
+def test_iter_input_keeps_every_row(tmp_path):
+    _write_table(tmp_path / "big.csv", 5000)
+    (tmp_path / "a.md").write_text("notes")
+    items = list(iter_input(str(tmp_path)))
+    assert items[0][0] == f"{source_of(tmp_path / 'a.md')}::0"
+    keys = [k for k, _, _ in items[1:]]
+    big = source_of(tmp_path / "big.csv")
+    assert keys[0] == f"{big}::0" and keys[-1] == f"{big}::99"
+    assert "\n4999,row4999," in items[-1][1]
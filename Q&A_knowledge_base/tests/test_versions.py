@@ -0,0 +1,56 @@
+import pytest
+
+import lr.rag.pipeline as pipeline
+from lr.vector import qdrant_store as qs
+from lr.vector import store
+from lr.vector.registry import version_info
+
+from tests.conftest import FakeEmbeddings, items
+
+def test_rebuild_fills_a_new_version_while_the_old_one_serves(fresh):
+    first = pipeline.index_stream(iter(items(5)))
+    assert first["collection"] == f"{qs.COLLECTION_NAME}_v1"
+    assert version_info(first["collection"])["dim"] == 8
+
+    seen = []
+
+    def progress(files, chunks):
+        # mid-rebuild the alias still points at v1, with all its points
+        seen.append((store.live_collection(refresh=True), qs.client.count(qs.COLLECTION_NAME).count))
+
+    res = pipeline.index_stream(iter(items(3, "b.md")), batch_size=1, on_progress=progress,
+                                rebuild=True)
+    assert seen[0] == (f"{qs.COLLECTION_NAME}_v1", 5)
+    assert res["promoted"] and res["collection"] == f"{qs.COLLECTION_NAME}_v2"
+    assert qs.live_collection() == f"{qs.COLLECTION_NAME}_v2"
+    assert qs.versions() == [f"{qs.COLLECTION_NAME}_v2"]
+    assert qs.client.count(qs.COLLECTION_NAME).count == 3
+    assert version_info(f"{qs.COLLECTION_NAME}_v1") is None
+
+def test_failed_rebuild_keeps_the_live_version(fresh, monkeypatch):
+    pipeline.index_stream(iter(items(4)))
+
+    def boom(files, chunks):
+        raise RuntimeError("cancelled")
+
+    with pytest.raises(RuntimeError):
+        pipeline.index_stream(iter(items(4, "b.md")), batch_size=1, on_progress=boom, rebuild=True)
+    assert qs.versions() == [f"{qs.COLLECTION_NAME}_v1"]
+    assert qs.client.count(qs.COLLECTION_NAME).count == 4
+
+def test_model_change_stages_a_new_version(fresh, monkeypatch):
+    pipeline.index_stream(iter(items(2)))
+    monkeypatch.setattr(pipeline, "embed_model_name", lambda: "other-model")
+    monkeypatch.setattr(pipeline, "get_cached_embedder", lambda: FakeEmbeddings(dim=4))
+    res = pipeline.index_stream(iter(items(2)))
+    assert res["promoted"]
+    assert version_info(res["collection"])["model"] == "other-model"
+
+def test_legacy_collection_is_migrated_behind_the_alias(fresh):
+    qs.client.create_collection(qs.COLLECTION_NAME, vectors_config=qs.VectorParams(
+        size=3, distance=qs.Distance.COSINE))
+    qs.client.upsert(qs.COLLECTION_NAME, points=[
+        qs.PointStruct(id=1, vector=[1.0, 0.0, 0.0], payload={"source": "a.md"})])
+    assert store.ensure_collection(3) == f"{qs.COLLECTION_NAME}_v1"
+    assert qs.live_collection() == f"{qs.COLLECTION_NAME}_v1"
+    assert qs.search([1.0, 0.0, 0.0], top_k=1)[0][0] == 1
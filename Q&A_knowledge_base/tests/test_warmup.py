@@ -0,0 +1,38 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import lr.warmup as warmup
+from lr.config import settings
+
+def test_ready_once_every_step_succeeded(monkeypatch):
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("ollama not up yet")
+
+    async def fine():
+        pass
+
+    monkeypatch.setattr(settings, "warmup", True)
+    monkeypatch.setattr(warmup, "_state", {"done": False, "steps": {}})
+    monkeypatch.setattr(warmup, "_MAX_BACKOFF_S", 0.0)
+    monkeypatch.setattr(warmup, "STEPS", {"embed": flaky, "vector": fine})
+    assert warmup.readiness()[0] is False
+    asyncio.run(warmup.run())
+    ready, state = warmup.readiness()
+    assert ready and len(attempts) == 3
+    assert set(state["warmup"]) == {"embed", "vector"} and "ms" in state["warmup"]["embed"]
+
+def test_api_import_leaves_heavy_modules_unloaded():
+    # parsers and the OpenAI client load on first use, not with the API
+    heavy = ("pandas", "pypdf", "unstructured", "openai", "rapidfuzz", "qdrant_client")
+    code = ("import sys, lr.api.main; "
+            f"print(','.join(m for m in {heavy!r} if m in sys.modules))")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         env=env)
+    assert out.stdout.strip() == ""